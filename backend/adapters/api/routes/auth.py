@@ -10,7 +10,11 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from adapters.db.database import get_db
 from adapters.db.repository import UserRepository
+from adapters.redis.guest_store import guest_store
 import httpx
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 settings = get_settings()
@@ -39,13 +43,16 @@ class LoginResponse(BaseModel):
     user: UserResponse
 
 
-def create_access_token(user_id: UUID) -> str:
+def create_access_token(user_id: UUID, guest: bool = False) -> str:
     """Create JWT access token."""
     expire = datetime.utcnow() + timedelta(hours=settings.jwt_expiration_hours)
     payload = {
         "sub": str(user_id),
         "exp": expire
     }
+    if guest:
+        # users 행이 아직 없는 게스트 (Redis 레코드만 있음, 첫 랭크 매치/프로필 수정 시 승격)
+        payload["guest"] = True
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
@@ -73,19 +80,14 @@ async def _handle_google_login(access_token: str, db: AsyncSession) -> LoginResp
         raise HTTPException(status_code=401, detail="Invalid Google user info")
 
     repo = UserRepository(db)
-    user = await repo.get_by_google_id(google_id)
-
-    if not user:
-        nickname = user_info.get("name") or user_info.get("email") or f"user_{google_id[:6]}"
-        if await repo.get_by_nickname(nickname):
-            nickname = f"{nickname}_{google_id[:6]}"
-
-        user = await repo.create_user(
-            nickname=nickname,
-            google_id=google_id,
-            email=user_info.get("email"),
-            avatar_url=user_info.get("picture"),
-        )
+    # 기존 유저면 그대로, 처음이면 가입 (닉네임 충돌은 SQL 에서 접미사 처리)
+    nickname = user_info.get("name") or user_info.get("email") or f"user_{google_id[:6]}"
+    user, _ = await repo.upsert_google_user(
+        google_id=google_id,
+        nickname=nickname,
+        email=user_info.get("email"),
+        avatar_url=user_info.get("picture"),
+    )
     
     # Sync with RankingService (In-Memory)
     from domain.entities import User as DomainUser
@@ -123,13 +125,16 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     - **google**: 구글 소셜 로그인
     """
     if request.provider == "guest":
-        # Create guest user in DB
-        nickname = f"마법소녀_{uuid4().hex[:6]}"
-        repo = UserRepository(db)
-        
-        # Ensure nickname uniqueness (simple retry or check)
-        # For simplicity, we assume uuid hex is unique enough or handle collision later
-        user = await repo.create_user(nickname=nickname)
+        # 게스트는 Redis TTL 레코드로만 만들고, 의미 있는 행동을 할 때 users 행으로 승격
+        is_guest = True
+        try:
+            user = await guest_store.create()
+        except Exception as e:
+            logger.warning(f"Guest store unavailable, creating guest user row: {e}")
+            is_guest = False
+            nickname = f"마법소녀_{uuid4().hex[:6]}"
+            # 닉네임이 겹치면 repository 가 SQL 에서 접미사를 붙임
+            user = await UserRepository(db).create_user(nickname=nickname)
         
         # Sync with RankingService
         from domain.entities import User as DomainUser
@@ -145,7 +150,7 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
         )
         ranking_service._users[user.id] = domain_user
         
-        token = create_access_token(user.id)
+        token = create_access_token(user.id, guest=is_guest)
         
         return LoginResponse(
             access_token=token,
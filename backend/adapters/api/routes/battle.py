@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from uuid import UUID
 from typing import Optional
 import os
 import tempfile
 import shutil
+import json
 from datetime import datetime
 
 from adapters.api.routes.users import get_current_user_id
 from adapters.api.routes.characters import CHARACTERS
 from use_cases.battle_service import BattleService
+from use_cases.battle_event_service import iter_replay
 from config import get_settings
 
 router = APIRouter()
@@ -197,3 +199,19 @@ async def cleanup_audio(battle_id: str):
     """Clean up audio files after battle ends"""
     cleanup_battle_audio(battle_id)
     return {"success": True, "message": f"Audio files for battle {battle_id} cleaned up"}
+
+
+@router.get("/{battle_id}/events")
+async def replay_battle_events(battle_id: str):
+    """배틀 이벤트 로그 리플레이 (NDJSON, 한 줄에 이벤트 하나, 발생 순서대로)"""
+    events = iter_replay(battle_id)
+    first = await anext(events, None)
+    if first is None:
+        raise HTTPException(status_code=404, detail="Battle events not found")
+
+    async def lines():
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
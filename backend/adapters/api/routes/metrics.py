@@ -0,0 +1,121 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from adapters.db.database import engine, replica_engine, replica_router
+from adapters.db.instrumentation import query_metrics
+from adapters.db.pool import pool_snapshot
+from adapters.redis.profile_cache import profile_cache
+from adapters.db.loader import user_loader
+from adapters.redis.match_queue import match_result_queue
+from use_cases.match_settlement import settlement_stats
+from adapters.db.match_writer import match_history_writer
+from adapters.redis.client import redis_metrics, pool_snapshot as redis_pool_snapshot
+from adapters.battle_state import battle_state_manager
+from use_cases.turn_timer import turn_timer
+from adapters.socket.state import socket_state
+from use_cases.matchmaking import matchmaker
+from config import get_settings
+
+settings = get_settings()
+
+
+async def require_metrics_token(x_metrics_token: str | None = Header(default=None)):
+    """내부 운영용: METRICS_TOKEN 이 없으면 비활성(404), 있으면 X-Metrics-Token 헤더가 일치해야 함"""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, settings.metrics_token):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+router = APIRouter(dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/db")
+async def get_db_metrics():
+    """DB 쿼리 통계 (총 횟수, 지연시간 분포, slow query, scope별 쿼리 수)"""
+    return query_metrics.snapshot()
+
+
+@router.get("/db/pool")
+async def get_db_pool_metrics():
+    """DB 커넥션 풀 상태 (사용 중 커넥션, 대기 시간, overflow / timeout 횟수), primary / replica 따로"""
+    return {
+        "primary": pool_snapshot(engine),
+        "replica": pool_snapshot(replica_engine) if replica_engine is not None else None,
+    }
+
+
+@router.get("/db/replica")
+async def get_db_replica_metrics():
+    """Read replica 라우팅 상태 (지연, replica 읽기 / primary fallback 횟수)"""
+    return replica_router.snapshot()
+
+
+@router.get("/cache/profile")
+async def get_profile_cache_metrics():
+    """유저 프로필 캐시 적중률 (프로세스 LRU / Redis / miss)"""
+    return {
+        **profile_cache.stats.snapshot(),
+        "local_entries": len(profile_cache.local),
+        "loader": user_loader.snapshot(),
+    }
+
+
+@router.get("/cache/battle")
+async def get_battle_cache_metrics():
+    """배틀 상태 저장소 (redis: 워커 로컬 캐시 적중률 / stale 갱신 / version 충돌, memory: 보관 중인 배틀 수)"""
+    return battle_state_manager.snapshot()
+
+
+@router.get("/turn-timer")
+async def get_turn_timer_metrics():
+    """턴 제한 시간 timer wheel (등록된 마감 수, 만료 / 빗나감 처리 / 무시된 만료, tick 최대 처리 시간)"""
+    return turn_timer.snapshot()
+
+
+@router.get("/socket")
+async def get_socket_state_metrics():
+    """소켓 레지스트리 (memory / redis, 접속 sid 수, 매칭 대기 수)"""
+    return {
+        **socket_state.snapshot(),
+        "connected": await socket_state.user_count(),
+        "queued": await socket_state.queue_size(),
+    }
+
+
+@router.get("/matchmaking")
+async def get_matchmaking_metrics():
+    """빠른 매칭 (허용 ELO 범위, 대기 시간 / 매칭 rating 차이 p50·p90·p99 - 워커별 최근 매칭 기준)"""
+    return {
+        **matchmaker.snapshot(),
+        "queued": await socket_state.queue_size(),
+    }
+
+
+@router.get("/match-queue")
+async def get_match_queue_metrics():
+    """경기 결과 write-behind 큐 상태 (적체 / 재시도 / dead-letter)"""
+    try:
+        lag = await match_result_queue.lag()
+    except Exception as e:
+        lag = {"error": str(e)}
+    return {
+        **lag,
+        "batches": settlement_stats.batches,
+        "settled": settlement_stats.settled,
+        "skipped": settlement_stats.skipped,
+        "duplicates": settlement_stats.duplicates,
+        "failures": settlement_stats.failures,
+        "dead_lettered": settlement_stats.dead_lettered,
+        "history_writer": match_history_writer.snapshot(),
+    }
+
+
+@router.get("/redis")
+async def get_redis_metrics():
+    """Redis 명령 지연시간 / 에러 / 파이프라인 크기 + 공유 커넥션 풀 포화도"""
+    return {
+        **redis_metrics.snapshot(),
+        "pool": redis_pool_snapshot(),
+    }
@@ -1,10 +1,15 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from uuid import UUID
 
 from adapters.api.routes.users import get_current_user_id
+from adapters.db.loader import user_loader
 from use_cases.room_service import RoomService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 room_service = RoomService()
 
@@ -71,12 +76,19 @@ async def get_rooms():
     """열린 방 목록 조회"""
     rooms = await room_service.get_open_rooms()
     
+    # 방장 닉네임을 한 번에 조회 (프로필 캐시 -> 단일 DB 쿼리)
+    try:
+        hosts = await user_loader.load_many(room.host_id for room in rooms)
+    except Exception as e:
+        logger.warning(f"Host nickname lookup failed: {e}")
+        hosts = {}
+    
     return RoomListResponse(
         rooms=[
             RoomListItem(
                 room_id=room.id,
                 name=room.name,
-                host_nickname="Host",  # TODO: Get actual nickname
+                host_nickname=hosts[str(room.host_id)].nickname if str(room.host_id) in hosts else "Host",
                 player_count=room.player_count,
                 max_players=room.max_players,
                 is_private=room.is_private,
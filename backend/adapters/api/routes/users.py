@@ -5,14 +5,22 @@ from uuid import UUID
 from jose import jwt, JWTError
 import shutil
 import os
+import base64
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
 
 from config import get_settings
 from use_cases.ranking_service import RankingService
 from sqlalchemy.ext.asyncio import AsyncSession
-from adapters.db.database import get_db
-from adapters.db.repository import UserRepository
+from adapters.db.database import get_db, get_read_db, open_read_session
+from adapters.db.repository import UserRepository, MatchRepository
+from adapters.redis.leaderboard import leaderboard
+from adapters.redis.user_stats import user_stats
+from adapters.redis.guest_store import guest_store
+from use_cases.guest_service import promote_guest
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 security = HTTPBearer()
@@ -29,6 +37,7 @@ class UserDetailResponse(BaseModel):
     main_character_id: str
     avatar_url: str | None = None
     rank: int | None = None
+    total_users: int | None = None
     created_at: str
 
 
@@ -46,35 +55,148 @@ class RankingEntry(BaseModel):
 class RankingResponse(BaseModel):
     rankings: list[RankingEntry]
     total: int
+    ranked_total: int | None = None
+
+
+class UserStatsResponse(BaseModel):
+    total: int
+    ranked: int
+    elo_histogram: dict[int, int]
+
 
+class RankingPageResponse(BaseModel):
+    rankings: list[RankingEntry]
+    next_cursor: str | None = None
+
+
+def encode_ranking_cursor(elo_rating: int, user_id: UUID, rank: int, position: int) -> str:
+    """Opaque cursor for the last row of a page: (elo_rating, id) + its rank and 1-based position."""
+    raw = f"{elo_rating}:{user_id}:{rank}:{position}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_ranking_cursor(cursor: str) -> tuple[int, UUID, int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded).decode().split(":")
+        if len(parts) == 3:
+            # 이전 형식 (rank 만): position = rank
+            parts.append(parts[2])
+        elo_rating, user_id, rank, position = parts
+        return int(elo_rating), UUID(user_id), int(rank), int(position)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-async def get_current_user_id(
+
+def tie_ranks(ratings: list[int], position: int, rank: int) -> list[int]:
+    """
+    높은 순으로 이어진 ratings 의 순위 (동점은 같은 순위 = 1 + 더 높은 점수 수).
+    ratings[0] 은 전체에서 position 번째(1-based)이고 순위가 rank.
+    """
+    ranks = []
+    for i, rating in enumerate(ratings):
+        if i == 0:
+            ranks.append(rank)
+        elif rating == ratings[i - 1]:
+            ranks.append(ranks[-1])
+        else:
+            ranks.append(position + i)
+    return ranks
+
+
+async def get_token_payload(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> UUID:
-    """Verify JWT and extract user ID."""
+) -> dict:
+    """Verify JWT and return its payload."""
     try:
         payload = jwt.decode(
             credentials.credentials,
             settings.jwt_secret_key,
             algorithms=[settings.jwt_algorithm]
         )
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return UUID(user_id)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+async def get_current_user_id(payload: dict = Depends(get_token_payload)) -> UUID:
+    """Verify JWT and extract user ID."""
+    return UUID(payload["sub"])
+
+
+async def get_persisted_user_id(payload: dict = Depends(get_token_payload)) -> UUID:
+    """
+    쓰기 요청용 user ID: 게스트 토큰이면 먼저 users 행으로 승격한다.
+    (프로필 수정은 게스트를 저장할 만한 첫 행동)
+    """
+    user_id = UUID(payload["sub"])
+    if payload.get("guest"):
+        try:
+            await promote_guest(user_id)
+        except Exception as e:
+            logger.error(f"Guest promotion failed for {user_id}: {e}")
+            raise HTTPException(status_code=503, detail="Could not save guest account")
+    return user_id
+
+
+async def get_read_db_for_current_user(user_id: UUID = Depends(get_current_user_id)):
+    """Read session for the caller: replica unless they just wrote (read-your-own-write)."""
+    async with await open_read_session(user_id) as session:
+        yield session
+
+
+async def _leaderboard_ready() -> bool:
+    """Redis 리더보드 사용 가능 여부 (재구축 전이거나 Redis 장애 시 DB fallback)"""
+    try:
+        return await leaderboard.is_ready()
+    except Exception as e:
+        logger.warning(f"Leaderboard unavailable, falling back to DB: {e}")
+        return False
+
+
+async def get_user_rank(repo: UserRepository, user_id: UUID) -> int:
+    """리더보드(ZCOUNT)로 순위 조회, 리더보드를 못 쓰면 DB COUNT 로 fallback"""
+    if await _leaderboard_ready():
+        try:
+            rank = await leaderboard.get_rank(user_id)
+            if rank is not None:
+                return rank
+        except Exception as e:
+            logger.warning(f"Leaderboard rank lookup failed: {e}")
+    return await repo.get_user_rank(user_id)
+
+
+async def get_user_counts(repo: UserRepository) -> dict[str, int | None]:
+    """캐시된 전체/랭크 유저 수, reconcile 전이거나 Redis 장애 시 DB COUNT"""
+    try:
+        counts = await user_stats.get_counts()
+        if counts is not None:
+            return counts
+    except Exception as e:
+        logger.warning(f"User stats unavailable, falling back to DB: {e}")
+    return {"total": await repo.get_total_users_count(), "ranked": None}
 
 
 @router.get("/me", response_model=UserDetailResponse)
 async def get_current_user(
     user_id: UUID = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db_for_current_user)
 ):
     """현재 로그인한 유저 정보"""
-    # DB에서 조회하도록 변경
+    # 프로필 캐시 -> DB 순으로 조회
     repo = UserRepository(db)
-    user = await repo.get_by_id(user_id)
+    user = await repo.get_profile(user_id)
+    is_guest = False
+    
+    if not user:
+        # 아직 저장되지 않은 게스트 (순위 없음)
+        try:
+            user = await guest_store.get(user_id)
+        except Exception as e:
+            logger.warning(f"Guest store lookup failed: {e}")
+        is_guest = user is not None
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -87,7 +209,8 @@ async def get_current_user(
         losses=user.losses,
         main_character_id=user.main_character_id,
         avatar_url=user.avatar_url,
-        rank=await repo.get_user_rank(user.id),
+        rank=None if is_guest else await get_user_rank(repo, user.id),
+        total_users=(await get_user_counts(repo))["total"],
         created_at=user.created_at.isoformat()
     )
 
@@ -96,18 +219,43 @@ async def get_current_user(
 async def get_rankings(
     limit: int = 10,
     offset: int = 0,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """글로벌 랭킹 조회 (DB 기반 - 전체 유저 대상)"""
+    """글로벌 랭킹 조회 (Redis 리더보드, 없으면 DB - 전체 유저 대상)"""
     repo = UserRepository(db)
     
-    # DB에서 elo_rating 순으로 정렬된 유저 조회
-    users = await repo.get_top_rankings(limit, offset)
-    total = await repo.get_total_users_count()
+    # 순위는 /me 와 같은 규칙 (1 + 더 높은 점수 수, 동점은 같은 순위)
+    ranked = None
+    if await _leaderboard_ready():
+        try:
+            # ZREVRANGE 로 페이지의 user_id 만 가져오고 상세 정보는 PK 로 일괄 조회
+            page = await leaderboard.get_page(offset, limit)
+            ranks = []
+            if page:
+                ranks = tie_ranks([score for _, score in page], offset + 1, await leaderboard.count_above(page[0][1]) + 1)
+            by_id = {str(u.id): u for u in await repo.get_many([UUID(uid) for uid, _ in page])}
+            missing = [uid for uid, _ in page if uid not in by_id]
+            if missing:
+                # 순위는 점수로 매기므로 빠진 유저가 있어도 뒤의 순위가 밀리지 않는다
+                logger.warning(f"Leaderboard members without a users row (run `scripts/leaderboard.py check --fix`): {missing}")
+            ranked = [(rank, by_id[uid]) for rank, (uid, _) in zip(ranks, page) if uid in by_id]
+        except Exception as e:
+            logger.warning(f"Leaderboard page read failed, falling back to DB: {e}")
+            ranked = None
+    
+    if ranked is None:
+        # DB에서 elo_rating 순으로 정렬된 유저 조회
+        users = await repo.get_top_rankings(limit, offset)
+        ranks = []
+        if users:
+            ranks = tie_ranks([u.elo_rating for u in users], offset + 1, await repo.count_rated_above(users[0].elo_rating) + 1)
+        ranked = list(zip(ranks, users))
+    
+    counts = await get_user_counts(repo)
     
     rankings = [
         RankingEntry(
-            rank=offset + i + 1,
+            rank=rank,
             user_id=user.id,
             nickname=user.nickname,
             elo_rating=user.elo_rating,
@@ -116,10 +264,140 @@ async def get_rankings(
             main_character_id=user.main_character_id,
             avatar_url=user.avatar_url
         )
-        for i, user in enumerate(users)
+        for rank, user in ranked
     ]
     
-    return RankingResponse(rankings=rankings, total=total)
+    return RankingResponse(rankings=rankings, total=counts["total"], ranked_total=counts["ranked"])
+
+
+@router.get("/stats", response_model=UserStatsResponse)
+async def get_user_stats(db: AsyncSession = Depends(get_read_db)):
+    """전체/랭크 유저 수와 ELO 분포 (캐시, 없으면 DB 집계)"""
+    try:
+        counts = await user_stats.get_counts()
+        histogram = await user_stats.get_histogram()
+        if counts is not None and histogram is not None:
+            return UserStatsResponse(total=counts["total"], ranked=counts["ranked"], elo_histogram=histogram)
+    except Exception as e:
+        logger.warning(f"User stats unavailable, falling back to DB: {e}")
+    
+    total, ranked, histogram = await UserRepository(db).get_user_stats()
+    return UserStatsResponse(total=total, ranked=ranked, elo_histogram=histogram)
+
+
+@router.get("/ranking/cursor", response_model=RankingPageResponse)
+async def get_rankings_by_cursor(
+    limit: int = 10,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """글로벌 랭킹 조회 (keyset 페이지네이션 - 페이지 깊이와 무관하게 일정한 비용)"""
+    limit = max(1, min(limit, 100))
+    after = None
+    last_elo, last_rank, last_position = None, 0, 0
+    if cursor:
+        last_elo, last_id, last_rank, last_position = decode_ranking_cursor(cursor)
+        after = (last_elo, last_id)
+    
+    repo = UserRepository(db)
+    users = await repo.get_rankings_after(limit, after)
+    
+    # 동점은 같은 순위 (이전 페이지 마지막 유저와 동점이면 그 순위를 이어받음)
+    ranks = []
+    if users:
+        first = users[0].elo_rating
+        first_rank = last_rank if first == last_elo else last_position + 1
+        ranks = tie_ranks([u.elo_rating for u in users], last_position + 1, first_rank)
+    
+    rankings = [
+        RankingEntry(
+            rank=rank,
+            user_id=user.id,
+            nickname=user.nickname,
+            elo_rating=user.elo_rating,
+            wins=user.wins,
+            losses=user.losses,
+            main_character_id=user.main_character_id,
+            avatar_url=user.avatar_url
+        )
+        for rank, user in zip(ranks, users)
+    ]
+    
+    next_cursor = None
+    if len(users) == limit:
+        last = rankings[-1]
+        next_cursor = encode_ranking_cursor(last.elo_rating, last.user_id, last.rank, last_position + len(users))
+    
+    return RankingPageResponse(rankings=rankings, next_cursor=next_cursor)
+
+
+class MatchHistoryEntry(BaseModel):
+    battle_id: str
+    opponent_id: UUID
+    character_id: str | None = None
+    opponent_character_id: str | None = None
+    is_winner: bool
+    is_ranked: bool
+    elo_change: int
+    turns: int
+    duration_seconds: float
+    ended_at: str
+
+
+class MatchHistoryResponse(BaseModel):
+    matches: list[MatchHistoryEntry]
+    next_before: str | None = None
+
+
+async def _get_match_history(user_id: UUID, limit: int, before: str | None, db: AsyncSession) -> MatchHistoryResponse:
+    limit = max(1, min(limit, 100))
+    before_dt = None
+    if before:
+        try:
+            before_dt = datetime.fromisoformat(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid 'before' timestamp")
+    
+    rows = await MatchRepository(db).get_user_history(user_id, limit, before_dt)
+    matches = [
+        MatchHistoryEntry(
+            battle_id=battle_id,
+            opponent_id=player.opponent_id,
+            character_id=player.character_id,
+            opponent_character_id=player.opponent_character_id,
+            is_winner=player.is_winner,
+            is_ranked=is_ranked,
+            elo_change=player.elo_change,
+            turns=turns,
+            duration_seconds=duration_seconds,
+            ended_at=player.ended_at.isoformat()
+        )
+        for player, turns, duration_seconds, is_ranked, battle_id in rows
+    ]
+    next_before = matches[-1].ended_at if len(matches) == limit else None
+    return MatchHistoryResponse(matches=matches, next_before=next_before)
+
+
+@router.get("/me/matches", response_model=MatchHistoryResponse)
+async def get_my_match_history(
+    limit: int = 20,
+    before: str | None = None,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db_for_current_user)
+):
+    """내 전적 (최신순, before=이전 페이지의 next_before)"""
+    return await _get_match_history(user_id, limit, before, db)
+
+
+@router.get("/{user_id}/matches", response_model=MatchHistoryResponse)
+async def get_user_match_history(
+    user_id: UUID,
+    limit: int = 20,
+    before: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """유저 전적 (최신순, before=이전 페이지의 next_before)"""
+    return await _get_match_history(user_id, limit, before, db)
 
 
 class UpdateCharacterRequest(BaseModel):
@@ -134,7 +412,7 @@ class UpdateProfileRequest(BaseModel):
 @router.put("/me/character", response_model=UserDetailResponse)
 async def update_main_character(
     request: UpdateCharacterRequest,
-    user_id: UUID = Depends(get_current_user_id),
+    user_id: UUID = Depends(get_persisted_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """주 캐릭터 변경"""
@@ -164,7 +442,7 @@ async def update_main_character(
 @router.put("/me", response_model=UserDetailResponse)
 async def update_profile(
     request: UpdateProfileRequest,
-    user_id: UUID = Depends(get_current_user_id),
+    user_id: UUID = Depends(get_persisted_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """프로필(닉네임, 아바타) 변경"""
@@ -191,7 +469,7 @@ async def update_profile(
 @router.post("/me/avatar", response_model=UserDetailResponse)
 async def upload_avatar(
     file: UploadFile = File(...),
-    user_id: UUID = Depends(get_current_user_id),
+    user_id: UUID = Depends(get_persisted_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """프로필 이미지 업로드"""
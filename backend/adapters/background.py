@@ -0,0 +1,53 @@
+"""응답 경로 밖에서 돌리는 fire-and-forget 태스크
+
+이벤트 루프는 태스크를 약한 참조로만 들고 있어서, 돌려받은 태스크를 버리면 실행 중에 GC 될 수 있고
+종료 시에는 진행 중인 작업(배틀 이벤트 보관, match history flush 등)이 그대로 사라진다.
+spawn() 으로 만든 태스크는 끝날 때까지 모듈 집합에 보관하고, 종료 시 drain() 으로 기다린다.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Coroutine
+
+logger = logging.getLogger(__name__)
+
+_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """태스크를 만들고 끝날 때까지 참조 유지 (실패는 로그로 남김)"""
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+
+
+def pending() -> int:
+    return len(_tasks)
+
+
+async def drain(timeout: float) -> int:
+    """
+    남은 태스크를 최대 timeout 초 기다리고 (기다리는 동안 새로 생긴 태스크 포함),
+    그래도 안 끝난 태스크는 취소한다. 취소한 수를 반환.
+    """
+    deadline = time.monotonic() + timeout
+    while _tasks:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await asyncio.wait(set(_tasks), timeout=remaining)
+
+    leftover = list(_tasks)
+    for task in leftover:
+        task.cancel()
+    await asyncio.gather(*leftover, return_exceptions=True)
+    if leftover:
+        logger.warning(f"Cancelled {len(leftover)} background tasks still running at shutdown")
+    return len(leftover)
@@ -0,0 +1,232 @@
+"""배틀 상태 모델 / 저장 형식 / 저장소 인터페이스
+
+저장소 구현과 무관한 부분만 둔다.
+- BattleState, 저장 형식 codec (binary 기본, json)
+- BattleStateManager 인터페이스와 settings.battle_state_backend 로 고르는 팩토리
+  - redis (기본): adapters/redis/battle_state.py (여러 워커/서버가 공유)
+  - memory: adapters/memory/battle_state.py (단일 노드, 로컬 개발/테스트, 벤치마크 기준선)
+"""
+import json
+import struct
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict, replace
+from typing import Any, Callable, Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+# 배틀 세션 TTL(초) - 마지막 쓰기 기준
+BATTLE_TTL_SECONDS = 3600
+
+
+@dataclass
+class BattleState:
+    """실시간 배틀 상태"""
+    battle_id: str
+    player1_id: str
+    player2_id: str
+    player1_hp: int = 300
+    player2_hp: int = 300
+    player1_character_id: Optional[str] = None
+    player2_character_id: Optional[str] = None
+    current_turn: int = 1  # 1 = player1, 2 = player2
+    round_number: int = 1
+    status: str = "waiting"  # waiting, character_select, battle, finished
+    is_ranked: bool = False  # ELO 반영 여부
+    turns: int = 0  # 지금까지 진행된 공격 수
+    started_at: float = 0.0  # 생성 시각 (epoch seconds)
+    version: int = 0  # 쓰기마다 1 증가 (캐시 stale 판정 / compare-and-set)
+    player1_missed: int = 0  # 연속으로 시간 초과된 턴 수 (그 플레이어가 공격하면 0)
+    player2_missed: int = 0
+
+
+# ---- Codecs ----
+
+class JsonCodec:
+    """json.dumps(asdict(state)) - 사람이 읽을 수 있지만 크고 느림"""
+    name = "json"
+
+    def encode(self, state: BattleState) -> bytes:
+        return json.dumps(asdict(state)).encode()
+
+    def decode(self, data: bytes) -> BattleState:
+        return BattleState(**json.loads(data))
+
+
+# binary 레이아웃 (big-endian)
+#   B format version | H player1_hp | H player2_hp | B current_turn | B status | I turns
+#   | B round_number | B flags(bit0 = is_ranked) | d started_at | I state version (v2 부터)
+#   | B player1_missed | B player2_missed (v3 부터)
+#   + 문자열 5개 (battle_id, player1_id, player2_id, player1_character_id, player2_character_id)
+#     각각 H 길이 + UTF-8 바이트, None 은 길이 0xFFFF
+# v1, v2 는 읽기만 지원 (없는 필드는 0 으로 간주)
+BINARY_VERSION = 3
+BINARY_HEADER_V1 = struct.Struct(">BHHBBIBBd")
+BINARY_HEADER_V2 = struct.Struct(">BHHBBIBBdI")
+BINARY_HEADER = struct.Struct(">BHHBBIBBdIBB")
+BINARY_STR_LEN = struct.Struct(">H")
+BINARY_NONE_LEN = 0xFFFF
+BINARY_STRING_FIELDS = ("battle_id", "player1_id", "player2_id", "player1_character_id", "player2_character_id")
+STATUS_CODES = {"waiting": 0, "character_select": 1, "battle": 2, "finished": 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+class BinaryCodec:
+    """버전 바이트 + 고정 struct 레이아웃 (JSON 의 절반 이하 크기)"""
+    name = "binary"
+
+    def encode(self, state: BattleState) -> bytes:
+        parts = [BINARY_HEADER.pack(
+            BINARY_VERSION,
+            state.player1_hp,
+            state.player2_hp,
+            state.current_turn,
+            STATUS_CODES[state.status],
+            state.turns,
+            state.round_number,
+            1 if state.is_ranked else 0,
+            state.started_at,
+            state.version,
+            state.player1_missed,
+            state.player2_missed,
+        )]
+        for name in BINARY_STRING_FIELDS:
+            value = getattr(state, name)
+            if value is None:
+                parts.append(BINARY_STR_LEN.pack(BINARY_NONE_LEN))
+            else:
+                raw = str(value).encode()
+                parts.append(BINARY_STR_LEN.pack(len(raw)))
+                parts.append(raw)
+        return b"".join(parts)
+
+    def decode(self, data: bytes) -> BattleState:
+        player1_missed = player2_missed = 0
+        if data[0] == BINARY_VERSION:
+            (_, player1_hp, player2_hp, current_turn, status, turns, round_number, flags, started_at,
+             version, player1_missed, player2_missed) = BINARY_HEADER.unpack_from(data, 0)
+            pos = BINARY_HEADER.size
+        elif data[0] == 2:
+            (_, player1_hp, player2_hp, current_turn, status, turns,
+             round_number, flags, started_at, version) = BINARY_HEADER_V2.unpack_from(data, 0)
+            pos = BINARY_HEADER_V2.size
+        elif data[0] == 1:
+            (_, player1_hp, player2_hp, current_turn, status, turns,
+             round_number, flags, started_at) = BINARY_HEADER_V1.unpack_from(data, 0)
+            version = 0
+            pos = BINARY_HEADER_V1.size
+        else:
+            raise ValueError(f"Unsupported battle state version: {data[0]}")
+        strings = {}
+        for name in BINARY_STRING_FIELDS:
+            (length,) = BINARY_STR_LEN.unpack_from(data, pos)
+            pos += BINARY_STR_LEN.size
+            if length == BINARY_NONE_LEN:
+                strings[name] = None
+            else:
+                strings[name] = data[pos:pos + length].decode()
+                pos += length
+        return BattleState(
+            player1_hp=player1_hp,
+            player2_hp=player2_hp,
+            current_turn=current_turn,
+            status=STATUS_NAMES[status],
+            turns=turns,
+            round_number=round_number,
+            is_ranked=bool(flags & 1),
+            started_at=started_at,
+            version=version,
+            player1_missed=player1_missed,
+            player2_missed=player2_missed,
+            **strings,
+        )
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), BinaryCodec())}
+
+
+def get_codec(name: str):
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown battle state codec: {name} (choose from {', '.join(CODECS)})")
+
+
+def decode_battle_state(data: bytes) -> BattleState:
+    """저장된 값의 첫 바이트로 형식 판별 ('{' = json, 그 외 = binary 버전 바이트)"""
+    if data[:1] == b"{":
+        return CODECS["json"].decode(data)
+    return CODECS["binary"].decode(data)
+
+
+class BattleStateManager(ABC):
+    """배틀 상태 저장소 인터페이스
+
+    반환된 BattleState 는 캐시/저장소와 공유될 수 있으므로 수정하지 말고 dataclasses.replace 로 새로 만든다.
+    """
+
+    async def connect(self):
+        """저장소 연결 (필요한 구현만)"""
+        return None
+
+    @abstractmethod
+    async def create_battle(self, battle_id: str, player1_id: str, player2_id: str, is_ranked: bool = False) -> BattleState:
+        """새 배틀 세션 생성"""
+
+    @abstractmethod
+    async def get_battle(self, battle_id: str) -> Optional[BattleState]:
+        """배틀 상태 조회 (없거나 만료되면 None)"""
+
+    @abstractmethod
+    async def update_hp(self, battle_id: str, player_id: str, damage: int) -> Optional[dict]:
+        """공격 1회를 원자적으로 반영
+
+        반환: player1_hp, player2_hp, current_turn, status, winner_id(이번 공격으로 끝났을 때만),
+        version(반영 후 상태 version), state(이번 공격으로 끝났을 때 종료 시점의 전체 상태). 배틀이 없으면 None.
+        """
+
+    @abstractmethod
+    async def mutate(self, battle_id: str, change: Callable[[BattleState], Optional[BattleState]]) -> Optional[BattleState]:
+        """change(현재 상태) 가 돌려준 새 상태를 원자적으로 저장 (None 이면 변경 없음)"""
+
+    @abstractmethod
+    async def delete_battle(self, battle_id: str):
+        """배틀 세션 삭제 (게임 종료 시)"""
+
+    @abstractmethod
+    def snapshot(self) -> dict[str, Any]:
+        """metrics 용 상태"""
+
+    async def set_character(self, battle_id: str, player_id: str, character_id: str) -> bool:
+        """플레이어 캐릭터 선택 저장 (둘 다 선택했으면 battle 상태로 전환)"""
+        def change(state: BattleState) -> Optional[BattleState]:
+            if player_id == state.player1_id:
+                updated = replace(state, player1_character_id=character_id)
+            elif player_id == state.player2_id:
+                updated = replace(state, player2_character_id=character_id)
+            else:
+                return None
+            if (updated.player1_character_id and updated.player2_character_id
+                    and updated.status in ("waiting", "character_select")):
+                updated = replace(updated, status="battle")
+            return updated
+
+        state = await self.mutate(battle_id, change)
+        return state is not None and character_id in (state.player1_character_id, state.player2_character_id)
+
+
+def create_battle_state_manager(backend: str | None = None) -> BattleStateManager:
+    """settings.battle_state_backend (redis | memory) 에 맞는 구현"""
+    backend = backend or settings.battle_state_backend
+    if backend == "redis":
+        from adapters.redis.battle_state import RedisBattleStateManager
+        return RedisBattleStateManager()
+    if backend == "memory":
+        from adapters.memory.battle_state import InMemoryBattleStateManager
+        return InMemoryBattleStateManager()
+    raise ValueError(f"Unknown battle state backend: {backend}")
+
+
+# 싱글톤 인스턴스
+battle_state_manager = create_battle_state_manager()
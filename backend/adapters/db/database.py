@@ -1,33 +1,69 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import get_settings
+from .instrumentation import instrument_engine
+from .pool import pool_options, prewarm_pool, name_pool
+from .replica import ReplicaRouter
 
 settings = get_settings()
 
 engine = create_async_engine(
     settings.database_url,
-    echo=True,
-    pool_pre_ping=True,
+    echo=settings.db_echo,
+    **pool_options(),
 )
+name_pool(engine, "primary")
+instrument_engine(engine)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Optional read replica for ranking/profile reads
+replica_engine = None
+ReplicaSessionLocal = None
+if settings.database_replica_url:
+    replica_engine = create_async_engine(
+        settings.database_replica_url,
+        echo=settings.db_echo,
+        **pool_options(),
+    )
+    name_pool(replica_engine, "replica")
+    instrument_engine(replica_engine)
+    ReplicaSessionLocal = sessionmaker(
+        replica_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+replica_router = ReplicaRouter(replica_engine)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
-from sqlalchemy import create_engine
-
-def init_db():
-    """Create tables synchronously to avoid asyncpg startup issues on Windows."""
-    # Create sync engine temporarily
-    sync_db_url = settings.database_url.replace("postgresql+asyncpg", "postgresql+psycopg2")
-    sync_engine = create_engine(sync_db_url, echo=True)
-    
-    # Create tables
-    Base.metadata.create_all(bind=sync_engine)
-    print("Tables created successfully (Sync Mode).")
+
+async def open_read_session(user_id=None) -> AsyncSession:
+    """Replica session when it is configured, caught up and `user_id` hasn't just written; else primary."""
+    if await replica_router.use_replica(user_id):
+        return ReplicaSessionLocal()
+    return AsyncSessionLocal()
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """Session bound to the read replica (its rows may lag the primary)."""
+    return replica_engine is not None and session.bind is replica_engine
+
+
+async def get_read_db():
+    """Session for read-only endpoints (routed to the replica when possible)."""
+    async with await open_read_session() as session:
+        yield session
+
+
+async def warm_up_db():
+    """Pre-open pooled connections so the first burst of requests doesn't pay connect latency."""
+    if settings.db_pool_prewarm:
+        await prewarm_pool(engine)
+        if replica_engine is not None:
+            await prewarm_pool(replica_engine)
@@ -0,0 +1,212 @@
+"""SQLAlchemy 쿼리 계측 (slow query log + 요청/소켓 이벤트별 쿼리 예산)
+
+engine echo 대신 cursor execute 이벤트로 각 statement 를 측정한다.
+- 모든 쿼리의 횟수/지연시간을 전역 metrics 에 누적
+- 임계값을 넘는 쿼리는 파라미터를 가린 채로 slow query 로그에 기록
+- HTTP 요청/소켓 이벤트 단위(scope)로 쿼리 수를 세서 예산 초과 시 경고 (N+1 탐지)
+"""
+import contextvars
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Latency histogram upper bounds (ms); the last bucket is +Inf
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Keep per-scope aggregates bounded even if routes/events are unexpectedly dynamic
+MAX_TRACKED_SCOPES = 256
+
+
+@dataclass
+class QueryScope:
+    """Queries issued while handling one HTTP request or socket event."""
+    name: str
+    count: int = 0
+    total_ms: float = 0.0
+    statements: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ScopeTotals:
+    calls: int = 0
+    queries: int = 0
+    total_ms: float = 0.0
+    max_queries: int = 0
+    over_budget: int = 0
+
+
+class QueryMetrics:
+    """Process-wide query counters exported through the metrics endpoint."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total_queries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_queries = 0
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.scopes: dict[str, ScopeTotals] = {}
+
+    def observe(self, elapsed_ms: float, slow: bool):
+        self.total_queries += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if slow:
+            self.slow_queries += 1
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def observe_scope(self, scope: QueryScope, over_budget: bool):
+        totals = self.scopes.get(scope.name)
+        if totals is None:
+            if len(self.scopes) >= MAX_TRACKED_SCOPES:
+                return
+            totals = self.scopes[scope.name] = ScopeTotals()
+        totals.calls += 1
+        totals.queries += scope.count
+        totals.total_ms += scope.total_ms
+        totals.max_queries = max(totals.max_queries, scope.count)
+        if over_budget:
+            totals.over_budget += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        buckets = {f"le_{bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)}
+        buckets["le_inf"] = self.buckets[-1]
+        return {
+            "total_queries": self.total_queries,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.total_queries, 3) if self.total_queries else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "slow_queries": self.slow_queries,
+            "errors": self.errors,
+            "slow_query_threshold_ms": settings.db_slow_query_ms,
+            "query_budget": settings.db_query_budget,
+            "latency_buckets": buckets,
+            "scopes": {
+                name: {
+                    "calls": t.calls,
+                    "avg_queries": round(t.queries / t.calls, 2) if t.calls else 0.0,
+                    "max_queries": t.max_queries,
+                    "avg_ms": round(t.total_ms / t.calls, 3) if t.calls else 0.0,
+                    "over_budget": t.over_budget,
+                }
+                for name, t in sorted(self.scopes.items(), key=lambda kv: -kv[1].queries)
+            },
+        }
+
+
+query_metrics = QueryMetrics()
+
+_current_scope: contextvars.ContextVar[Optional[QueryScope]] = contextvars.ContextVar(
+    "db_query_scope", default=None
+)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Replace bound values with their type names so PII/tokens never hit the log."""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: show the first row's shape and the batch size
+            return [redact_parameters(parameters[0]), f"... x{len(parameters)}"]
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return "<redacted>"
+
+
+def _statement_key(statement: str) -> str:
+    """First line of the statement, trimmed; good enough to spot repeated queries."""
+    return " ".join(statement.split())[:120]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    slow = elapsed_ms >= settings.db_slow_query_ms
+    query_metrics.observe(elapsed_ms, slow)
+
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.count += 1
+        scope.total_ms += elapsed_ms
+        key = _statement_key(statement)
+        scope.statements[key] = scope.statements.get(key, 0) + 1
+
+    if slow:
+        logger.warning(
+            f"🐢 Slow query ({elapsed_ms:.1f}ms"
+            f"{f', scope={scope.name}' if scope else ''}): "
+            f"{' '.join(statement.split())} | params={redact_parameters(parameters)}"
+        )
+
+
+def _handle_error(exception_context):
+    query_metrics.errors += 1
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Attach timing listeners to an async engine (listeners live on the sync engine)."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _finish_scope(scope: QueryScope):
+    over_budget = scope.count > settings.db_query_budget
+    query_metrics.observe_scope(scope, over_budget)
+    if over_budget:
+        repeated = {stmt: n for stmt, n in scope.statements.items() if n > 1}
+        logger.warning(
+            f"⚠️ Query budget exceeded in {scope.name}: {scope.count} queries "
+            f"(budget {settings.db_query_budget}, {scope.total_ms:.1f}ms)"
+            f"{f' repeated={repeated}' if repeated else ''}"
+        )
+
+
+@contextmanager
+def query_scope(name: str):
+    """Count queries issued inside this block (one HTTP request / socket event)."""
+    scope = QueryScope(name=name)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        _finish_scope(scope)
+
+
+def instrument_socket_handler(event_name: str, handler):
+    """Wrap a socket.io handler so its DB queries are counted under `socket:<event>`."""
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        with query_scope(f"socket:{event_name}"):
+            return await handler(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,111 @@
+"""유저 배치 로더 (DataLoader 패턴)
+
+같은 이벤트 루프 tick 안에서 들어온 단건 조회 요청들을 모아
+프로필 캐시(LRU -> Redis MGET) 확인 후 남은 id 만 `WHERE id = ANY(...)` 한 번으로 조회한다.
+DB 에도 없는 id 는 아직 저장되지 않은 게스트일 수 있으므로 게스트 레코드(MGET)를 확인한다.
+
+    p1, p2 = await asyncio.gather(user_loader.load(id1), user_loader.load(id2))  # 쿼리 최대 1회
+"""
+import asyncio
+import logging
+from typing import Any, Optional
+from uuid import UUID
+
+from adapters.background import spawn
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.repository import UserRepository
+from adapters.redis.guest_store import guest_store
+from adapters.redis.profile_cache import profile_cache, CachedUser
+
+logger = logging.getLogger(__name__)
+
+
+class UserLoader:
+    """user_id -> CachedUser, 동시 요청을 한 번의 조회로 합침"""
+
+    def __init__(self, max_batch_size: int = 500):
+        self.max_batch_size = max_batch_size
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._scheduled = False
+        self.batches = 0
+        self.keys_loaded = 0
+        self.db_queries = 0
+
+    async def load(self, user_id) -> Optional[CachedUser]:
+        """단건 조회 (캐시/DB 에 없으면 None)"""
+        if user_id is None:
+            return None
+        key = str(UUID(str(user_id)))
+
+        # LRU 적중은 배치를 기다릴 필요 없음
+        cached = profile_cache.get_local(key)
+        if cached is not None:
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append(future)
+        if not self._scheduled:
+            self._scheduled = True
+            # 현재 tick 에 이미 준비된 다른 태스크들의 load() 가 먼저 쌓이도록 다음 tick 에 dispatch
+            asyncio.get_running_loop().call_soon(self._dispatch)
+        return await future
+
+    async def load_many(self, user_ids) -> dict[str, CachedUser]:
+        """여러 건 조회 -> {str(user_id): CachedUser} (없는 id 는 빠짐)"""
+        ids = list(dict.fromkeys(str(uid) for uid in user_ids if uid is not None))
+        users = await asyncio.gather(*(self.load(uid) for uid in ids))
+        return {uid: user for uid, user in zip(ids, users) if user is not None}
+
+    def _dispatch(self):
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for i in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[i:i + self.max_batch_size]}
+            spawn(self._fetch(batch))
+
+    async def _fetch(self, batch: dict[str, list[asyncio.Future]]):
+        self.batches += 1
+        self.keys_loaded += len(batch)
+        try:
+            found = await profile_cache.get_many(list(batch))
+            missing = [key for key in batch if key not in found]
+            if missing:
+                self.db_queries += 1
+                # SELECT 전에 읽어 둔 generation 이 그 사이 바뀐 유저는 캐시에 채우지 않음
+                generations = await profile_cache.generations(missing)
+                async with AsyncSessionLocal() as db:
+                    users = await UserRepository(db).get_many(missing)
+                for cached in await profile_cache.fill_many(users, generations):
+                    found[str(cached.id)] = cached
+                missing = [key for key in missing if key not in found]
+                if missing:
+                    # 게스트는 프로필 캐시에 넣지 않음 (승격되면 users 행이 기준)
+                    try:
+                        found.update(await guest_store.get_many(missing))
+                    except Exception as e:
+                        logger.warning(f"Guest lookup failed: {e}")
+        except Exception as e:
+            logger.warning(f"UserLoader batch of {len(batch)} failed: {e}")
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(key))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "keys_loaded": self.keys_loaded,
+            "avg_batch_size": round(self.keys_loaded / self.batches, 2) if self.batches else 0.0,
+            "db_queries": self.db_queries,
+        }
+
+
+# 싱글톤 인스턴스
+user_loader = UserLoader()
@@ -0,0 +1,124 @@
+"""경기 기록 버퍼 배치 insert
+
+배틀이 끝날 때마다 INSERT 트랜잭션을 하나씩 여는 대신 메모리 버퍼에 모았다가
+batch_size 에 도달하거나 flush_interval 이 지나면 한 번에 insert 한다.
+큐로 정산되는 랭크 매치는 여기를 거치지 않고 정산 consumer 가 실제 ELO 변화량으로 같은 트랜잭션에서 insert 한다.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any
+
+from adapters.background import spawn
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.repository import MatchRepository
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# DB 장애가 길어져도 메모리가 무한히 늘지 않도록 버퍼 상한
+MAX_BUFFERED_MATCHES = 10000
+
+
+def match_row(
+    battle_id: str,
+    player1_id,
+    player2_id,
+    winner_id=None,
+    player1_character_id: str | None = None,
+    player2_character_id: str | None = None,
+    is_ranked: bool = False,
+    turns: int = 0,
+    duration_seconds: float = 0.0,
+    player1_elo_change: int = 0,
+    player2_elo_change: int = 0,
+    ended_at: datetime | str | None = None,
+) -> dict[str, Any]:
+    """MatchModel 컬럼 dict (MatchRepository.insert_many 입력). ended_at 은 ISO 문자열도 허용 (큐 메시지)"""
+    if isinstance(ended_at, str):
+        ended_at = datetime.fromisoformat(ended_at)
+    return {
+        "id": uuid.uuid4(),
+        "battle_id": battle_id,
+        "player1_id": uuid.UUID(str(player1_id)),
+        "player2_id": uuid.UUID(str(player2_id)),
+        "winner_id": uuid.UUID(str(winner_id)) if winner_id else None,
+        "player1_character_id": player1_character_id,
+        "player2_character_id": player2_character_id,
+        "is_ranked": is_ranked,
+        "turns": turns,
+        "duration_seconds": duration_seconds,
+        "player1_elo_change": player1_elo_change,
+        "player2_elo_change": player2_elo_change,
+        "ended_at": ended_at or datetime.utcnow(),
+    }
+
+
+class MatchHistoryWriter:
+    """완료된 배틀을 모아서 배치 insert"""
+
+    def __init__(self):
+        self.buffer: list[dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+
+    def add(self, **match):
+        """버퍼에 추가 (await 불필요, 인자는 match_row 와 같음). batch_size 에 도달하면 백그라운드 flush"""
+        if len(self.buffer) >= MAX_BUFFERED_MATCHES:
+            self.dropped += 1
+            logger.error(f"Match history buffer full, dropping {match.get('battle_id')}")
+            return
+
+        self.buffer.append(match_row(**match))
+        if len(self.buffer) >= settings.match_history_batch_size:
+            spawn(self.flush())
+
+    async def flush(self):
+        """버퍼 전체를 한 트랜잭션으로 insert. 실패하면 버퍼 앞쪽으로 되돌려 다음 flush 에서 재시도"""
+        async with self._flush_lock:
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, []
+            try:
+                async with AsyncSessionLocal() as db:
+                    inserted = await MatchRepository(db).insert_many(batch)
+                self.flushes += 1
+                self.written += inserted
+                logger.info(f"📝 Match history flushed: {inserted}/{len(batch)} inserted")
+            except Exception as e:
+                logger.warning(f"Match history flush of {len(batch)} failed, will retry: {e}")
+                retry = batch + self.buffer
+                overflow = len(retry) - MAX_BUFFERED_MATCHES
+                if overflow > 0:
+                    # 상한을 넘으면 가장 오래된 것부터 버림
+                    self.dropped += overflow
+                    logger.error(f"Match history buffer full, dropping {overflow} oldest matches "
+                                 f"({retry[0]['battle_id']} .. {retry[overflow - 1]['battle_id']})")
+                    retry = retry[overflow:]
+                self.buffer = retry
+
+    async def run(self):
+        """flush_interval 마다 flush (백그라운드 태스크). 취소 시 남은 버퍼를 flush"""
+        try:
+            while True:
+                await asyncio.sleep(settings.match_history_flush_seconds)
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "buffered": len(self.buffer),
+            "flushes": self.flushes,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+# 싱글톤 인스턴스
+match_history_writer = MatchHistoryWriter()
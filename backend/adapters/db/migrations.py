@@ -0,0 +1,248 @@
+"""버전 기반 스키마 마이그레이션
+
+schema_migrations 테이블에 적용된 버전을 기록한다.
+- 서버 시작 시에는 check_schema() 로 현재 버전만 확인 (쿼리 1회, DDL 없음)
+- 마이그레이션 적용은 명시적인 명령으로만: python scripts/migrate_db.py upgrade
+- 여러 프로세스가 동시에 실행해도 advisory lock 으로 한 번만 적용
+
+새 마이그레이션은 MIGRATIONS 끝에 다음 버전으로 추가한다 (모델 수정과 함께).
+- 이미 적용된 마이그레이션은 고치지 않는다. baseline(1)도 도입 시점 스키마를 DDL 로 고정한 것이라
+  모델이 바뀌어도 그대로 둔다 (모델에서 만들면 새 DB 가 이후 마이그레이션을 건너뛴 스키마가 됨)
+- 마이그레이션 도입 전부터 있던 DB 에도 적용되므로 IF NOT EXISTS 등으로 멱등하게 작성한다
+- CREATE INDEX CONCURRENTLY 는 _concurrent_index 로 (중단되어 INVALID 로 남은 인덱스는 지우고 다시 만든다)
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import get_settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# pg_advisory_lock 키 (마이그레이션 동시 실행 방지)
+MIGRATION_LOCK_ID = 7_240_118
+
+CREATE_VERSION_TABLE_SQL = text("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+""")
+
+CURRENT_VERSION_SQL = text("SELECT max(version) FROM schema_migrations")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    statements: list[str] = field(default_factory=list)
+    run: Optional[Callable[[AsyncConnection], Awaitable[None]]] = None
+    # CREATE INDEX CONCURRENTLY 처럼 트랜잭션 안에서 실행할 수 없는 DDL
+    transactional: bool = True
+
+
+INDEX_VALID_SQL = text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)")
+
+
+def _concurrent_index(name: str, definition: str) -> Callable[[AsyncConnection], Awaitable[None]]:
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS (transactional=False 마이그레이션용).
+    CONCURRENTLY 생성이 실패하면 INVALID 인덱스가 남고 IF NOT EXISTS 는 그것을 그대로 두므로,
+    INVALID 이면 먼저 지운다.
+    """
+    async def run(conn: AsyncConnection):
+        valid = (await conn.execute(INDEX_VALID_SQL, {"name": name})).scalar()
+        if valid is False:
+            logger.warning(f"Index {name} is INVALID (interrupted concurrent build), rebuilding")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+    return run
+
+
+MIGRATIONS: list[Migration] = [
+    # 마이그레이션 도입 시점의 스키마 (고정, models.py 와 별개).
+    # users.main_character_id 와 랭킹 인덱스는 그 전부터 따로 붙이던 것이라 2, 3 에서 만든다
+    Migration(1, "baseline", statements=[
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id UUID PRIMARY KEY,
+            email VARCHAR,
+            google_id VARCHAR,
+            nickname VARCHAR,
+            elo_rating INTEGER,
+            wins INTEGER,
+            losses INTEGER,
+            avatar_url VARCHAR,
+            created_at TIMESTAMP
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_google_id ON users (google_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_nickname ON users (nickname)",
+        """
+        CREATE TABLE IF NOT EXISTS matches (
+            id UUID PRIMARY KEY,
+            battle_id VARCHAR NOT NULL UNIQUE,
+            player1_id UUID NOT NULL,
+            player2_id UUID NOT NULL,
+            player1_character_id VARCHAR,
+            player2_character_id VARCHAR,
+            winner_id UUID,
+            is_ranked BOOLEAN,
+            turns INTEGER,
+            duration_seconds FLOAT,
+            player1_elo_change INTEGER,
+            player2_elo_change INTEGER,
+            ended_at TIMESTAMP NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS match_players (
+            match_id UUID NOT NULL REFERENCES matches (id) ON DELETE CASCADE,
+            user_id UUID NOT NULL,
+            opponent_id UUID NOT NULL,
+            character_id VARCHAR,
+            opponent_character_id VARCHAR,
+            is_winner BOOLEAN,
+            elo_change INTEGER,
+            ended_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (match_id, user_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_match_players_user_ended ON match_players (user_id, ended_at DESC)",
+    ]),
+    Migration(2, "users.main_character_id", statements=[
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS main_character_id VARCHAR DEFAULT 'char_000'",
+    ]),
+    Migration(3, "users ranking index", transactional=False,
+              run=_concurrent_index("ix_users_elo_rating_id", "ON users (elo_rating DESC, id DESC)")),
+    Migration(4, "battle_events", statements=[
+        """
+        CREATE TABLE IF NOT EXISTS battle_events (
+            battle_id VARCHAR NOT NULL,
+            seq INTEGER NOT NULL,
+            event_id VARCHAR NOT NULL,
+            event_type VARCHAR NOT NULL,
+            data JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (battle_id, seq)
+        )
+        """,
+    ]),
+    Migration(5, "settled_matches", statements=[
+        """
+        CREATE TABLE IF NOT EXISTS settled_matches (
+            battle_id VARCHAR PRIMARY KEY,
+            winner_id UUID NOT NULL,
+            loser_id UUID NOT NULL,
+            winner_change INTEGER,
+            loser_change INTEGER,
+            settled_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+    ]),
+    # seq(스트림 안 위치)는 MAXLEN trim 뒤 다시 보관하면 다른 이벤트를 가리키므로 스트림 id 로 dedupe
+    Migration(6, "battle_events keyed by event_id", statements=[
+        """
+        DELETE FROM battle_events a USING battle_events b
+        WHERE a.battle_id = b.battle_id AND a.event_id = b.event_id AND a.seq > b.seq
+        """,
+        "ALTER TABLE battle_events DROP CONSTRAINT battle_events_pkey",
+        "ALTER TABLE battle_events DROP COLUMN seq",
+        "ALTER TABLE battle_events ADD PRIMARY KEY (battle_id, event_id)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_current_version() -> Optional[int]:
+    """적용된 최신 버전 (schema_migrations 가 없으면 None)"""
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(CURRENT_VERSION_SQL)).scalar()
+    except ProgrammingError:
+        # relation "schema_migrations" does not exist
+        return None
+
+
+async def check_schema():
+    """서버 시작 시 스키마 버전 확인 (DDL 없이 쿼리 1회)"""
+    version = await get_current_version()
+    if version is None or version < LATEST_VERSION:
+        message = (
+            f"Database schema is at version {version or 0}, expected {LATEST_VERSION}. "
+            f"Run `python scripts/migrate_db.py upgrade`."
+        )
+        if settings.db_require_schema:
+            raise RuntimeError(message)
+        logger.error(message)
+        return
+    if version > LATEST_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this code ({LATEST_VERSION})")
+    logger.info(f"✅ Database schema version {version}")
+
+
+async def _apply(migration: Migration):
+    if migration.transactional:
+        async with engine.begin() as conn:
+            await _run(conn, migration)
+            await _record(conn, migration)
+        return
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await _run(conn, migration)
+        await _record(conn, migration)
+
+
+async def _run(conn: AsyncConnection, migration: Migration):
+    for statement in migration.statements:
+        await conn.execute(text(statement))
+    if migration.run is not None:
+        await migration.run(conn)
+
+
+async def _record(conn: AsyncConnection, migration: Migration):
+    await conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name) ON CONFLICT DO NOTHING"),
+        {"version": migration.version, "name": migration.name},
+    )
+
+
+async def upgrade(target: Optional[int] = None) -> list[Migration]:
+    """target 버전(기본: 최신)까지 아직 적용되지 않은 마이그레이션을 순서대로 적용"""
+    target = target or LATEST_VERSION
+    applied_now = []
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            await lock_conn.execute(CREATE_VERSION_TABLE_SQL)
+            rows = await lock_conn.execute(text("SELECT version FROM schema_migrations"))
+            applied = {row.version for row in rows}
+
+            for migration in MIGRATIONS:
+                if migration.version in applied or migration.version > target:
+                    continue
+                logger.info(f"Applying migration {migration.version}: {migration.name}")
+                await _apply(migration)
+                applied_now.append(migration)
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    return applied_now
+
+
+async def status() -> tuple[Optional[int], list[Migration]]:
+    """(현재 버전, 적용 대기 중인 마이그레이션)"""
+    version = await get_current_version()
+    pending = [m for m in MIGRATIONS if m.version > (version or 0)]
+    return version, pending
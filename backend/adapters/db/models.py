@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Float, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 import uuid
 from .database import Base
@@ -17,3 +17,69 @@ class UserModel(Base):
     main_character_id = Column(String, default="char_000")
     avatar_url = Column(String, default="/assets/avatars/default.png")
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # 랭킹 keyset 페이지네이션: ORDER BY elo_rating DESC, id DESC
+        Index("ix_users_elo_rating_id", elo_rating.desc(), id.desc()),
+    )
+
+
+class MatchModel(Base):
+    """완료된 배틀 기록"""
+    __tablename__ = "matches"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    battle_id = Column(String, unique=True, nullable=False)  # 멱등 키 (중복 insert 무시)
+    player1_id = Column(UUID(as_uuid=True), nullable=False)
+    player2_id = Column(UUID(as_uuid=True), nullable=False)
+    player1_character_id = Column(String, nullable=True)
+    player2_character_id = Column(String, nullable=True)
+    winner_id = Column(UUID(as_uuid=True), nullable=True)
+    is_ranked = Column(Boolean, default=False)
+    turns = Column(Integer, default=0)
+    duration_seconds = Column(Float, default=0.0)
+    player1_elo_change = Column(Integer, default=0)
+    player2_elo_change = Column(Integer, default=0)
+    ended_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SettledMatchModel(Base):
+    """ELO 정산이 끝난 battle_id (정산 UPDATE 와 같은 트랜잭션에서 insert 하는 멱등 키)"""
+    __tablename__ = "settled_matches"
+
+    battle_id = Column(String, primary_key=True)
+    winner_id = Column(UUID(as_uuid=True), nullable=False)
+    loser_id = Column(UUID(as_uuid=True), nullable=False)
+    winner_change = Column(Integer, nullable=True)
+    loser_change = Column(Integer, nullable=True)
+    settled_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class MatchPlayerModel(Base):
+    """유저별 전적 조회용 (user_id, ended_at) 인덱스 테이블"""
+    __tablename__ = "match_players"
+
+    match_id = Column(UUID(as_uuid=True), ForeignKey("matches.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    opponent_id = Column(UUID(as_uuid=True), nullable=False)
+    character_id = Column(String, nullable=True)
+    opponent_character_id = Column(String, nullable=True)
+    is_winner = Column(Boolean, default=False)
+    elo_change = Column(Integer, default=0)
+    ended_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_match_players_user_ended", user_id, ended_at.desc()),
+    )
+
+
+class BattleEventModel(Base):
+    """배틀 이벤트 로그 보관본 (배틀 종료 시 Redis Stream 에서 일괄 insert)"""
+    __tablename__ = "battle_events"
+
+    battle_id = Column(String, primary_key=True)
+    # 원본 스트림 id ("<ms>-<seq>"): 스트림 안에서 유일하고 순서를 가지므로 재보관/trim 후에도 같은 이벤트를 가리킨다
+    event_id = Column(String, primary_key=True)
+    event_type = Column(String, nullable=False)
+    data = Column(JSONB, nullable=False, default=dict)
+    created_at = Column(DateTime, nullable=False)
@@ -0,0 +1,144 @@
+"""DB 커넥션 풀 설정 + 텔레메트리
+
+배틀 종료가 몰릴 때 풀이 고갈되면 원인 모를 지연 대신
+대기 시간 / overflow / timeout 으로 드러나도록 풀 checkout 을 계측한다.
+통계는 풀(엔진)마다 따로 둔다 (primary / replica 구분).
+"""
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Checkout waits longer than this are logged as pool pressure
+SLOW_CHECKOUT_MS = 100.0
+
+
+class PoolMetrics:
+    """Checkout wait times and exhaustion counters for one engine pool."""
+
+    def __init__(self, name: str = "primary"):
+        self.name = name
+        self.checkouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.slow_checkouts = 0
+        self.overflow_hits = 0
+        self.timeouts = 0
+
+    def observe(self, wait_ms: float, overflowed: bool):
+        self.checkouts += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        if wait_ms >= SLOW_CHECKOUT_MS:
+            self.slow_checkouts += 1
+        if overflowed:
+            self.overflow_hits += 1
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited (per pool)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # dispose() 등으로 풀이 새로 만들어져도 같은 통계를 이어서 쓴다
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            logger.error(
+                f"🚨 DB pool ({self.metrics.name}) exhausted: no connection within {self._timeout}s "
+                f"({self.status()})"
+            )
+            raise
+        wait_ms = (time.perf_counter() - start) * 1000
+        overflowed = self.checkedout() > self.size()
+        self.metrics.observe(wait_ms, overflowed)
+        if wait_ms >= SLOW_CHECKOUT_MS:
+            logger.warning(f"⏳ DB pool ({self.metrics.name}) checkout waited {wait_ms:.1f}ms ({self.status()})")
+        return conn
+
+
+def name_pool(engine: AsyncEngine, name: str):
+    """Label the engine's pool metrics (shown in logs and /metrics/db/pool)."""
+    engine.pool.metrics.name = name
+
+
+def pool_options() -> dict[str, Any]:
+    """create_async_engine kwargs for the configured pool."""
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
+async def prewarm_pool(engine: AsyncEngine, count: int | None = None):
+    """Open `count` connections at once so the first burst doesn't pay connect latency."""
+    count = settings.db_pool_size if count is None else count
+    if count <= 0:
+        return
+
+    release = asyncio.Event()
+    opened = 0
+
+    async def hold():
+        nonlocal opened
+        async with engine.connect():
+            opened += 1
+            await release.wait()
+
+    tasks = [asyncio.create_task(hold()) for _ in range(count)]
+    # Let every task check out its connection, then hand them all back to the pool
+    while opened + sum(t.done() for t in tasks) < count:
+        await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning(f"DB pool prewarm: {len(failures)}/{count} connections failed ({failures[0]})")
+    logger.info(f"DB pool prewarmed with {count - len(failures)} connections")
+
+
+def pool_snapshot(engine: AsyncEngine) -> dict[str, Any]:
+    """Live pool state plus cumulative checkout telemetry for this engine's pool."""
+    pool = engine.pool
+    pool_metrics = pool.metrics
+    checkouts = pool_metrics.checkouts
+    return {
+        "name": pool_metrics.name,
+        "size": pool.size(),
+        "max_overflow": settings.db_max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_s": settings.db_pool_timeout,
+        "recycle_s": settings.db_pool_recycle,
+        "checkouts": checkouts,
+        "avg_wait_ms": round(pool_metrics.total_wait_ms / checkouts, 3) if checkouts else 0.0,
+        "max_wait_ms": round(pool_metrics.max_wait_ms, 3),
+        "slow_checkouts": pool_metrics.slow_checkouts,
+        "overflow_hits": pool_metrics.overflow_hits,
+        "timeouts": pool_metrics.timeouts,
+    }
@@ -0,0 +1,110 @@
+"""Read replica 라우팅
+
+DATABASE_REPLICA_URL 이 설정되면 읽기 전용 조회(랭킹, 유저 수, 순위, 프로필)를 replica 로 보낸다.
+- replica 지연이 replica_max_lag_seconds 를 넘거나 확인에 실패하면 primary 로 fallback
+- standby 가 아닌 서버(pg_is_in_recovery() = false)는 replica 로 취급하지 않음
+- 방금 쓰기를 한 유저의 읽기는 잠시 primary 에 고정 (read-your-own-write)
+  (워커 프로세스 단위 기록 - 다른 워커의 쓰기 직후에는 profile cache 가 최신값을 제공.
+   그래서 replica 에서 읽은 행은 공유 profile cache 에 채우지 않는다)
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# replica 에서 실행: 마지막으로 적용된 트랜잭션 이후 경과 시간(초).
+# 받은 WAL 을 모두 적용했다면(primary 가 idle) 0.
+# standby 가 아니면(복제를 받지 않는 독립 서버 - 스키마/데이터가 다를 수 있음) NULL -> 라우팅하지 않음
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# 지연 값을 다시 확인하는 주기(초)
+LAG_CHECK_INTERVAL = 2.0
+
+
+class ReplicaRouter:
+    """replica 사용 가능 여부 판단 + 최근 쓰기 유저 추적"""
+
+    def __init__(self, replica_engine: Optional[AsyncEngine]):
+        self.replica_engine = replica_engine
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._recent_writes: dict[str, float] = {}
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica_engine is not None
+
+    def note_write(self, *user_ids):
+        """이 유저들의 읽기를 max_lag 동안 primary 로 보냄"""
+        if not self.enabled:
+            return
+        until = time.monotonic() + settings.replica_max_lag_seconds
+        for user_id in user_ids:
+            self._recent_writes[str(user_id)] = until
+        # 오래된 항목 정리 (가끔만)
+        if len(self._recent_writes) > 10000:
+            now = time.monotonic()
+            self._recent_writes = {k: v for k, v in self._recent_writes.items() if v > now}
+
+    def wrote_recently(self, user_id) -> bool:
+        until = self._recent_writes.get(str(user_id))
+        return until is not None and until > time.monotonic()
+
+    async def _refresh_lag(self):
+        async with self._lock:
+            if time.monotonic() - self.checked_at < LAG_CHECK_INTERVAL:
+                return
+            try:
+                async with self.replica_engine.connect() as conn:
+                    lag = (await conn.execute(REPLICA_LAG_SQL)).scalar()
+                if lag is None:
+                    if self.lag_seconds is not None or not self.checked_at:
+                        logger.warning("Replica database is not a standby (pg_is_in_recovery() = false), routing reads to primary")
+                    self.lag_seconds = None
+                else:
+                    self.lag_seconds = float(lag)
+            except Exception as e:
+                logger.warning(f"Replica lag check failed, routing reads to primary: {e}")
+                self.lag_seconds = None
+            self.checked_at = time.monotonic()
+
+    async def use_replica(self, user_id=None) -> bool:
+        """이번 읽기를 replica 로 보내도 되는지"""
+        if not self.enabled:
+            return False
+        if user_id is not None and self.wrote_recently(user_id):
+            self.primary_fallbacks += 1
+            return False
+        if time.monotonic() - self.checked_at >= LAG_CHECK_INTERVAL:
+            await self._refresh_lag()
+        if self.lag_seconds is None or self.lag_seconds > settings.replica_max_lag_seconds:
+            self.primary_fallbacks += 1
+            return False
+        self.replica_reads += 1
+        return True
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": settings.replica_max_lag_seconds,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
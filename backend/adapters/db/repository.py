@@ -1,7 +1,122 @@
+import logging
+from dataclasses import dataclass
+from typing import AsyncIterator
+from uuid import UUID, uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, desc
-from .models import UserModel
+from sqlalchemy import func, desc, text, bindparam, tuple_, update, any_, case, exists, literal, String, BigInteger
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, ARRAY
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .models import UserModel, MatchModel, MatchPlayerModel, BattleEventModel, SettledMatchModel
+from .database import replica_router, is_replica_session
+from adapters.redis.leaderboard import leaderboard
+from adapters.redis.user_stats import user_stats, ELO_BUCKET_WIDTH
+from adapters.redis.profile_cache import profile_cache, CachedUser
+from domain.entities import ELO_K_FACTOR
+
+logger = logging.getLogger(__name__)
+
+# 두 플레이어 행을 id 순서로 잠그고(데드락 방지), 잠긴 현재 레이팅으로 ELO 변화량을 계산해
+# 두 행의 elo_rating / wins / losses 를 한 번에 갱신한다. (단일 statement = 단일 round trip)
+# 변화량은 Python int() 와 같이 0 방향으로 버림(trunc) - domain.entities.calculate_elo_changes 와 동일.
+SETTLE_MATCH_SQL = text("""
+    WITH locked AS (
+        SELECT id, elo_rating FROM users
+        WHERE id IN (:winner_id, :loser_id)
+        ORDER BY id
+        FOR UPDATE
+    ),
+    deltas AS (
+        SELECT
+            trunc(CAST(:k AS integer) * (1 - 1 / (1 + power(10, (l.elo_rating - w.elo_rating) / 400.0))))::int AS winner_change,
+            trunc(CAST(:k AS integer) * (0 - 1 / (1 + power(10, (w.elo_rating - l.elo_rating) / 400.0))))::int AS loser_change
+        FROM locked w, locked l
+        WHERE w.id = :winner_id AND l.id = :loser_id
+    )
+    UPDATE users u SET
+        elo_rating = u.elo_rating + CASE WHEN u.id = :winner_id THEN d.winner_change ELSE d.loser_change END,
+        wins = u.wins + CASE WHEN u.id = :winner_id THEN 1 ELSE 0 END,
+        losses = u.losses + CASE WHEN u.id = :loser_id THEN 1 ELSE 0 END
+    FROM deltas d
+    WHERE u.id IN (:winner_id, :loser_id)
+    RETURNING u.id, u.nickname, u.elo_rating, u.wins, u.losses, d.winner_change, d.loser_change
+""").bindparams(
+    bindparam("winner_id", type_=PG_UUID(as_uuid=True)),
+    bindparam("loser_id", type_=PG_UUID(as_uuid=True)),
+)
+
+# 한 번도 쓰이지 않은 게스트 행(소셜 계정 없음, 전적/프로필 변경 없음)을 배치 단위로 삭제.
+# SKIP LOCKED: 동시에 승격/갱신 중인 행은 건너뜀
+PRUNE_STALE_GUESTS_SQL = text("""
+    DELETE FROM users WHERE id IN (
+        SELECT u.id FROM users u
+        WHERE u.google_id IS NULL
+          AND u.email IS NULL
+          AND u.wins = 0 AND u.losses = 0
+          AND u.nickname LIKE '마법소녀\\_%'
+          AND u.main_character_id = 'char_000'
+          AND u.avatar_url = '/assets/avatars/default.png'
+          AND u.created_at < :cutoff
+          AND NOT EXISTS (SELECT 1 FROM match_players mp WHERE mp.user_id = u.id)
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id
+""")
+
+
+@dataclass
+class MatchSettlement:
+    """Result of settling a ranked match (ratings are post-update values)."""
+    winner_id: UUID
+    loser_id: UUID
+    winner_nickname: str
+    loser_nickname: str
+    winner_elo: int
+    loser_elo: int
+    winner_change: int
+    loser_change: int
+
+
+async def sync_leaderboard(ratings: dict):
+    """Write-through rating changes to the Redis leaderboard (never fails the DB write)."""
+    try:
+        await leaderboard.update_many(ratings)
+    except Exception as e:
+        logger.warning(f"Leaderboard write-through failed for {list(ratings)}: {e}")
+
+
+async def sync_user_stats(created_rating: int | None = None, rating_changes: list[tuple[int, int, bool]] = ()):
+    """Incrementally update cached user counts / ELO histogram (drift is fixed by reconcile)."""
+    try:
+        if created_rating is not None:
+            await user_stats.on_user_created(created_rating)
+        if rating_changes:
+            await user_stats.on_rating_changed(list(rating_changes))
+    except Exception as e:
+        logger.warning(f"User stats update failed: {e}")
+
+
+def available_nickname(nickname: str, seed: str):
+    """
+    INSERT 의 nickname 값으로 쓰는 SQL 식.
+    nickname -> nickname_<seed 앞 6자> -> nickname_<랜덤 8자> 순으로 비어있는 값을 고른다.
+    """
+    suffixed = f"{nickname}_{seed[:6]}"
+
+    def taken(value: str):
+        return exists().where(UserModel.nickname == value)
+
+    return case(
+        (~taken(nickname), literal(nickname, String)),
+        (~taken(suffixed), literal(suffixed, String)),
+        else_=literal(f"{nickname}_", String) + func.substr(
+            func.md5(literal(seed, String) + func.clock_timestamp().cast(String)), 1, 8
+        ),
+    )
+
 
 class UserRepository:
     def __init__(self, db: AsyncSession):
@@ -15,41 +130,176 @@ class UserRepository:
         result = await self.db.execute(select(UserModel).filter(UserModel.nickname == nickname))
         return result.scalars().first()
 
+    async def _insert_user(self, build_stmt, attempts: int = 3):
+        """
+        INSERT ... RETURNING 한 번으로 행을 받아옴 (refresh round trip 없음).
+        동시 가입이 같은 닉네임을 동시에 잡은 경우에만 unique 위반이 나므로 다시 시도한다.
+        """
+        for attempt in range(attempts):
+            try:
+                result = await self.db.execute(build_stmt())
+                user = result.scalars().first()
+                await self.db.commit()
+                return user
+            except IntegrityError:
+                await self.db.rollback()
+                if attempt == attempts - 1:
+                    raise
+
+    async def _on_user_created(self, user):
+        await sync_leaderboard({user.id: user.elo_rating})
+        await sync_user_stats(created_rating=user.elo_rating)
+        await profile_cache.set(user)
+        replica_router.note_write(user.id)
+
     async def create_user(self, nickname: str, google_id: str = None, email: str = None, avatar_url: str = None):
-        user = UserModel(
-            nickname=nickname,
-            google_id=google_id,
-            email=email,
-            avatar_url=avatar_url or "/assets/avatars/default.png"
-        )
-        self.db.add(user)
-        await self.db.commit()
-        await self.db.refresh(user)
+        """닉네임이 이미 있으면 SQL 안에서 접미사를 붙여 insert"""
+        def build():
+            user_id = uuid4()
+            return (
+                pg_insert(UserModel)
+                .values(
+                    id=user_id,
+                    nickname=available_nickname(nickname, user_id.hex),
+                    google_id=google_id,
+                    email=email,
+                    avatar_url=avatar_url or "/assets/avatars/default.png",
+                )
+                .returning(UserModel)
+            )
+
+        user = await self._insert_user(build)
+        await self._on_user_created(user)
         return user
-    
+
+    async def upsert_google_user(self, google_id: str, nickname: str, email: str = None, avatar_url: str = None):
+        """
+        google_id 로 로그인/가입을 한 statement 로 처리 -> (user, created)
+        INSERT ... ON CONFLICT (google_id) DO UPDATE ... RETURNING 은 기존 행이든 새 행이든 항상 행을 돌려준다.
+        """
+        new_id = uuid4()
+
+        def build():
+            stmt = pg_insert(UserModel).values(
+                id=new_id,
+                nickname=available_nickname(nickname, google_id),
+                google_id=google_id,
+                email=email,
+                avatar_url=avatar_url or "/assets/avatars/default.png",
+            )
+            # no-op update: DO NOTHING 은 기존 행을 RETURNING 하지 않음
+            return stmt.on_conflict_do_update(
+                index_elements=[UserModel.google_id],
+                set_={"google_id": stmt.excluded.google_id},
+            ).returning(UserModel)
+
+        user = await self._insert_user(build)
+        created = user.id == new_id
+        if created:
+            await self._on_user_created(user)
+        return user, created
+
+    async def create_from_guest(self, guest: CachedUser):
+        """Redis 게스트 레코드를 같은 id 의 users 행으로 저장 (이미 저장된 id 면 None)"""
+        def build():
+            return (
+                pg_insert(UserModel)
+                .values(
+                    id=guest.id,
+                    nickname=available_nickname(guest.nickname, guest.id.hex),
+                    elo_rating=guest.elo_rating,
+                    wins=guest.wins,
+                    losses=guest.losses,
+                    main_character_id=guest.main_character_id,
+                    avatar_url=guest.avatar_url,
+                    created_at=guest.created_at,
+                )
+                .on_conflict_do_nothing(index_elements=[UserModel.id])
+                .returning(UserModel)
+            )
+
+        user = await self._insert_user(build)
+        if user:
+            await self._on_user_created(user)
+        return user
+
+    async def prune_stale_guests(self, cutoff: datetime, batch_size: int = 1000) -> list[UUID]:
+        """cutoff 이전에 만들어지고 한 번도 쓰이지 않은 게스트 행을 최대 batch_size 개 삭제"""
+        result = await self.db.execute(PRUNE_STALE_GUESTS_SQL, {"cutoff": cutoff, "batch_size": batch_size})
+        user_ids = [row.id for row in result]
+        await self.db.commit()
+        if user_ids:
+            try:
+                await leaderboard.remove(*user_ids)
+            except Exception as e:
+                logger.warning(f"Leaderboard cleanup failed for pruned guests: {e}")
+            await profile_cache.invalidate(*user_ids)
+        return user_ids
+
     async def get_by_id(self, user_id):
         result = await self.db.execute(select(UserModel).filter(UserModel.id == user_id))
         return result.scalars().first()
 
-    async def update_main_character(self, user_id, character_id: str):
-        # user_id can be UUID or str
+    async def get_profile(self, user_id) -> CachedUser | None:
+        """
+        Read-through cached profile (process LRU -> Redis -> DB).
+        Read-only: use get_by_id when the row is going to be modified.
+        Rows read from the replica are not cached (they may lag the primary), and
+        the fill is skipped if the user was written after the generation was read.
+        """
+        cached = await profile_cache.get(user_id)
+        if cached is not None:
+            return cached
+        replica = is_replica_session(self.db)
+        generations = None if replica else await profile_cache.generations([user_id])
         user = await self.get_by_id(user_id)
+        if user is None:
+            return None
+        if replica:
+            return CachedUser.from_model(user)
+        return await profile_cache.fill(user, generations)
+
+    async def get_many(self, user_ids) -> list[UserModel]:
+        """
+        Fetch several users in one `WHERE id = ANY(:ids)` query
+        (order not guaranteed, missing ids skipped).
+        """
+        ids = list({UUID(str(uid)) for uid in user_ids})
+        if not ids:
+            return []
+        ids_param = bindparam("ids", value=ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+        result = await self.db.execute(select(UserModel).filter(UserModel.id == any_(ids_param)))
+        return result.scalars().all()
+
+    async def _update_returning(self, user_id, **values):
+        """UPDATE ... RETURNING in one round trip, then refresh the profile cache."""
+        result = await self.db.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(**values)
+            .returning(UserModel)
+            .execution_options(synchronize_session=False)
+        )
+        user = result.scalars().first()
+        await self.db.commit()
         if user:
-            user.main_character_id = character_id
-            await self.db.commit()
-            await self.db.refresh(user)
+            await profile_cache.set(user)
+            replica_router.note_write(user.id)
         return user
+
+    async def update_main_character(self, user_id, character_id: str):
+        # user_id can be UUID or str
+        return await self._update_returning(user_id, main_character_id=character_id)
     
     async def update_profile(self, user_id, nickname: str = None, avatar_url: str = None):
-        user = await self.get_by_id(user_id)
-        if user:
-            if nickname:
-                user.nickname = nickname
-            if avatar_url:
-                user.avatar_url = avatar_url
-            await self.db.commit()
-            await self.db.refresh(user)
-        return user
+        values = {}
+        if nickname:
+            values["nickname"] = nickname
+        if avatar_url:
+            values["avatar_url"] = avatar_url
+        if not values:
+            return await self.get_by_id(user_id)
+        return await self._update_returning(user_id, **values)
 
     # ---- Ranking Methods ----
     
@@ -57,11 +307,23 @@ class UserRepository:
         """Get top ranked users from database, ordered by elo_rating DESC."""
         result = await self.db.execute(
             select(UserModel)
-            .order_by(desc(UserModel.elo_rating))
+            .order_by(desc(UserModel.elo_rating), desc(UserModel.id))
             .offset(offset)
             .limit(limit)
         )
         return result.scalars().all()
+
+    async def get_rankings_after(self, limit: int = 10, after: tuple[int, UUID] | None = None):
+        """
+        Keyset page of rankings: users strictly after (elo_rating, id) in
+        (elo_rating DESC, id DESC) order. Served by ix_users_elo_rating_id,
+        so the cost is the same for any depth.
+        """
+        query = select(UserModel).order_by(desc(UserModel.elo_rating), desc(UserModel.id)).limit(limit)
+        if after is not None:
+            query = query.filter(tuple_(UserModel.elo_rating, UserModel.id) < tuple_(*after))
+        result = await self.db.execute(query)
+        return result.scalars().all()
     
     async def get_total_users_count(self) -> int:
         """Get total count of all users in database."""
@@ -72,23 +334,239 @@ class UserRepository:
         """Update user's ELO rating and win/loss counts in database."""
         user = await self.get_by_id(user_id)
         if user:
+            old_rating = user.elo_rating
+            first_game = user.wins + user.losses == 0 and wins_delta + losses_delta > 0
             user.elo_rating = new_rating
             user.wins += wins_delta
             user.losses += losses_delta
             await self.db.commit()
             await self.db.refresh(user)
+            await sync_leaderboard({user.id: user.elo_rating})
+            await sync_user_stats(rating_changes=[(old_rating, user.elo_rating, first_game)])
+            await profile_cache.set(user)
+            replica_router.note_write(user.id)
         return user
 
+    async def claim_settlement(self, battle_id: str, winner_id: UUID, loser_id: UUID) -> bool:
+        """
+        Insert the battle's settled_matches row without committing. Returns
+        False if it was already settled. Call settle_match(battle_id=...) next
+        in the same session so the marker commits (or rolls back) with the
+        rating update.
+        """
+        result = await self.db.execute(
+            pg_insert(SettledMatchModel)
+            .values(battle_id=battle_id, winner_id=winner_id, loser_id=loser_id, settled_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[SettledMatchModel.battle_id])
+            .returning(SettledMatchModel.battle_id)
+        )
+        return result.first() is not None
+
+    async def settle_match(
+        self,
+        winner_id: UUID,
+        loser_id: UUID,
+        k: int = ELO_K_FACTOR,
+        battle_id: str | None = None,
+        history: dict | None = None,
+    ) -> MatchSettlement | None:
+        """
+        Apply a match result to both players atomically in one statement.
+        Returns None if either player does not exist (nothing is updated,
+        including a settlement claimed for battle_id).
+        history (a MatchModel column dict) is inserted in the same transaction
+        with the actual rating changes.
+        """
+        if winner_id == loser_id:
+            await self.db.rollback()
+            return None
+
+        result = await self.db.execute(
+            SETTLE_MATCH_SQL,
+            {"winner_id": winner_id, "loser_id": loser_id, "k": k}
+        )
+        rows = {row.id: row for row in result}
+        if len(rows) != 2:
+            await self.db.rollback()
+            return None
+        if battle_id is not None:
+            await self.db.execute(
+                update(SettledMatchModel)
+                .where(SettledMatchModel.battle_id == battle_id)
+                .values(winner_change=rows[winner_id].winner_change, loser_change=rows[winner_id].loser_change)
+            )
+        if history is not None:
+            changes = {winner_id: rows[winner_id].winner_change, loser_id: rows[winner_id].loser_change}
+            await MatchRepository(self.db).insert_many([{
+                **history,
+                "player1_elo_change": changes.get(history["player1_id"], 0),
+                "player2_elo_change": changes.get(history["player2_id"], 0),
+            }], commit=False)
+        await self.db.commit()
+
+        await profile_cache.invalidate(winner_id, loser_id)
+        replica_router.note_write(winner_id, loser_id)
+        winner, loser = rows[winner_id], rows[loser_id]
+        await sync_leaderboard({winner_id: winner.elo_rating, loser_id: loser.elo_rating})
+        await sync_user_stats(rating_changes=[
+            (winner.elo_rating - winner.winner_change, winner.elo_rating, winner.wins + winner.losses == 1),
+            (loser.elo_rating - loser.loser_change, loser.elo_rating, loser.wins + loser.losses == 1),
+        ])
+        return MatchSettlement(
+            winner_id=winner_id,
+            loser_id=loser_id,
+            winner_nickname=winner.nickname,
+            loser_nickname=loser.nickname,
+            winner_elo=winner.elo_rating,
+            loser_elo=loser.elo_rating,
+            winner_change=winner.winner_change,
+            loser_change=winner.loser_change,
+        )
+
     async def get_user_rank(self, user_id) -> int:
         """Get user's rank based on ELO rating."""
         # elo_rating이 현재 유저보다 높은 유저의 수를 셈
-        user = await self.get_by_id(user_id)
+        user = await self.get_profile(user_id)
         if not user:
             return 0
-        
+        return await self.count_rated_above(user.elo_rating) + 1
+
+    async def count_rated_above(self, elo_rating: int) -> int:
+        """Number of users with a strictly higher rating (ties share a rank)."""
         result = await self.db.execute(
             select(func.count(UserModel.id))
-            .filter(UserModel.elo_rating > user.elo_rating)
+            .filter(UserModel.elo_rating > elo_rating)
+        )
+        return result.scalar() or 0
+
+    async def iter_ratings(self, batch_size: int = 5000) -> AsyncIterator[list[tuple[str, int]]]:
+        """Stream (user_id, elo_rating) in id order, batch by batch (keyset, no OFFSET)."""
+        last_id = None
+        while True:
+            query = select(UserModel.id, UserModel.elo_rating).order_by(UserModel.id).limit(batch_size)
+            if last_id is not None:
+                query = query.filter(UserModel.id > last_id)
+            rows = (await self.db.execute(query)).all()
+            if not rows:
+                return
+            yield [(str(row.id), row.elo_rating) for row in rows]
+            last_id = rows[-1].id
+
+    async def get_user_stats(self) -> tuple[int, int, dict[int, int]]:
+        """
+        (total, ranked, elo_histogram) in one aggregate query, for reconciliation.
+        ranked = users who have played at least one game.
+        """
+        bucket = (func.floor(UserModel.elo_rating / ELO_BUCKET_WIDTH) * ELO_BUCKET_WIDTH).label("bucket")
+        result = await self.db.execute(
+            select(
+                bucket,
+                func.count(UserModel.id),
+                func.count(UserModel.id).filter(UserModel.wins + UserModel.losses > 0),
+            ).group_by(bucket)
+        )
+        total = ranked = 0
+        histogram = {}
+        for bucket_start, count, ranked_count in result.all():
+            histogram[int(bucket_start)] = count
+            total += count
+            ranked += ranked_count
+        return total, ranked, histogram
+
+
+class MatchRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def insert_many(self, matches: list[dict], commit: bool = True) -> int:
+        """
+        Insert finished matches (MatchModel column dicts) and their per-player
+        rows in two multi-row statements and one commit (none with
+        commit=False, for callers that own the transaction). Matches whose
+        battle_id already exists are skipped. Returns the number inserted.
+        """
+        if not matches:
+            return 0
+        result = await self.db.execute(
+            pg_insert(MatchModel)
+            .values(matches)
+            .on_conflict_do_nothing(index_elements=[MatchModel.battle_id])
+            .returning(MatchModel.id)
+        )
+        inserted = {row.id for row in result}
+
+        players = []
+        for match in matches:
+            if match["id"] not in inserted:
+                continue
+            sides = (
+                ("player1_id", "player2_id", "player1_character_id", "player2_character_id", "player1_elo_change"),
+                ("player2_id", "player1_id", "player2_character_id", "player1_character_id", "player2_elo_change"),
+            )
+            for user_key, opponent_key, char_key, opponent_char_key, elo_key in sides:
+                players.append({
+                    "match_id": match["id"],
+                    "user_id": match[user_key],
+                    "opponent_id": match[opponent_key],
+                    "character_id": match.get(char_key),
+                    "opponent_character_id": match.get(opponent_char_key),
+                    "is_winner": match.get("winner_id") == match[user_key],
+                    "elo_change": match.get(elo_key, 0),
+                    "ended_at": match["ended_at"],
+                })
+        if players:
+            await self.db.execute(pg_insert(MatchPlayerModel).values(players))
+        if commit:
+            await self.db.commit()
+        return len(inserted)
+
+    async def get_user_history(self, user_id: UUID, limit: int = 20, before: datetime | None = None):
+        """A user's matches, newest first, keyset-paginated on ended_at."""
+        query = (
+            select(MatchPlayerModel, MatchModel.turns, MatchModel.duration_seconds, MatchModel.is_ranked, MatchModel.battle_id)
+            .join(MatchModel, MatchModel.id == MatchPlayerModel.match_id)
+            .filter(MatchPlayerModel.user_id == user_id)
+            .order_by(desc(MatchPlayerModel.ended_at))
+            .limit(limit)
+        )
+        if before is not None:
+            query = query.filter(MatchPlayerModel.ended_at < before)
+        result = await self.db.execute(query)
+        return result.all()
+
+
+class BattleEventRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def insert_many(self, events: list[dict]) -> int:
+        """
+        Archive a battle's events (BattleEventModel column dicts) in one
+        multi-row insert. Rows already archived (same battle_id, event_id) are
+        skipped, so re-archiving a battle - even after the stream was trimmed -
+        only adds the new events. Returns the number inserted.
+        """
+        if not events:
+            return 0
+        result = await self.db.execute(
+            pg_insert(BattleEventModel)
+            .values(events)
+            .on_conflict_do_nothing(index_elements=[BattleEventModel.battle_id, BattleEventModel.event_id])
+            .returning(BattleEventModel.event_id)
+        )
+        inserted = len(result.all())
+        await self.db.commit()
+        return inserted
+
+    async def list_events(self, battle_id: str) -> list[BattleEventModel]:
+        """A battle's archived events in stream order (bounded by battle_event_maxlen)."""
+        # stream ids are "<ms>-<seq>": compare numerically ("10" sorts before "9" as text)
+        result = await self.db.execute(
+            select(BattleEventModel)
+            .filter(BattleEventModel.battle_id == battle_id)
+            .order_by(
+                func.split_part(BattleEventModel.event_id, "-", 1).cast(BigInteger),
+                func.split_part(BattleEventModel.event_id, "-", 2).cast(BigInteger),
+            )
         )
-        higher_rank_count = result.scalar() or 0
-        return higher_rank_count + 1
+        return list(result.scalars().all())
@@ -0,0 +1 @@
+# In-process adapters (single node / tests)
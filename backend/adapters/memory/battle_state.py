@@ -0,0 +1,132 @@
+"""프로세스 메모리 배틀 상태 저장소 (BATTLE_STATE_BACKEND=memory)
+
+단일 노드 배포, 로컬 개발, 테스트, 벤치마크 기준선용. Redis 서버가 필요 없다.
+- 워커 프로세스마다 따로 저장하므로 워커가 하나일 때만 사용
+- 모든 연산은 await 없이 읽고-바꾸고-쓰므로 이벤트 루프 안에서 원자적 (Lua 스크립트와 같은 의미)
+- TTL 은 마지막 쓰기 기준 BATTLE_TTL_SECONDS. 쓰기 순서 = 만료 순서라서 쓸 때마다 앞에서부터 만료된 것만 정리
+"""
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Callable, Optional
+
+from adapters.battle_state import BattleState, BattleStateManager, BATTLE_TTL_SECONDS
+
+
+class InMemoryBattleStateManager(BattleStateManager):
+    """dict 기반 배틀 상태 관리 (Redis 구현과 같은 update_hp / mutate 의미)"""
+
+    def __init__(self, ttl_seconds: float = BATTLE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        # battle_id -> (만료 시각, 상태), 마지막 쓰기 순서
+        self.battles: OrderedDict[str, tuple[float, BattleState]] = OrderedDict()
+        self.expired = 0
+
+    def _get(self, battle_id: str) -> Optional[BattleState]:
+        entry = self.battles.get(battle_id)
+        if entry is None:
+            return None
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            del self.battles[battle_id]
+            self.expired += 1
+            return None
+        return state
+
+    def _put(self, state: BattleState):
+        now = time.monotonic()
+        self.battles[state.battle_id] = (now + self.ttl_seconds, state)
+        self.battles.move_to_end(state.battle_id)
+        while self.battles:
+            battle_id, (expires_at, _) = next(iter(self.battles.items()))
+            if expires_at >= now:
+                break
+            del self.battles[battle_id]
+            self.expired += 1
+
+    async def create_battle(self, battle_id: str, player1_id: str, player2_id: str, is_ranked: bool = False) -> BattleState:
+        """새 배틀 세션 생성"""
+        state = BattleState(
+            battle_id=battle_id,
+            player1_id=player1_id,
+            player2_id=player2_id,
+            status="character_select",
+            is_ranked=is_ranked,
+            started_at=time.time()
+        )
+        self._put(state)
+        return state
+
+    async def get_battle(self, battle_id: str) -> Optional[BattleState]:
+        """배틀 상태 조회"""
+        return self._get(battle_id)
+
+    async def update_hp(self, battle_id: str, player_id: str, damage: int) -> Optional[dict]:
+        """플레이어 HP 업데이트 및 새 상태 반환 (UPDATE_HP_SCRIPT 와 같은 규칙)"""
+        state = self._get(battle_id)
+        if state is None:
+            return None
+
+        winner_id = None
+        if state.status != "finished":
+            player1_hp, player2_hp = state.player1_hp, state.player2_hp
+            player1_missed, player2_missed = state.player1_missed, state.player2_missed
+            if str(player_id) == state.player1_id:
+                player2_hp = max(0, player2_hp - int(damage))
+                player1_missed = 0
+            elif str(player_id) == state.player2_id:
+                player1_hp = max(0, player1_hp - int(damage))
+                player2_missed = 0
+
+            status = state.status
+            if player1_hp <= 0:
+                status, winner_id = "finished", state.player2_id
+            elif player2_hp <= 0:
+                status, winner_id = "finished", state.player1_id
+
+            state = replace(
+                state,
+                player1_hp=player1_hp,
+                player2_hp=player2_hp,
+                player1_missed=player1_missed,
+                player2_missed=player2_missed,
+                status=status,
+                current_turn=2 if state.current_turn == 1 else 1,
+                turns=state.turns + 1,
+                version=state.version + 1,
+            )
+            self._put(state)
+
+        return {
+            "player1_hp": state.player1_hp,
+            "player2_hp": state.player2_hp,
+            "current_turn": state.current_turn,
+            "status": state.status,
+            "winner_id": winner_id,
+            "version": state.version,
+            "state": state if winner_id else None,
+        }
+
+    async def mutate(self, battle_id: str, change: Callable[[BattleState], Optional[BattleState]]) -> Optional[BattleState]:
+        """change(현재 상태) 결과 저장 (충돌이 없으므로 재시도 없음)"""
+        current = self._get(battle_id)
+        if current is None:
+            return None
+        updated = change(current)
+        if updated is None:
+            return current
+        updated = replace(updated, version=current.version + 1)
+        self._put(updated)
+        return updated
+
+    async def delete_battle(self, battle_id: str):
+        """배틀 세션 삭제 (게임 종료 시)"""
+        self.battles.pop(battle_id, None)
+        print(f"🗑️ Battle session deleted: {battle_id}")
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "backend": "memory",
+            "battles": len(self.battles),
+            "expired": self.expired,
+        }
@@ -0,0 +1,93 @@
+"""ELO 버킷 매칭 대기열 (프로세스 메모리)
+
+대기 중인 유저를 rating // bucket_width 버킷에 나눠 담는다 (버킷 안은 들어온 순서).
+- 추가 / 취소: dict 연산 O(1)
+- 매칭: 내 버킷에서 시작해 바깥쪽 버킷으로 넓혀 가며 본다. 볼 버킷 수는 window_max / bucket_width,
+  버킷마다 오래 기다린 순으로 최대 candidates 명만 보므로 대기 인원 n 과 무관
+- 허용 rating 차이는 두 사람 중 오래 기다린 쪽의 대기 시간으로 정한다 (rating_window)
+
+Redis 구현(adapters/redis/socket_state.py MATCH_SCRIPT)과 같은 규칙.
+"""
+from itertools import islice
+from typing import Optional
+
+from adapters.socket.state import QueueEntry, rating_window
+
+
+class EloBucketQueue:
+    def __init__(self, bucket_width: int, window_max: float, candidates: int):
+        self.bucket_width = max(1, bucket_width)
+        self.window_max = window_max
+        self.candidates = max(1, candidates)
+        # sid -> entry (들어온 순서 = 오래 기다린 순서)
+        self.entries: dict[str, QueueEntry] = {}
+        # bucket -> {sid: entry} (들어온 순서)
+        self.buckets: dict[int, dict[str, QueueEntry]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self.entries
+
+    def _bucket(self, rating: float) -> int:
+        return int(rating // self.bucket_width)
+
+    def add(self, sid: str, rating: float, now: float) -> bool:
+        if sid in self.entries:
+            return False
+        entry = QueueEntry(sid, float(rating), now)
+        self.entries[sid] = entry
+        self.buckets.setdefault(self._bucket(entry.rating), {})[sid] = entry
+        return True
+
+    def remove(self, sid: str) -> Optional[QueueEntry]:
+        entry = self.entries.pop(sid, None)
+        if entry is None:
+            return None
+        bucket = self._bucket(entry.rating)
+        members = self.buckets[bucket]
+        del members[sid]
+        if not members:
+            del self.buckets[bucket]
+        return entry
+
+    def find(self, sid: str, now: float) -> Optional[QueueEntry]:
+        """허용 범위 안에서 rating 차이가 가장 작은 상대 (같으면 오래 기다린 쪽)"""
+        entry = self.entries.get(sid)
+        if entry is None:
+            return None
+        home = self._bucket(entry.rating)
+        best, best_key = None, None
+        distance = 0
+        # distance 칸 떨어진 버킷의 rating 차이는 최소 (distance - 1) * bucket_width
+        while (distance - 1) * self.bucket_width <= min(self.window_max, best_key[0] if best else self.window_max):
+            for bucket in {home - distance, home + distance}:
+                for other in islice(self.buckets.get(bucket, {}).values(), self.candidates + 1):
+                    if other.sid == sid:
+                        continue
+                    gap = abs(other.rating - entry.rating)
+                    key = (gap, other.joined_at)
+                    if best_key is not None and key >= best_key:
+                        continue
+                    if gap > rating_window(now - min(entry.joined_at, other.joined_at)):
+                        continue
+                    best, best_key = other, key
+            distance += 1
+        return best
+
+    def match(self, sid: str, now: float) -> Optional[tuple[QueueEntry, QueueEntry]]:
+        opponent = self.find(sid, now)
+        if opponent is None:
+            return None
+        return self.remove(sid), self.remove(opponent.sid)
+
+    def sweep(self, now: float, limit: int) -> list[tuple[QueueEntry, QueueEntry]]:
+        """가장 오래 기다린 limit 명부터 다시 매칭 시도"""
+        pairs = []
+        for entry in list(islice(self.entries.values(), limit)):
+            if entry.sid in self.entries:
+                pair = self.match(entry.sid, now)
+                if pair:
+                    pairs.append(pair)
+        return pairs
@@ -0,0 +1,87 @@
+"""접속 / 방 멤버 인덱스 (프로세스 메모리)
+
+정방향과 역방향 인덱스를 같이 갱신해서 조회가 전체 유저 / 전체 방 스캔이 되지 않게 한다.
+- sid -> 유저 정보
+- user_id -> sid 집합 (재접속 시 남은 sid 찾기, 방장 닉네임 찾기)
+- sid -> 방 집합 (disconnect 시 들어가 있던 방 찾기)
+- room_id -> 멤버 sid (dict 키 = 입장 순서를 유지하는 집합)
+
+모든 연산은 O(1) (목록을 돌려주는 조회만 결과 크기에 비례).
+유저 정보를 지워도 방 멤버십은 남는다 (재접속 grace period 동안 방을 유지하기 위해).
+"""
+from typing import Any, Optional
+
+
+class PresenceRegistry:
+    def __init__(self):
+        self.users: dict[str, dict[str, Any]] = {}
+        self.user_sids: dict[str, set[str]] = {}
+        self.sid_rooms: dict[str, set[str]] = {}
+        self.rooms: dict[str, dict[str, None]] = {}
+
+    # ---- 접속 유저 ----
+
+    def add_user(self, sid: str, info: dict[str, Any]):
+        self.remove_user(sid)
+        self.users[sid] = info
+        self.user_sids.setdefault(str(info.get("user_id")), set()).add(sid)
+
+    def remove_user(self, sid: str) -> Optional[dict[str, Any]]:
+        info = self.users.pop(sid, None)
+        if info is None:
+            return None
+        user_id = str(info.get("user_id"))
+        sids = self.user_sids.get(user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.user_sids[user_id]
+        return info
+
+    def get_user(self, sid: str) -> Optional[dict[str, Any]]:
+        return self.users.get(sid)
+
+    def sids_for_user(self, user_id: str) -> list[str]:
+        return list(self.user_sids.get(str(user_id), ()))
+
+    def find_user(self, user_id: str) -> Optional[dict[str, Any]]:
+        for sid in self.user_sids.get(str(user_id), ()):
+            return self.users[sid]
+        return None
+
+    # ---- 방 멤버 ----
+
+    def join_room(self, room_id: str, sid: str) -> bool:
+        members = self.rooms.setdefault(room_id, {})
+        if sid in members:
+            return False
+        members[sid] = None
+        self.sid_rooms.setdefault(sid, set()).add(room_id)
+        return True
+
+    def leave_room(self, room_id: str, sid: str) -> bool:
+        members = self.rooms.get(room_id)
+        if members is None or sid not in members:
+            return False
+        del members[sid]
+        if not members:
+            del self.rooms[room_id]
+        rooms = self.sid_rooms[sid]
+        rooms.discard(room_id)
+        if not rooms:
+            del self.sid_rooms[sid]
+        return True
+
+    def room_members(self, room_id: str) -> list[str]:
+        return list(self.rooms.get(room_id, ()))
+
+    def rooms_of(self, sid: str) -> list[str]:
+        return list(self.sid_rooms.get(sid, ()))
+
+    def snapshot(self) -> dict[str, int]:
+        return {
+            "connected": len(self.users),
+            "users": len(self.user_sids),
+            "rooms": len(self.rooms),
+            "sids_in_rooms": len(self.sid_rooms),
+        }
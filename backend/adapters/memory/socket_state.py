@@ -0,0 +1,118 @@
+"""프로세스 메모리 소켓 레지스트리 (워커 하나일 때)"""
+import time
+from typing import Any, Optional
+
+from adapters.memory.matchmaking import EloBucketQueue
+from adapters.memory.presence import PresenceRegistry
+from adapters.socket.state import QueueEntry, SocketState
+from config import get_settings
+
+settings = get_settings()
+
+
+class InMemorySocketState(SocketState):
+    def __init__(self):
+        # Connected users / room members with forward and reverse indexes
+        self.presence = PresenceRegistry()
+        # Matchmaking queue: waiting sids bucketed by ELO
+        self.waiting_queue = EloBucketQueue(
+            settings.matchmaking_bucket_width,
+            settings.matchmaking_window_max,
+            settings.matchmaking_candidates,
+        )
+        # Battle ready tracking: room_id -> {battle_id, players, player_ids, first_turn_player_id, members}
+        self.battle_ready_data: dict[str, dict[str, Any]] = {}
+        # Background votes: room_id -> {user_id: background_id}
+        self.background_votes: dict[str, dict[str, str]] = {}
+        # Pending disconnects for grace period: user_id -> {sid, user_info, rooms}
+        self.pending_disconnects: dict[str, dict[str, Any]] = {}
+
+    async def add_user(self, sid: str, info: dict[str, Any]):
+        self.presence.add_user(sid, info)
+
+    async def remove_user(self, sid: str) -> Optional[dict[str, Any]]:
+        return self.presence.remove_user(sid)
+
+    async def get_user(self, sid: str) -> dict[str, Any]:
+        return self.presence.get_user(sid) or {}
+
+    async def get_users(self, sids: list[str]) -> dict[str, dict[str, Any]]:
+        users = self.presence.users
+        return {sid: users[sid] for sid in sids if sid in users}
+
+    async def sids_for_user(self, user_id: str) -> list[str]:
+        return self.presence.sids_for_user(user_id)
+
+    async def find_user(self, user_id: str) -> Optional[dict[str, Any]]:
+        return self.presence.find_user(user_id)
+
+    async def user_count(self) -> int:
+        return len(self.presence.users)
+
+    async def join_room(self, room_id: str, sid: str) -> bool:
+        return self.presence.join_room(room_id, sid)
+
+    async def leave_room(self, room_id: str, sid: str):
+        self.presence.leave_room(room_id, sid)
+
+    async def room_members(self, room_id: str) -> list[str]:
+        return self.presence.room_members(room_id)
+
+    async def rooms_of(self, sid: str) -> list[str]:
+        return self.presence.rooms_of(sid)
+
+    async def queue_add(self, sid: str, rating: float) -> bool:
+        return self.waiting_queue.add(sid, rating, time.time())
+
+    async def queue_contains(self, sid: str) -> bool:
+        return sid in self.waiting_queue
+
+    async def queue_match(self, sid: str) -> Optional[tuple[QueueEntry, QueueEntry]]:
+        return self.waiting_queue.match(sid, time.time())
+
+    async def queue_sweep(self, limit: int) -> list[tuple[QueueEntry, QueueEntry]]:
+        return self.waiting_queue.sweep(time.time(), limit)
+
+    async def queue_remove(self, sid: str) -> bool:
+        return self.waiting_queue.remove(sid) is not None
+
+    async def queue_size(self) -> int:
+        return len(self.waiting_queue)
+
+    async def set_battle_ready(self, room_id: str, data: dict[str, Any]):
+        self.battle_ready_data[room_id] = data
+
+    async def get_battle_ready(self, room_id: str) -> Optional[dict[str, Any]]:
+        return self.battle_ready_data.get(room_id)
+
+    async def update_battle_ready(self, room_id: str, **fields) -> bool:
+        data = self.battle_ready_data.get(room_id)
+        if data is None:
+            return False
+        data.update(fields)
+        return True
+
+    async def add_background_vote(self, room_id: str, user_id: str, background_id: str) -> dict[str, str]:
+        votes = self.background_votes.setdefault(room_id, {})
+        votes[user_id] = background_id
+        return dict(votes)
+
+    async def clear_background_votes(self, room_id: str):
+        self.background_votes.pop(room_id, None)
+
+    async def set_pending_disconnect(self, user_id: str, data: dict[str, Any]):
+        self.pending_disconnects[user_id] = data
+
+    async def pop_pending_disconnect(self, user_id: str, sid: Optional[str] = None) -> Optional[dict[str, Any]]:
+        pending = self.pending_disconnects.get(user_id)
+        if pending is None or (sid is not None and pending.get("sid") != sid):
+            return None
+        return self.pending_disconnects.pop(user_id)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "backend": "memory",
+            **self.presence.snapshot(),
+            "queued": len(self.waiting_queue),
+            "pending_disconnects": len(self.pending_disconnects),
+        }
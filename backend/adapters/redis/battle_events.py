@@ -0,0 +1,104 @@
+"""배틀 이벤트 로그 (배틀마다 Redis Stream 하나)
+
+캐릭터 선택, 공격(데미지 상세), 턴 변경, 결과를 battle_events:{battle_id} 스트림에 XADD 한다.
+- 스트림 길이는 battle_event_maxlen 으로 제한 (MAXLEN ~)
+- 재접속한 클라이언트는 마지막으로 받은 이벤트 id 이후만 조회 (XRANGE 배타적 시작)
+- 배틀이 끝나면 use_cases/battle_event_service.py 가 Postgres 로 일괄 보관하고 TTL 을 줄인다
+"""
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from adapters.redis.client import get_redis, pipeline
+from adapters.battle_state import BATTLE_TTL_SECONDS
+from config import get_settings
+
+settings = get_settings()
+
+# 이벤트 종류
+CHARACTER_PICK = "character_pick"
+ATTACK = "attack"
+TURN_CHANGE = "turn_change"
+RESULT = "result"
+
+
+@dataclass
+class BattleEvent:
+    event_id: str  # 스트림 id ("<ms>-<seq>")
+    type: str
+    data: dict[str, Any] = field(default_factory=dict)
+    ts: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"event_id": self.event_id, "type": self.type, "data": self.data, "ts": self.ts}
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class BattleEventLog:
+    """배틀별 이벤트 스트림 (XADD / XRANGE)"""
+
+    def __init__(self):
+        self.redis_client = None
+        self.prefix = "battle_events:"
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+        return self.redis_client
+
+    def key(self, battle_id: str) -> str:
+        return f"{self.prefix}{battle_id}"
+
+    async def append(self, battle_id: str, *events: tuple[str, dict[str, Any]]) -> list[str]:
+        """(type, data) 이벤트들을 순서대로 추가하고 이벤트 id 목록 반환 (한 round trip)"""
+        if not events:
+            return []
+        key = self.key(battle_id)
+        now = time.time()
+        pipe = pipeline()
+        for event_type, data in events:
+            pipe.xadd(
+                key,
+                {"type": event_type, "data": json.dumps(data, ensure_ascii=False, default=str), "ts": now},
+                maxlen=settings.battle_event_maxlen,
+                approximate=True,
+            )
+        # 배틀 상태와 같은 수명 (마지막 이벤트 기준)
+        pipe.expire(key, BATTLE_TTL_SECONDS)
+        results = await pipe.execute()
+        return [_text(event_id) for event_id in results[:-1]]
+
+    @staticmethod
+    def _parse(event_id, fields) -> BattleEvent:
+        data = {_text(k): _text(v) for k, v in fields.items()}
+        return BattleEvent(
+            event_id=_text(event_id),
+            type=data.get("type", ""),
+            data=json.loads(data.get("data") or "{}"),
+            ts=float(data.get("ts") or 0),
+        )
+
+    async def read_after(self, battle_id: str, last_event_id: Optional[str] = None, count: Optional[int] = None) -> list[BattleEvent]:
+        """last_event_id 이후의 이벤트 (없으면 처음부터)"""
+        await self.connect()
+        start = f"({last_event_id}" if last_event_id else "-"
+        entries = await self.redis_client.xrange(self.key(battle_id), min=start, max="+", count=count)
+        return [self._parse(event_id, fields) for event_id, fields in entries]
+
+    async def exists(self, battle_id: str) -> bool:
+        await self.connect()
+        return bool(await self.redis_client.exists(self.key(battle_id)))
+
+    async def expire(self, battle_id: str, seconds: int):
+        """보관이 끝난 스트림은 재접속 resync 용으로만 잠시 유지"""
+        await self.connect()
+        await self.redis_client.expire(self.key(battle_id), seconds)
+
+
+# 싱글톤 인스턴스
+battle_event_log = BattleEventLog()
@@ -1,145 +1,367 @@
-"""Redis 기반 배틀 세션 관리"""
-import redis.asyncio as redis
-import json
-from typing import Optional
-from dataclasses import dataclass, asdict
+"""Redis 기반 배틀 세션 관리
+
+배틀 상태는 battle:{battle_id} 키 하나에 codec 으로 인코딩한 값으로 저장한다.
+- binary (기본): 버전 바이트 + 고정 struct 헤더 + 길이 prefix 문자열
+- json: 이전 형식 (디버깅/비교용)
+공격(HP 감소 -> 0 클램프 -> 승자 판정 -> 턴 전환 -> TTL 갱신)은 Lua 스크립트 하나로 처리해서
+공격 1회 = Redis round trip 1회이고, 동시에 들어온 공격도 서로 덮어쓰지 않는다.
+스크립트는 저장된 값의 첫 바이트로 형식을 판별하고 같은 형식으로 다시 쓴다.
+
+워커 프로세스마다 활성 배틀의 write-through 캐시를 둔다 (Redis 가 원본).
+- 모든 쓰기는 상태의 version 을 1 올리고, 읽기는 캐시에서 (짧은 TTL)
+- 공격 스크립트는 캐시의 version 을 받아 다르면 최신 전체 상태를 같이 돌려줌 (stale 갱신)
+- 그 외 쓰기는 version compare-and-set, 충돌하면 최신 상태로 갱신 후 재시도
+
+BattleState / codec / 인터페이스 / 팩토리는 adapters/battle_state.py 에 있다.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from dataclasses import replace
+from adapters.battle_state import (
+    BattleState, BattleStateManager, BATTLE_TTL_SECONDS, decode_battle_state, get_codec,
+)
+from adapters.redis.client import get_redis
 from config import get_settings
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# CAS 충돌 시 재시도 횟수
+MAX_CAS_RETRIES = 3
+
+
+# ---- Lua scripts ----
+
+# 두 형식 공용 decode/encode (Redis 내장 cjson, struct 라이브러리 사용).
+# BinaryCodec 레이아웃과 반드시 같게 유지할 것
+LUA_CODEC = """
+local STATUS_NAMES = {[0] = 'waiting', [1] = 'character_select', [2] = 'battle', [3] = 'finished'}
+local STATUS_CODES = {waiting = 0, character_select = 1, battle = 2, finished = 3}
+local HEADER_V1 = '>BHHBBIBBd'
+local HEADER_V2 = '>BHHBBIBBdI'
+local HEADER = '>BHHBBIBBdIBB'
+local NONE_LEN = 65535
+local STRINGS = {'battle_id', 'player1_id', 'player2_id', 'player1_character_id', 'player2_character_id'}
+
+local function decode(blob)
+    if string.byte(blob, 1) == 123 then
+        local st = cjson.decode(blob)
+        for _, name in ipairs(STRINGS) do
+            if st[name] == cjson.null then st[name] = nil end
+        end
+        st.version = st.version or 0
+        st.player1_missed = st.player1_missed or 0
+        st.player2_missed = st.player2_missed or 0
+        return st, 'json'
+    end
+    local format_version = string.byte(blob, 1)
+    local _, hp1, hp2, turn, status, turns, round, flags, started_at, version, pos
+    local missed1, missed2 = 0, 0
+    if format_version == 3 then
+        _, hp1, hp2, turn, status, turns, round, flags, started_at, version, missed1, missed2, pos = struct.unpack(HEADER, blob)
+    elseif format_version == 2 then
+        _, hp1, hp2, turn, status, turns, round, flags, started_at, version, pos = struct.unpack(HEADER_V2, blob)
+    elseif format_version == 1 then
+        _, hp1, hp2, turn, status, turns, round, flags, started_at, pos = struct.unpack(HEADER_V1, blob)
+        version = 0
+    else
+        error('unsupported battle state version ' .. format_version)
+    end
+    local st = {
+        player1_hp = hp1, player2_hp = hp2, current_turn = turn, status = STATUS_NAMES[status],
+        turns = turns, round_number = round, is_ranked = (flags % 2 == 1), started_at = started_at,
+        version = version, player1_missed = missed1, player2_missed = missed2,
+    }
+    for _, name in ipairs(STRINGS) do
+        local n
+        n, pos = struct.unpack('>H', blob, pos)
+        if n ~= NONE_LEN then
+            st[name] = string.sub(blob, pos, pos + n - 1)
+            pos = pos + n
+        end
+    end
+    return st, 'binary'
+end
+
+local function encode(st, format)
+    if format == 'json' then
+        return cjson.encode(st)
+    end
+    local parts = {struct.pack(HEADER, 3, st.player1_hp, st.player2_hp, st.current_turn, STATUS_CODES[st.status],
+        st.turns, st.round_number, st.is_ranked and 1 or 0, st.started_at, st.version,
+        st.player1_missed, st.player2_missed)}
+    for _, name in ipairs(STRINGS) do
+        local v = st[name]
+        if v == nil then
+            parts[#parts + 1] = struct.pack('>H', NONE_LEN)
+        else
+            parts[#parts + 1] = struct.pack('>H', #v) .. v
+        end
+    end
+    return table.concat(parts)
+end
+"""
+
+# KEYS[1] = battle key, ARGV = attacker_id, damage, ttl, 캐시된 version('' = 캐시 없음)
+# 반환: {player1_hp, player2_hp, current_turn, status, winner_id('' = 없음), version, 전체 상태('' = 생략)}
+#       배틀이 없으면 nil
+# 배틀이 끝났거나 호출한 워커의 캐시가 뒤처져 있으면(version 불일치) 인코딩된 전체 상태를 같이 돌려준다.
+# 이미 끝난 배틀에 들어온 공격은 상태를 바꾸지 않고 winner_id 없이 현재 상태만 돌려줌 (결과 중복 처리 방지)
+UPDATE_HP_SCRIPT = LUA_CODEC + """
+local blob = redis.call('GET', KEYS[1])
+if not blob then
+    return false
+end
+local st, format = decode(blob)
+local stale = ARGV[4] ~= '' and tonumber(ARGV[4]) ~= st.version
+if st.status == 'finished' then
+    return {st.player1_hp, st.player2_hp, st.current_turn, st.status, '', st.version, stale and blob or ''}
+end
+
+local damage = tonumber(ARGV[2])
+if ARGV[1] == st.player1_id then
+    st.player2_hp = math.max(0, st.player2_hp - damage)
+    st.player1_missed = 0
+elseif ARGV[1] == st.player2_id then
+    st.player1_hp = math.max(0, st.player1_hp - damage)
+    st.player2_missed = 0
+end
+
+local winner = ''
+if st.player1_hp <= 0 then
+    st.status = 'finished'
+    winner = st.player2_id
+elseif st.player2_hp <= 0 then
+    st.status = 'finished'
+    winner = st.player1_id
+end
+
+if st.current_turn == 1 then st.current_turn = 2 else st.current_turn = 1 end
+st.turns = st.turns + 1
+st.version = st.version + 1
+
+local encoded = encode(st, format)
+redis.call('SET', KEYS[1], encoded, 'EX', tonumber(ARGV[3]))
+if winner ~= '' or stale then
+    return {st.player1_hp, st.player2_hp, st.current_turn, st.status, winner, st.version, encoded}
+end
+return {st.player1_hp, st.player2_hp, st.current_turn, st.status, winner, st.version, ''}
+"""
+
+# KEYS[1] = battle key, ARGV = 기대하는 version, 새 상태(인코딩, version + 1), ttl
+# 반환: {1, ''} = 저장, {0, ''} = 배틀 없음, {-1, 현재 상태} = version 충돌
+CAS_WRITE_SCRIPT = LUA_CODEC + """
+local blob = redis.call('GET', KEYS[1])
+if not blob then
+    return {0, ''}
+end
+local st = decode(blob)
+if st.version ~= tonumber(ARGV[1]) then
+    return {-1, blob}
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+return {1, ''}
+"""
 
-@dataclass
-class BattleState:
-    """실시간 배틀 상태"""
-    battle_id: str
-    player1_id: str
-    player2_id: str
-    player1_hp: int = 300
-    player2_hp: int = 300
-    player1_character_id: Optional[str] = None
-    player2_character_id: Optional[str] = None
-    current_turn: int = 1  # 1 = player1, 2 = player2
-    round_number: int = 1
-    status: str = "waiting"  # waiting, character_select, battle, finished
-    is_ranked: bool = False  # ELO 반영 여부
-    
-
-class BattleStateManager:
-    """Redis를 사용한 배틀 상태 관리"""
-    
+
+class BattleStateCacheStats:
     def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale_refreshes = 0
+        self.cas_conflicts = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale_refreshes": self.stale_refreshes,
+            "cas_conflicts": self.cas_conflicts,
+        }
+
+
+class RedisBattleStateManager(BattleStateManager):
+    """Redis를 사용한 배틀 상태 관리 (워커 로컬 write-through 캐시)"""
+
+    def __init__(self, codec: str | None = None):
         self.redis_client = None
         self.prefix = "battle:"
-        
+        self.codec = get_codec(codec or settings.battle_state_codec)
+        self._update_hp_script = None
+        self._cas_write_script = None
+        # battle_id -> (만료 시각, 상태). 캐시에 넣은 상태 객체는 수정하지 않는다 (replace 로 새 객체)
+        self.local: OrderedDict[str, tuple[float, BattleState]] = OrderedDict()
+        self.stats = BattleStateCacheStats()
+
     async def connect(self):
         """Redis 연결"""
         if self.redis_client is None:
-            self.redis_client = redis.from_url(settings.redis_url)
+            self.redis_client = get_redis()
+            # EVALSHA 로 실행 (스크립트 캐시에 없으면 자동으로 EVAL)
+            self._update_hp_script = self.redis_client.register_script(UPDATE_HP_SCRIPT)
+            self._cas_write_script = self.redis_client.register_script(CAS_WRITE_SCRIPT)
         return self.redis_client
-    
+
+    def _local_get(self, battle_id: str) -> Optional[BattleState]:
+        entry = self.local.get(battle_id)
+        if entry is None:
+            return None
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            del self.local[battle_id]
+            return None
+        self.local.move_to_end(battle_id)
+        return state
+
+    def _local_set(self, state: BattleState):
+        # 늦게 도착한 응답이 더 최신 상태를 덮어쓰지 않도록
+        current = self.local.get(state.battle_id)
+        if current is not None and current[1].version > state.version:
+            return
+        self.local[state.battle_id] = (time.monotonic() + settings.battle_state_local_ttl, state)
+        self.local.move_to_end(state.battle_id)
+        while len(self.local) > settings.battle_state_local_size:
+            self.local.popitem(last=False)
+
     async def create_battle(self, battle_id: str, player1_id: str, player2_id: str, is_ranked: bool = False) -> BattleState:
         """새 배틀 세션 생성"""
         await self.connect()
-        
+
         state = BattleState(
             battle_id=battle_id,
             player1_id=player1_id,
             player2_id=player2_id,
             status="character_select",
-            is_ranked=is_ranked
+            is_ranked=is_ranked,
+            started_at=time.time()
         )
-        
+
         await self.redis_client.set(
             f"{self.prefix}{battle_id}",
-            json.dumps(asdict(state)),
-            ex=3600  # 1시간 후 자동 만료
+            self.codec.encode(state),
+            ex=BATTLE_TTL_SECONDS  # 1시간 후 자동 만료
         )
-        
+        self.local.pop(battle_id, None)
+        self._local_set(state)
+
         return state
-    
+
     async def get_battle(self, battle_id: str) -> Optional[BattleState]:
-        """배틀 상태 조회"""
+        """배틀 상태 조회 (로컬 캐시 → Redis)"""
+        state = self._local_get(battle_id)
+        if state is not None:
+            self.stats.hits += 1
+            return state
+        self.stats.misses += 1
+
         await self.connect()
-        
         data = await self.redis_client.get(f"{self.prefix}{battle_id}")
         if not data:
             return None
-            
-        state_dict = json.loads(data)
-        return BattleState(**state_dict)
-    
+
+        state = decode_battle_state(data)
+        self._local_set(state)
+        return state
+
     async def update_hp(self, battle_id: str, player_id: str, damage: int) -> Optional[dict]:
-        """플레이어 HP 업데이트 및 새 상태 반환"""
+        """플레이어 HP 업데이트 및 새 상태 반환 (Lua 스크립트 1회로 원자적 처리)"""
         await self.connect()
-        
-        state = await self.get_battle(battle_id)
-        if not state:
-            return None
-        
-        # 어느 플레이어인지 확인하고 HP 감소
-        if player_id == state.player1_id:
-            state.player2_hp = max(0, state.player2_hp - damage)  # 상대방 HP 감소
-        elif player_id == state.player2_id:
-            state.player1_hp = max(0, state.player1_hp - damage)
-        
-        # 게임 종료 확인
-        winner_id = None
-        if state.player1_hp <= 0:
-            state.status = "finished"
-            winner_id = state.player2_id
-        elif state.player2_hp <= 0:
-            state.status = "finished"
-            winner_id = state.player1_id
-        
-        # 턴 전환
-        state.current_turn = 2 if state.current_turn == 1 else 1
-        
-        # Redis 업데이트
-        await self.redis_client.set(
-            f"{self.prefix}{battle_id}",
-            json.dumps(asdict(state)),
-            ex=3600
+
+        cached = self._local_get(battle_id)
+        result = await self._update_hp_script(
+            keys=[f"{self.prefix}{battle_id}"],
+            args=[str(player_id), int(damage), BATTLE_TTL_SECONDS, cached.version if cached else ""],
         )
-        
+        if not result:
+            self.local.pop(battle_id, None)
+            return None
+
+        player1_hp, player2_hp, current_turn, status, winner_id, version, encoded = result
+        status = status.decode() if isinstance(status, bytes) else status
+        winner_id = winner_id.decode() if isinstance(winner_id, bytes) else winner_id
+        player1_hp, player2_hp, current_turn, version = int(player1_hp), int(player2_hp), int(current_turn), int(version)
+
+        if encoded:
+            # 배틀 종료 또는 이 워커의 캐시가 뒤처져 있었음 → 전체 상태로 교체
+            state = decode_battle_state(encoded)
+            if cached is not None and cached.version + 1 != state.version:
+                self.stats.stale_refreshes += 1
+            self._local_set(state)
+        elif cached is not None:
+            # 캐시가 최신이었으므로 바뀐 필드만 반영
+            state = replace(
+                cached,
+                player1_hp=player1_hp,
+                player2_hp=player2_hp,
+                current_turn=current_turn,
+                status=status,
+                turns=cached.turns + 1 if version != cached.version else cached.turns,
+                version=version,
+            )
+            self._local_set(state)
+        else:
+            state = None
+
         return {
-            "player1_hp": state.player1_hp,
-            "player2_hp": state.player2_hp,
-            "current_turn": state.current_turn,
-            "status": state.status,
-            "winner_id": winner_id
+            "player1_hp": player1_hp,
+            "player2_hp": player2_hp,
+            "current_turn": current_turn,
+            "status": status,
+            "winner_id": winner_id or None,
+            "version": version,
+            # 이번 공격으로 배틀이 끝났으면 종료 시점의 전체 상태 (아니면 None)
+            "state": state if winner_id else None,
         }
-    
-    async def set_character(self, battle_id: str, player_id: str, character_id: str) -> bool:
-        """플레이어 캐릭터 선택 저장"""
+
+    async def mutate(self, battle_id: str, change: Callable[[BattleState], Optional[BattleState]]) -> Optional[BattleState]:
+        """change(현재 상태) 결과를 version compare-and-set 으로 저장
+
+        change 는 새 상태를 반환한다 (None 이면 변경 없음). 다른 워커의 쓰기와 충돌하면
+        Redis 가 돌려준 최신 상태로 다시 change 를 적용한다. 배틀이 없거나 재시도를 모두 쓰면 None.
+        """
         await self.connect()
-        
-        state = await self.get_battle(battle_id)
-        if not state:
-            return False
-        
-        if player_id == state.player1_id:
-            state.player1_character_id = character_id
-        elif player_id == state.player2_id:
-            state.player2_character_id = character_id
-        
-        # 둘 다 선택했으면 battle 상태로 전환
-        if state.player1_character_id and state.player2_character_id:
-            state.status = "battle"
-        
-        await self.redis_client.set(
-            f"{self.prefix}{battle_id}",
-            json.dumps(asdict(state)),
-            ex=3600
-        )
-        
-        return True
-    
+        current = await self.get_battle(battle_id)
+        for _ in range(MAX_CAS_RETRIES):
+            if current is None:
+                return None
+            updated = change(current)
+            if updated is None:
+                return current
+            updated = replace(updated, version=current.version + 1)
+
+            status, blob = await self._cas_write_script(
+                keys=[f"{self.prefix}{battle_id}"],
+                args=[current.version, self.codec.encode(updated), BATTLE_TTL_SECONDS],
+            )
+            status = int(status)
+            if status == 1:
+                self._local_set(updated)
+                return updated
+            if status == 0:
+                self.local.pop(battle_id, None)
+                return None
+            self.stats.cas_conflicts += 1
+            current = decode_battle_state(blob)
+            self._local_set(current)
+
+        logger.warning(f"Battle {battle_id} write gave up after {MAX_CAS_RETRIES} version conflicts")
+        return None
+
     async def delete_battle(self, battle_id: str):
         """배틀 세션 삭제 (게임 종료 시)"""
         await self.connect()
+        self.local.pop(battle_id, None)
         await self.redis_client.delete(f"{self.prefix}{battle_id}")
         print(f"🗑️ Battle session deleted: {battle_id}")
 
-
-# 싱글톤 인스턴스
-battle_state_manager = BattleStateManager()
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "backend": "redis",
+            "codec": self.codec.name,
+            **self.stats.snapshot(),
+            "local_entries": len(self.local),
+        }
@@ -0,0 +1,214 @@
+"""공유 Redis 커넥션 풀 + 명령 텔레메트리
+
+모든 Redis 사용처(리더보드, 유저 통계, 프로필 캐시, 경기 결과 큐, 게스트, 배틀 상태)가
+설정 가능한 BlockingConnectionPool 하나를 공유한다.
+- 풀이 가득 차면 새 커넥션을 무한히 만들지 않고 redis_pool_timeout 까지 대기
+- 명령/파이프라인 지연시간, 에러, 풀 대기 시간/포화도를 /api/v1/metrics/redis 로 노출
+- 여러 명령을 한 round trip 으로 보낼 때는 pipeline() / transaction() 사용
+"""
+import logging
+import time
+from typing import Any, Optional
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Latency histogram upper bounds (ms); the last bucket is +Inf
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+# Pool acquisitions waiting longer than this are logged as pool pressure
+SLOW_ACQUIRE_MS = 50.0
+
+
+class RedisMetrics:
+    """Process-wide Redis command counters exported through the metrics endpoint."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.commands = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.by_command: dict[str, list] = {}  # name -> [calls, total_ms, errors]
+        self.pipelines = 0
+        self.pipelined_commands = 0
+        self.acquires = 0
+        self.total_acquire_ms = 0.0
+        self.max_acquire_ms = 0.0
+        self.pool_timeouts = 0
+
+    def observe(self, name: str, elapsed_ms: float, failed: bool):
+        self.commands += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if failed:
+            self.errors += 1
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        totals = self.by_command.setdefault(name, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += elapsed_ms
+        if failed:
+            totals[2] += 1
+
+    def observe_acquire(self, wait_ms: float):
+        self.acquires += 1
+        self.total_acquire_ms += wait_ms
+        self.max_acquire_ms = max(self.max_acquire_ms, wait_ms)
+
+    def snapshot(self) -> dict[str, Any]:
+        buckets = {f"le_{bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)}
+        buckets["le_inf"] = self.buckets[-1]
+        return {
+            "commands": self.commands,
+            "avg_ms": round(self.total_ms / self.commands, 3) if self.commands else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "errors": self.errors,
+            "latency_buckets": buckets,
+            "pipelines": self.pipelines,
+            "avg_pipeline_size": round(self.pipelined_commands / self.pipelines, 2) if self.pipelines else 0.0,
+            "by_command": {
+                name: {
+                    "calls": calls,
+                    "avg_ms": round(total_ms / calls, 3) if calls else 0.0,
+                    "errors": errors,
+                }
+                for name, (calls, total_ms, errors) in sorted(self.by_command.items(), key=lambda kv: -kv[1][0])
+            },
+        }
+
+
+redis_metrics = RedisMetrics()
+
+
+class InstrumentedBlockingPool(BlockingConnectionPool):
+    """BlockingConnectionPool that records how long each acquisition waited."""
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except RedisConnectionError as e:
+            if "No connection available" in str(e):
+                redis_metrics.pool_timeouts += 1
+                logger.error(f"🚨 Redis pool exhausted: no connection within {self.timeout}s")
+            raise
+        wait_ms = (time.perf_counter() - start) * 1000
+        redis_metrics.observe_acquire(wait_ms)
+        if wait_ms >= SLOW_ACQUIRE_MS:
+            logger.warning(f"⏳ Redis pool acquire waited {wait_ms:.1f}ms")
+        return connection
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline whose execute() is timed as one round trip."""
+
+    async def execute(self, raise_on_error: bool = True):
+        size = len(self.command_stack)
+        start = time.perf_counter()
+        failed = False
+        try:
+            return await super().execute(raise_on_error)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            redis_metrics.pipelines += 1
+            redis_metrics.pipelined_commands += size
+            name = "MULTI" if self.is_transaction else "PIPELINE"
+            redis_metrics.observe(name, (time.perf_counter() - start) * 1000, failed)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.asyncio.Redis that times every command (scripts included, via EVALSHA)."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            name = str(args[0]).upper() if args else "?"
+            redis_metrics.observe(name, (time.perf_counter() - start) * 1000, failed)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+_pool: Optional[InstrumentedBlockingPool] = None
+_client: Optional[InstrumentedRedis] = None
+
+
+def get_redis() -> InstrumentedRedis:
+    """공유 Redis 클라이언트 (첫 호출 시 풀 생성, 실제 연결은 첫 명령 때)"""
+    global _pool, _client
+    if _client is None:
+        _pool = InstrumentedBlockingPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_connect_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+        )
+        _client = InstrumentedRedis(connection_pool=_pool)
+    return _client
+
+
+def pipeline() -> InstrumentedPipeline:
+    """여러 명령을 한 round trip 으로 (원자성 없음)
+
+        pipe = pipeline()
+        pipe.get(a)
+        pipe.delete(b)
+        value, _ = await pipe.execute()
+    """
+    return get_redis().pipeline(transaction=False)
+
+
+def transaction() -> InstrumentedPipeline:
+    """MULTI/EXEC 로 묶어서 한 round trip 으로 원자적으로 실행"""
+    return get_redis().pipeline(transaction=True)
+
+
+def pool_snapshot() -> dict[str, Any]:
+    """커넥션 풀 포화도 (사용 중 / 최대, 획득 대기 시간, timeout)"""
+    in_use = len(getattr(_pool, "_in_use_connections", ())) if _pool is not None else 0
+    available = len(getattr(_pool, "_available_connections", ())) if _pool is not None else 0
+    m = redis_metrics
+    return {
+        "max_connections": settings.redis_max_connections,
+        "in_use": in_use,
+        "idle": available,
+        "saturation": round(in_use / settings.redis_max_connections, 3) if settings.redis_max_connections else 0.0,
+        "acquires": m.acquires,
+        "avg_acquire_ms": round(m.total_acquire_ms / m.acquires, 3) if m.acquires else 0.0,
+        "max_acquire_ms": round(m.max_acquire_ms, 3),
+        "pool_timeouts": m.pool_timeouts,
+    }
+
+
+async def close_redis():
+    """종료 시 풀의 커넥션 정리"""
+    global _pool, _client
+    if _pool is not None:
+        await _pool.disconnect()
+    _pool = None
+    _client = None
@@ -0,0 +1,69 @@
+"""게스트 계정 (Redis TTL 레코드)
+
+게스트 로그인은 users 행을 만들지 않고 JWT sub 를 키로 하는 Redis 레코드만 만든다.
+- 조회할 때마다 TTL 연장 (활동 중인 게스트는 유지, 이탈한 게스트는 자동 만료)
+- 랭크 매치나 프로필 수정 같은 첫 "의미 있는" 행동에서 users 행으로 승격 (use_cases/guest_service.py)
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+
+from adapters.redis.profile_cache import CachedUser
+from adapters.redis.client import get_redis
+from config import get_settings
+
+settings = get_settings()
+
+
+class GuestStore:
+    """user_id -> CachedUser (게스트 전용, TTL)"""
+
+    def __init__(self, prefix: str = "guest:"):
+        self.redis_client = None
+        self.prefix = prefix
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+        return self.redis_client
+
+    async def create(self) -> CachedUser:
+        """새 게스트 (닉네임 자동 생성)"""
+        guest = CachedUser(
+            id=uuid4(),
+            nickname=f"마법소녀_{uuid4().hex[:6]}",
+            elo_rating=1200,
+            wins=0,
+            losses=0,
+            main_character_id="char_000",
+            avatar_url="/assets/avatars/default.png",
+            created_at=datetime.utcnow(),
+        )
+        await self.connect()
+        await self.redis_client.set(f"{self.prefix}{guest.id}", guest.to_json(), ex=settings.guest_ttl_seconds)
+        return guest
+
+    async def get(self, user_id) -> Optional[CachedUser]:
+        """게스트 조회 + TTL 연장 (게스트가 아니거나 만료됐으면 None)"""
+        await self.connect()
+        raw = await self.redis_client.getex(f"{self.prefix}{user_id}", ex=settings.guest_ttl_seconds)
+        return CachedUser.from_json(raw) if raw is not None else None
+
+    async def get_many(self, user_ids: list) -> dict[str, CachedUser]:
+        """여러 게스트 조회 (MGET, TTL 연장 없음)"""
+        keys = [str(user_id) for user_id in user_ids]
+        if not keys:
+            return {}
+        await self.connect()
+        values = await self.redis_client.mget([f"{self.prefix}{key}" for key in keys])
+        return {key: CachedUser.from_json(raw) for key, raw in zip(keys, values) if raw is not None}
+
+    async def delete(self, user_id):
+        await self.connect()
+        await self.redis_client.delete(f"{self.prefix}{user_id}")
+
+
+# 싱글톤 인스턴스
+guest_store = GuestStore()
@@ -0,0 +1,193 @@
+"""Redis Sorted Set 기반 ELO 리더보드
+
+users.elo_rating 의 복제본을 ZSET(member=user_id, score=elo_rating)으로 유지한다.
+- 순위 조회: ZCOUNT (score, +inf] + 1 (O(log n)). 동점은 같은 순위 (DB 의 COUNT(elo > x) + 1 과 동일)
+- 페이지 조회: ZREVRANGE (O(log n + limit))
+- 레이팅이 바뀌는 모든 UserRepository 쓰기 경로에서 write-through
+- 재구축 중의 write-through 는 journal(hash) 에도 기록해 두었다가 RENAME 직전에 임시 키에 다시 적용
+- ready 마커가 없으면(재구축 전/Redis 초기화 후) 호출 측은 DB 로 fallback
+"""
+import logging
+from typing import AsyncIterable, Optional
+
+from adapters.redis.client import get_redis
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 재구축 마커 TTL (재구축 프로세스가 죽어도 write-through 가 journal 을 계속 쌓지 않도록, 배치마다 갱신)
+REBUILD_MARKER_TTL_SECONDS = 600
+
+# KEYS: [zset, journal, rebuilding 마커]  ARGV: [member, score, member, score, ...]
+UPDATE_SCRIPT = """
+local rebuilding = redis.call('EXISTS', KEYS[3]) == 1
+for i = 1, #ARGV, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+    if rebuilding then
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+    end
+end
+return #ARGV / 2
+"""
+
+# KEYS: [zset, journal, rebuilding 마커]  ARGV: [member, ...]  journal 의 빈 값 = 삭제
+REMOVE_SCRIPT = """
+local rebuilding = redis.call('EXISTS', KEYS[3]) == 1
+for i = 1, #ARGV do
+    redis.call('ZREM', KEYS[1], ARGV[i])
+    if rebuilding then
+        redis.call('HSET', KEYS[2], ARGV[i], '')
+    end
+end
+return #ARGV
+"""
+
+# KEYS: [zset]  ARGV: [member] -> 점수가 더 높은 멤버 수 + 1 (동점은 같은 순위), 없으면 nil
+RANK_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score then
+    return nil
+end
+return redis.call('ZCOUNT', KEYS[1], '(' .. score, '+inf') + 1
+"""
+
+# KEYS: [tmp, zset, journal, rebuilding 마커, ready]
+# 재구축 중 들어온 쓰기를 tmp 에 다시 적용한 뒤 교체 -> 재구축 중의 write-through 를 잃지 않는다
+FINISH_REBUILD_SCRIPT = """
+local journal = redis.call('HGETALL', KEYS[3])
+for i = 1, #journal, 2 do
+    if journal[i + 1] == '' then
+        redis.call('ZREM', KEYS[1], journal[i])
+    else
+        redis.call('ZADD', KEYS[1], journal[i + 1], journal[i])
+    end
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+redis.call('DEL', KEYS[3], KEYS[4])
+redis.call('SET', KEYS[5], 1)
+return #journal / 2
+"""
+
+
+class Leaderboard:
+    """ELO 리더보드 (Redis ZSET)"""
+
+    def __init__(self, key: str = "leaderboard:elo"):
+        self.redis_client = None
+        self.key = key
+        self.ready_key = f"{key}:ready"
+        self.tmp_key = f"{key}:rebuild"
+        self.journal_key = f"{key}:rebuild:journal"
+        self.rebuilding_key = f"{key}:rebuilding"
+        self._update_script = None
+        self._remove_script = None
+        self._rank_script = None
+        self._finish_rebuild_script = None
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+            self._update_script = self.redis_client.register_script(UPDATE_SCRIPT)
+            self._remove_script = self.redis_client.register_script(REMOVE_SCRIPT)
+            self._rank_script = self.redis_client.register_script(RANK_SCRIPT)
+            self._finish_rebuild_script = self.redis_client.register_script(FINISH_REBUILD_SCRIPT)
+        return self.redis_client
+
+    def _write_keys(self) -> list[str]:
+        return [self.key, self.journal_key, self.rebuilding_key]
+
+    async def is_ready(self) -> bool:
+        """ZSET 이 Postgres 로부터 한 번이라도 재구축되었는지"""
+        await self.connect()
+        return bool(await self.redis_client.exists(self.ready_key))
+
+    async def update(self, user_id, rating: int):
+        """단일 유저 레이팅 반영 (write-through)"""
+        await self.update_many({user_id: rating})
+
+    async def update_many(self, ratings: dict):
+        """여러 유저 레이팅을 한 번에 반영 (user_id -> rating)"""
+        if not ratings:
+            return
+        await self.connect()
+        args = []
+        for uid, rating in ratings.items():
+            args += [str(uid), rating]
+        await self._update_script(keys=self._write_keys(), args=args)
+
+    async def remove(self, *user_ids):
+        if not user_ids:
+            return
+        await self.connect()
+        await self._remove_script(keys=self._write_keys(), args=[str(uid) for uid in user_ids])
+
+    async def get_rank(self, user_id) -> Optional[int]:
+        """1-based 순위, 동점은 같은 순위 (없으면 None)"""
+        await self.connect()
+        rank = await self._rank_script(keys=[self.key], args=[str(user_id)])
+        return None if rank is None else int(rank)
+
+    async def count_above(self, rating: int) -> int:
+        """점수가 rating 보다 높은 멤버 수 (rating 인 유저의 순위 = 이 값 + 1)"""
+        await self.connect()
+        return await self.redis_client.zcount(self.key, f"({rating}", "+inf")
+
+    async def get_page(self, offset: int, limit: int) -> list[tuple[str, int]]:
+        """[(user_id, elo_rating), ...] 높은 순"""
+        if limit <= 0:
+            return []
+        await self.connect()
+        entries = await self.redis_client.zrevrange(
+            self.key, offset, offset + limit - 1, withscores=True
+        )
+        return [(member.decode(), int(score)) for member, score in entries]
+
+    async def count(self) -> int:
+        await self.connect()
+        return await self.redis_client.zcard(self.key)
+
+    async def scores(self, user_ids: list[str]) -> list[Optional[int]]:
+        """ZMSCORE: 각 user_id 의 현재 점수 (없으면 None)"""
+        if not user_ids:
+            return []
+        await self.connect()
+        values = await self.redis_client.zmscore(self.key, user_ids)
+        return [None if v is None else int(v) for v in values]
+
+    async def rebuild(self, batches: AsyncIterable[list[tuple[str, int]]]) -> int:
+        """
+        (user_id, elo_rating) 배치들로 임시 키를 채운 뒤 RENAME 으로 원자적 교체.
+        재구축 중에도 기존 ZSET 은 계속 읽을 수 있고, 그동안의 write-through 는 journal 에
+        남았다가 교체 직전에 임시 키에 적용된다 (배치가 읽은 예전 값보다 항상 나중 값).
+        """
+        await self.connect()
+        await self.redis_client.delete(self.tmp_key, self.journal_key)
+        await self.redis_client.set(self.rebuilding_key, 1, ex=REBUILD_MARKER_TTL_SECONDS)
+
+        loaded = 0
+        try:
+            async for batch in batches:
+                if not batch:
+                    continue
+                await self.redis_client.zadd(self.tmp_key, {str(uid): rating for uid, rating in batch})
+                await self.redis_client.expire(self.rebuilding_key, REBUILD_MARKER_TTL_SECONDS)
+                loaded += len(batch)
+        except BaseException:
+            await self.redis_client.delete(self.tmp_key, self.journal_key, self.rebuilding_key)
+            raise
+
+        replayed = await self._finish_rebuild_script(
+            keys=[self.tmp_key, self.key, self.journal_key, self.rebuilding_key, self.ready_key]
+        )
+
+        logger.info(f"🏆 Leaderboard rebuilt: {loaded} users ({replayed} writes replayed)")
+        return loaded
+
+# 싱글톤 인스턴스
+leaderboard = Leaderboard()
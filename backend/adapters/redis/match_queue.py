@@ -0,0 +1,175 @@
+"""Redis Stream 기반 경기 결과 write-behind 큐
+
+배틀 종료 시 소켓 핸들러는 결과를 스트림에 XADD 만 하고 바로 응답한다.
+백그라운드 consumer(use_cases/match_settlement.py)가 consumer group 으로 읽어 Postgres 에 반영한다.
+- 멱등 키: battle_id (settled_matches 행을 정산과 같은 트랜잭션에서 insert, Redis match:settled:* 는 조회 힌트)
+- ACK 되지 않은 메시지는 일정 시간 후 XAUTOCLAIM 으로 재시도
+- 재시도 한도를 넘으면 dead-letter 스트림으로 이동
+- history: 경기 기록 필드(JSON). consumer 가 실제 ELO 변화량과 함께 정산 트랜잭션에서 insert
+"""
+import json
+import os
+import socket
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from redis.exceptions import ResponseError
+
+from adapters.redis.client import get_redis
+from config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class MatchResultMessage:
+    message_id: str
+    battle_id: str
+    winner_id: str
+    loser_id: str
+    delivery_count: int = 1
+    history: Optional[dict[str, Any]] = None  # match_writer.match_row 인자 (ELO 변화량 제외)
+
+
+class MatchResultQueue:
+    """경기 결과 스트림 (XADD / XREADGROUP / XACK)"""
+
+    def __init__(self, stream: str = "stream:match_results", group: str = "match-settlers"):
+        self.redis_client = None
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = f"{stream}:dead"
+        self.settled_prefix = "match:settled:"
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+        return self.redis_client
+
+    async def ensure_group(self):
+        if self._group_ready:
+            return
+        await self.connect()
+        try:
+            await self.redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def enqueue(
+        self, battle_id: str, winner_id: str, loser_id: str, history: Optional[dict[str, Any]] = None
+    ) -> str:
+        """경기 결과 추가 (소켓 핸들러는 이것만 await)"""
+        await self.connect()
+        fields = {"battle_id": battle_id, "winner_id": str(winner_id), "loser_id": str(loser_id)}
+        if history is not None:
+            fields["history"] = json.dumps(history)
+        message_id = await self.redis_client.xadd(
+            self.stream,
+            fields,
+            maxlen=settings.match_queue_maxlen,
+            approximate=True,
+        )
+        return message_id.decode() if isinstance(message_id, bytes) else message_id
+
+    @staticmethod
+    def _parse(message_id, fields, delivery_count: int = 1) -> MatchResultMessage:
+        data = {k.decode(): v.decode() for k, v in fields.items()}
+        return MatchResultMessage(
+            message_id=message_id.decode() if isinstance(message_id, bytes) else message_id,
+            battle_id=data.get("battle_id", ""),
+            winner_id=data.get("winner_id", ""),
+            loser_id=data.get("loser_id", ""),
+            delivery_count=delivery_count,
+            history=json.loads(data["history"]) if data.get("history") else None,
+        )
+
+    async def read_batch(self, count: int, block_ms: int) -> list[MatchResultMessage]:
+        """새 메시지를 최대 count 개 읽음 (없으면 block_ms 동안 대기)"""
+        await self.ensure_group()
+        response = await self.redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        messages = []
+        for _, entries in response or []:
+            for message_id, fields in entries:
+                if fields:
+                    messages.append(self._parse(message_id, fields))
+        return messages
+
+    async def claim_stale(self, min_idle_ms: int, count: int) -> list[MatchResultMessage]:
+        """다른(죽은) consumer 가 ACK 하지 못한 메시지를 가져옴 (재시도)"""
+        await self.ensure_group()
+        result = await self.redis_client.xautoclaim(
+            self.stream, self.group, self.consumer, min_idle_time=min_idle_ms, start_id="0-0", count=count
+        )
+        entries = result[1] if result else []
+        if not entries:
+            return []
+
+        # 재시도 횟수(delivery count) 조회
+        pending = await self.redis_client.xpending_range(
+            self.stream, self.group, min=entries[0][0], max=entries[-1][0], count=len(entries) * 2
+        )
+        deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+        return [
+            self._parse(message_id, fields, deliveries.get(message_id, 1))
+            for message_id, fields in entries
+            if fields
+        ]
+
+    async def ack(self, *message_ids: str):
+        if message_ids:
+            await self.redis_client.xack(self.stream, self.group, *message_ids)
+
+    async def is_settled(self, battle_id: str) -> bool:
+        await self.connect()
+        return bool(await self.redis_client.exists(f"{self.settled_prefix}{battle_id}"))
+
+    async def settled_among(self, battle_ids: list[str]) -> set[str]:
+        """이미 처리된 battle_id 들 (배치 전체를 한 round trip 으로 확인)"""
+        await self.connect()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for battle_id in battle_ids:
+            pipe.exists(f"{self.settled_prefix}{battle_id}")
+        results = await pipe.execute()
+        return {battle_id for battle_id, exists in zip(battle_ids, results) if exists}
+
+    async def mark_settled(self, battle_id: str):
+        await self.connect()
+        await self.redis_client.set(f"{self.settled_prefix}{battle_id}", 1, ex=86400)
+
+    async def dead_letter(self, message: MatchResultMessage, error: str):
+        """재시도 한도 초과 메시지를 dead-letter 스트림으로 옮기고 ACK"""
+        await self.connect()
+        # dead-letter 추가와 ACK 를 한 트랜잭션으로 (중간에 죽어도 메시지가 사라지거나 중복되지 않음)
+        pipe = self.redis_client.pipeline(transaction=True)
+        fields = {
+            "battle_id": message.battle_id,
+            "winner_id": message.winner_id,
+            "loser_id": message.loser_id,
+            "error": error[:500],
+        }
+        if message.history is not None:
+            fields["history"] = json.dumps(message.history)
+        pipe.xadd(self.dead_letter_stream, fields)
+        pipe.xack(self.stream, self.group, message.message_id)
+        await pipe.execute()
+
+    async def lag(self) -> Optional[dict]:
+        """스트림 길이 / 미처리(pending) 메시지 수"""
+        await self.ensure_group()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.xlen(self.stream)
+        pipe.xpending(self.stream, self.group)
+        pipe.xlen(self.dead_letter_stream)
+        length, pending, dead = await pipe.execute()
+        return {"length": length, "pending": pending.get("pending", 0), "dead_letter": dead}
+
+
+# 싱글톤 인스턴스
+match_result_queue = MatchResultQueue()
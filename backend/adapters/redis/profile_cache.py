@@ -0,0 +1,285 @@
+"""유저 프로필 2단 캐시 (프로세스 LRU -> Redis -> Postgres)
+
+/users/me, 매치메이킹 상대 정보 등 같은 유저 행을 반복해서 읽는 경로를 위한 read-through 캐시.
+- 1단: 워커 프로세스 내 LRU (짧은 TTL, 다른 워커의 쓰기는 TTL 안에 반영)
+- 2단: Redis (모든 워커 공유)
+- UserRepository 의 모든 쓰기 경로에서 갱신(set) 또는 무효화(invalidate)
+- 읽기 경로의 채우기(fill)는 키별 generation 으로 보호: SELECT 전에 읽은 generation 이
+  그 사이 쓰기(set / invalidate 가 INCR)로 바뀌었으면 채우지 않는다 (늦게 도착한 예전 행이 이기지 않도록)
+"""
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from adapters.redis.client import get_redis
+from config import get_settings
+
+settings = get_settings()
+
+# KEYS: [profile, generation, profile, generation, ...]
+# ARGV: [ttl, 기대 generation ('' = 없음), json, 기대 generation, json, ...] -> 키별 1(채움) / 0(건너뜀)
+FILL_SCRIPT = """
+local filled = {}
+for i = 1, #KEYS / 2 do
+    local current = redis.call('GET', KEYS[2 * i]) or ''
+    if current == ARGV[2 * i] then
+        redis.call('SET', KEYS[2 * i - 1], ARGV[2 * i + 1], 'EX', ARGV[1])
+        filled[i] = 1
+    else
+        filled[i] = 0
+    end
+end
+return filled
+"""
+
+
+@dataclass
+class CachedUser:
+    """캐시된 유저 프로필 (UserModel 과 같은 속성명, 읽기 전용 용도)"""
+    id: UUID
+    nickname: str
+    elo_rating: int
+    wins: int
+    losses: int
+    main_character_id: str
+    avatar_url: Optional[str]
+    created_at: datetime
+    email: Optional[str] = None
+    google_id: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, user) -> "CachedUser":
+        return cls(
+            id=user.id,
+            nickname=user.nickname,
+            elo_rating=user.elo_rating,
+            wins=user.wins,
+            losses=user.losses,
+            main_character_id=user.main_character_id,
+            avatar_url=user.avatar_url,
+            created_at=user.created_at,
+            email=user.email,
+            google_id=user.google_id,
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["id"] = str(self.id)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "CachedUser":
+        data = json.loads(raw)
+        data["id"] = UUID(data["id"])
+        data["created_at"] = datetime.fromisoformat(data["created_at"]) if data["created_at"] else None
+        return cls(**data)
+
+
+class ProfileCacheStats:
+    def __init__(self):
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.fill_skips = 0
+        self.errors = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "lookups": lookups,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+            "local_hit_rate": round(self.local_hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+            "fill_skips": self.fill_skips,
+            "errors": self.errors,
+        }
+
+
+class ProfileCache:
+    """user_id -> CachedUser 2단 캐시"""
+
+    def __init__(self, prefix: str = "profile:"):
+        self.redis_client = None
+        self.prefix = prefix
+        self.gen_prefix = f"{prefix}gen:"
+        self._fill_script = None
+        self.local: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+        self.stats = ProfileCacheStats()
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+            self._fill_script = self.redis_client.register_script(FILL_SCRIPT)
+        return self.redis_client
+
+    def _local_get(self, key: str) -> Optional[CachedUser]:
+        entry = self.local.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self.local[key]
+            return None
+        self.local.move_to_end(key)
+        return user
+
+    def _local_set(self, key: str, user: CachedUser):
+        self.local[key] = (time.monotonic() + settings.profile_cache_local_ttl, user)
+        self.local.move_to_end(key)
+        while len(self.local) > settings.profile_cache_local_size:
+            self.local.popitem(last=False)
+
+    def get_local(self, user_id) -> Optional[CachedUser]:
+        """1단(LRU)만 조회 - await 없이 호출 가능"""
+        user = self._local_get(str(user_id))
+        if user is not None:
+            self.stats.local_hits += 1
+        return user
+
+    async def get_many(self, user_ids: list) -> dict[str, CachedUser]:
+        """LRU + Redis MGET 으로 여러 유저 조회 (없는 id 는 결과에서 빠짐)"""
+        found: dict[str, CachedUser] = {}
+        remote_keys = []
+        for user_id in user_ids:
+            key = str(user_id)
+            user = self._local_get(key)
+            if user is not None:
+                self.stats.local_hits += 1
+                found[key] = user
+            else:
+                remote_keys.append(key)
+        if not remote_keys:
+            return found
+
+        try:
+            await self.connect()
+            values = await self.redis_client.mget([f"{self.prefix}{key}" for key in remote_keys])
+        except Exception:
+            self.stats.errors += 1
+            values = [None] * len(remote_keys)
+        for key, raw in zip(remote_keys, values):
+            if raw is None:
+                self.stats.misses += 1
+                continue
+            self.stats.redis_hits += 1
+            user = CachedUser.from_json(raw)
+            self._local_set(key, user)
+            found[key] = user
+        return found
+
+    async def generations(self, user_ids: list) -> Optional[dict[str, str]]:
+        """
+        fill 전에(DB SELECT 전에) 읽어 두는 키별 generation -> fill_many 에 그대로 전달.
+        Redis 를 못 쓰면 None (채우지 않음).
+        """
+        keys = [str(uid) for uid in user_ids]
+        try:
+            await self.connect()
+            values = await self.redis_client.mget([f"{self.gen_prefix}{key}" for key in keys])
+        except Exception:
+            self.stats.errors += 1
+            return None
+        return {key: (raw.decode() if isinstance(raw, bytes) else raw or "") for key, raw in zip(keys, values)}
+
+    async def fill_many(self, users: list, generations: Optional[dict[str, str]]) -> list[CachedUser]:
+        """
+        읽기 경로에서 DB 로 읽은 행을 캐시에 채움 (한 번의 스크립트 호출).
+        generation 이 바뀐 키(그 사이 쓰기가 있었던 유저)는 건너뛴다. 반환값은 채움 여부와 무관하게 전부.
+        """
+        cached_users = [u if isinstance(u, CachedUser) else CachedUser.from_model(u) for u in users]
+        if not cached_users or generations is None:
+            return cached_users
+        keys, args = [], [settings.profile_cache_ttl]
+        for cached in cached_users:
+            key = str(cached.id)
+            keys += [f"{self.prefix}{key}", f"{self.gen_prefix}{key}"]
+            args += [generations.get(key, ""), cached.to_json()]
+        try:
+            await self.connect()
+            filled = await self._fill_script(keys=keys, args=args)
+        except Exception:
+            self.stats.errors += 1
+            return cached_users
+        for cached, ok in zip(cached_users, filled):
+            if int(ok):
+                self._local_set(str(cached.id), cached)
+                self.stats.sets += 1
+            else:
+                self.stats.fill_skips += 1
+        return cached_users
+
+    async def fill(self, user, generations: Optional[dict[str, str]]) -> CachedUser:
+        return (await self.fill_many([user], generations))[0]
+
+    async def get(self, user_id) -> Optional[CachedUser]:
+        key = str(user_id)
+        user = self._local_get(key)
+        if user is not None:
+            self.stats.local_hits += 1
+            return user
+
+        try:
+            await self.connect()
+            raw = await self.redis_client.get(f"{self.prefix}{key}")
+        except Exception:
+            self.stats.errors += 1
+            raw = None
+        if raw is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.redis_hits += 1
+        user = CachedUser.from_json(raw)
+        self._local_set(key, user)
+        return user
+
+    async def set(self, user) -> CachedUser:
+        """쓰기 경로: UserModel(또는 CachedUser)로 두 단계 모두 갱신하고 generation 증가"""
+        cached = user if isinstance(user, CachedUser) else CachedUser.from_model(user)
+        key = str(cached.id)
+        self._local_set(key, cached)
+        self.stats.sets += 1
+        try:
+            await self.connect()
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.set(f"{self.prefix}{key}", cached.to_json(), ex=settings.profile_cache_ttl)
+            self._bump(pipe, key)
+            await pipe.execute()
+        except Exception:
+            self.stats.errors += 1
+        return cached
+
+    async def invalidate(self, *user_ids):
+        keys = [str(uid) for uid in user_ids]
+        for key in keys:
+            self.local.pop(key, None)
+        self.stats.invalidations += len(keys)
+        try:
+            await self.connect()
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(*[f"{self.prefix}{key}" for key in keys])
+            for key in keys:
+                self._bump(pipe, key)
+            await pipe.execute()
+        except Exception:
+            self.stats.errors += 1
+
+    def _bump(self, pipe, key: str):
+        # 진행 중인 fill 보다 오래 살아 있으면 충분 (만료되면 기대값과 달라져 fill 을 건너뛸 뿐)
+        pipe.incr(f"{self.gen_prefix}{key}")
+        pipe.expire(f"{self.gen_prefix}{key}", settings.profile_cache_ttl)
+
+# 싱글톤 인스턴스
+profile_cache = ProfileCache()
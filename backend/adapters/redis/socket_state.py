@@ -0,0 +1,308 @@
+"""Redis 소켓 레지스트리 (SOCKET_MULTI_WORKER=true)
+
+여러 uvicorn 워커 / 서버가 같은 sid / 방 / 대기열 정보를 본다.
+- sio:users            HASH  sid -> 유저 정보 JSON
+- sio:user_sids:{uid}  SET   user_id 로 접속 중인 sid
+- sio:room:{room_id}   ZSET  멤버 sid (score = 입장 시각, 입장 순서 유지)
+- sio:sid_rooms:{sid}  SET   sid 가 들어가 있는 방
+- sio:queue            ZSET  매칭 대기 sid (score = ELO, rating 범위 조회 O(log n + k))
+- sio:queue_since      ZSET  매칭 대기 sid (score = 대기 시작 시각, 오래 기다린 순 sweep)
+- sio:battle_ready:{room_id}, sio:bg_votes:{room_id}, sio:pending:{user_id}  (TTL 있음)
+
+워커가 비정상 종료되면 그 워커의 sid 는 남는다 (유저 수가 실제보다 많게 보일 수 있음).
+"""
+import json
+import time
+from typing import Any, Optional
+
+from adapters.redis.client import get_redis, pipeline, transaction
+from adapters.battle_state import BATTLE_TTL_SECONDS
+from adapters.socket.state import QueueEntry, SocketState
+from config import get_settings
+
+settings = get_settings()
+
+# 재접속 대기 정보는 grace period 보다 충분히 길게 (만료 처리 태스크가 꺼내 간다)
+PENDING_TTL_SECONDS = 300
+
+# KEYS[1] = pending key, ARGV[1] = sid ('' = 아무 sid)
+POP_PENDING_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value then
+    return false
+end
+if ARGV[1] ~= '' and cjson.decode(value).sid ~= ARGV[1] then
+    return false
+end
+redis.call('DEL', KEYS[1])
+return value
+"""
+
+# 매칭 (adapters/memory/matchmaking.py 와 같은 규칙). KEYS[1] = rating zset, KEYS[2] = since zset
+# ARGV[2] = now, ARGV[3..6] = window base, 초당 widen, window max, 위/아래 후보 수
+# 찾으면 둘 다 대기열에서 빼고 {sid, rating, since, 상대 sid, rating, since} 반환 (숫자는 문자열로)
+MATCH_FUNCTION = """
+local base, widen, window_max, candidates = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+
+local function find_match(sid, now)
+    local rating_s = redis.call('ZSCORE', KEYS[1], sid)
+    if not rating_s then
+        return nil
+    end
+    local rating = tonumber(rating_s)
+    local since = tonumber(redis.call('ZSCORE', KEYS[2], sid) or now)
+    local best, best_gap, best_rating, best_since
+
+    local function consider(found)
+        for i = 1, #found, 2 do
+            local other = found[i]
+            if other ~= sid then
+                local other_rating = tonumber(found[i + 1])
+                local other_since = tonumber(redis.call('ZSCORE', KEYS[2], other) or now)
+                local gap = math.abs(other_rating - rating)
+                local window = math.min(base + widen * math.max(0, now - math.min(since, other_since)), window_max)
+                if gap <= window and (best == nil or gap < best_gap or (gap == best_gap and other_since < best_since)) then
+                    best, best_gap, best_rating, best_since = other, gap, other_rating, other_since
+                end
+            end
+        end
+    end
+
+    consider(redis.call('ZREVRANGEBYSCORE', KEYS[1], rating_s, rating - window_max, 'WITHSCORES', 'LIMIT', 0, candidates + 1))
+    consider(redis.call('ZRANGEBYSCORE', KEYS[1], '(' .. rating_s, rating + window_max, 'WITHSCORES', 'LIMIT', 0, candidates))
+    if best == nil then
+        return nil
+    end
+    redis.call('ZREM', KEYS[1], sid, best)
+    redis.call('ZREM', KEYS[2], sid, best)
+    return {sid, rating_s, tostring(since), best, tostring(best_rating), tostring(best_since)}
+end
+"""
+
+# ARGV[1] = sid
+MATCH_SCRIPT = MATCH_FUNCTION + """
+return find_match(ARGV[1], tonumber(ARGV[2])) or false
+"""
+
+# ARGV[1] = 오래 기다린 순으로 볼 인원
+SWEEP_SCRIPT = MATCH_FUNCTION + """
+local matched = {}
+for _, sid in ipairs(redis.call('ZRANGE', KEYS[2], 0, tonumber(ARGV[1]) - 1)) do
+    local pair = find_match(sid, tonumber(ARGV[2]))
+    if pair then
+        for _, value in ipairs(pair) do
+            table.insert(matched, value)
+        end
+    end
+end
+return matched
+"""
+
+
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _pairs(values: list) -> list[tuple[QueueEntry, QueueEntry]]:
+    """MATCH/SWEEP 결과 (6개씩) -> (QueueEntry, QueueEntry) 목록"""
+    values = [_text(value) for value in values or []]
+    return [
+        (
+            QueueEntry(values[i], float(values[i + 1]), float(values[i + 2])),
+            QueueEntry(values[i + 3], float(values[i + 4]), float(values[i + 5])),
+        )
+        for i in range(0, len(values), 6)
+    ]
+
+
+class RedisSocketState(SocketState):
+    def __init__(self, prefix: str = "sio:"):
+        self.redis_client = None
+        self.prefix = prefix
+        self.users_key = f"{prefix}users"
+        self.queue_key = f"{prefix}queue"
+        self.queue_since_key = f"{prefix}queue_since"
+        self._pop_pending_script = None
+        self._match_script = None
+        self._sweep_script = None
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+            self._pop_pending_script = self.redis_client.register_script(POP_PENDING_SCRIPT)
+            self._match_script = self.redis_client.register_script(MATCH_SCRIPT)
+            self._sweep_script = self.redis_client.register_script(SWEEP_SCRIPT)
+        return self.redis_client
+
+    def _user_sids_key(self, user_id) -> str:
+        return f"{self.prefix}user_sids:{user_id}"
+
+    def _room_key(self, room_id: str) -> str:
+        return f"{self.prefix}room:{room_id}"
+
+    def _sid_rooms_key(self, sid: str) -> str:
+        return f"{self.prefix}sid_rooms:{sid}"
+
+    # ---- 접속 유저 ----
+
+    async def add_user(self, sid: str, info: dict[str, Any]):
+        await self.connect()
+        pipe = pipeline()
+        pipe.hset(self.users_key, sid, json.dumps(info, default=str))
+        pipe.sadd(self._user_sids_key(info.get("user_id")), sid)
+        await pipe.execute()
+
+    async def remove_user(self, sid: str) -> Optional[dict[str, Any]]:
+        await self.connect()
+        raw = await self.redis_client.hget(self.users_key, sid)
+        if raw is None:
+            return None
+        info = json.loads(raw)
+        pipe = pipeline()
+        pipe.hdel(self.users_key, sid)
+        pipe.srem(self._user_sids_key(info.get("user_id")), sid)
+        await pipe.execute()
+        return info
+
+    async def get_user(self, sid: str) -> dict[str, Any]:
+        await self.connect()
+        raw = await self.redis_client.hget(self.users_key, sid)
+        return json.loads(raw) if raw else {}
+
+    async def get_users(self, sids: list[str]) -> dict[str, dict[str, Any]]:
+        if not sids:
+            return {}
+        await self.connect()
+        values = await self.redis_client.hmget(self.users_key, sids)
+        return {sid: json.loads(raw) for sid, raw in zip(sids, values) if raw}
+
+    async def sids_for_user(self, user_id: str) -> list[str]:
+        await self.connect()
+        return [_text(sid) for sid in await self.redis_client.smembers(self._user_sids_key(user_id))]
+
+    async def find_user(self, user_id: str) -> Optional[dict[str, Any]]:
+        users = await self.get_users(await self.sids_for_user(user_id))
+        return next(iter(users.values()), None)
+
+    async def user_count(self) -> int:
+        await self.connect()
+        return await self.redis_client.hlen(self.users_key)
+
+    # ---- 방 멤버 ----
+
+    async def join_room(self, room_id: str, sid: str) -> bool:
+        await self.connect()
+        pipe = pipeline()
+        pipe.zadd(self._room_key(room_id), {sid: time.time()}, nx=True)
+        pipe.sadd(self._sid_rooms_key(sid), room_id)
+        added, _ = await pipe.execute()
+        return bool(added)
+
+    async def leave_room(self, room_id: str, sid: str):
+        await self.connect()
+        pipe = pipeline()
+        pipe.zrem(self._room_key(room_id), sid)
+        pipe.srem(self._sid_rooms_key(sid), room_id)
+        await pipe.execute()
+
+    async def room_members(self, room_id: str) -> list[str]:
+        await self.connect()
+        return [_text(sid) for sid in await self.redis_client.zrange(self._room_key(room_id), 0, -1)]
+
+    async def rooms_of(self, sid: str) -> list[str]:
+        await self.connect()
+        return [_text(room_id) for room_id in await self.redis_client.smembers(self._sid_rooms_key(sid))]
+
+    # ---- 매칭 대기열 ----
+
+    async def queue_add(self, sid: str, rating: float) -> bool:
+        await self.connect()
+        pipe = transaction()
+        pipe.zadd(self.queue_key, {sid: float(rating)}, nx=True)
+        pipe.zadd(self.queue_since_key, {sid: time.time()}, nx=True)
+        added, _ = await pipe.execute()
+        return bool(added)
+
+    async def queue_contains(self, sid: str) -> bool:
+        await self.connect()
+        return await self.redis_client.zscore(self.queue_key, sid) is not None
+
+    def _window_args(self) -> list:
+        return [
+            time.time(),
+            settings.matchmaking_window_base,
+            settings.matchmaking_window_widen_per_second,
+            settings.matchmaking_window_max,
+            settings.matchmaking_candidates,
+        ]
+
+    async def queue_match(self, sid: str) -> Optional[tuple[QueueEntry, QueueEntry]]:
+        await self.connect()
+        pairs = _pairs(await self._match_script(keys=[self.queue_key, self.queue_since_key], args=[sid, *self._window_args()]))
+        return pairs[0] if pairs else None
+
+    async def queue_sweep(self, limit: int) -> list[tuple[QueueEntry, QueueEntry]]:
+        await self.connect()
+        return _pairs(await self._sweep_script(keys=[self.queue_key, self.queue_since_key], args=[limit, *self._window_args()]))
+
+    async def queue_remove(self, sid: str) -> bool:
+        await self.connect()
+        pipe = transaction()
+        pipe.zrem(self.queue_key, sid)
+        pipe.zrem(self.queue_since_key, sid)
+        removed, _ = await pipe.execute()
+        return bool(removed)
+
+    async def queue_size(self) -> int:
+        await self.connect()
+        return await self.redis_client.zcard(self.queue_key)
+
+    # ---- 배틀 준비 데이터 ----
+
+    async def set_battle_ready(self, room_id: str, data: dict[str, Any]):
+        await self.connect()
+        await self.redis_client.set(f"{self.prefix}battle_ready:{room_id}", json.dumps(data, default=str), ex=BATTLE_TTL_SECONDS)
+
+    async def get_battle_ready(self, room_id: str) -> Optional[dict[str, Any]]:
+        await self.connect()
+        raw = await self.redis_client.get(f"{self.prefix}battle_ready:{room_id}")
+        return json.loads(raw) if raw else None
+
+    async def update_battle_ready(self, room_id: str, **fields) -> bool:
+        data = await self.get_battle_ready(room_id)
+        if data is None:
+            return False
+        data.update(fields)
+        await self.set_battle_ready(room_id, data)
+        return True
+
+    # ---- 배경 투표 ----
+
+    async def add_background_vote(self, room_id: str, user_id: str, background_id: str) -> dict[str, str]:
+        await self.connect()
+        key = f"{self.prefix}bg_votes:{room_id}"
+        pipe = pipeline()
+        pipe.hset(key, str(user_id), background_id)
+        pipe.expire(key, BATTLE_TTL_SECONDS)
+        pipe.hgetall(key)
+        _, _, votes = await pipe.execute()
+        return {_text(k): _text(v) for k, v in votes.items()}
+
+    async def clear_background_votes(self, room_id: str):
+        await self.connect()
+        await self.redis_client.delete(f"{self.prefix}bg_votes:{room_id}")
+
+    # ---- 재접속 대기 ----
+
+    async def set_pending_disconnect(self, user_id: str, data: dict[str, Any]):
+        await self.connect()
+        await self.redis_client.set(f"{self.prefix}pending:{user_id}", json.dumps(data, default=str), ex=PENDING_TTL_SECONDS)
+
+    async def pop_pending_disconnect(self, user_id: str, sid: Optional[str] = None) -> Optional[dict[str, Any]]:
+        await self.connect()
+        raw = await self._pop_pending_script(keys=[f"{self.prefix}pending:{user_id}"], args=[sid or ""])
+        return json.loads(raw) if raw else None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"backend": "redis", "prefix": self.prefix}
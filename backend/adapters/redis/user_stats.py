@@ -0,0 +1,96 @@
+"""Redis 기반 유저 통계 카운터
+
+랭킹/프로필 조회마다 users 테이블을 COUNT 하지 않도록
+전체 유저 수, 랭크 유저 수(1판 이상 플레이), ELO 히스토그램을 Redis 해시로 유지한다.
+- 유저 생성 / 레이팅 변경 시 HINCRBY 로 증분 갱신
+- 주기적인 reconcile 로 DB 집계값을 덮어써서 drift 보정
+"""
+from typing import Optional
+
+
+from adapters.redis.client import get_redis
+from config import get_settings
+
+settings = get_settings()
+
+# ELO 히스토그램 버킷 폭 (1200 -> "1200" 버킷은 1200~1299)
+ELO_BUCKET_WIDTH = 100
+
+
+def elo_bucket(rating: int) -> int:
+    return (rating // ELO_BUCKET_WIDTH) * ELO_BUCKET_WIDTH
+
+
+class UserStats:
+    """전체/랭크 유저 수 + ELO 히스토그램 (Redis HASH)"""
+
+    def __init__(self, prefix: str = "stats:users"):
+        self.redis_client = None
+        self.counts_key = f"{prefix}:counts"
+        self.hist_key = f"{prefix}:elo_hist"
+        self.ready_key = f"{prefix}:ready"
+
+    async def connect(self):
+        """Redis 연결"""
+        if self.redis_client is None:
+            self.redis_client = get_redis()
+        return self.redis_client
+
+    async def is_ready(self) -> bool:
+        """reconcile 이 한 번이라도 실행되었는지 (아니면 호출 측은 DB 로 fallback)"""
+        await self.connect()
+        return bool(await self.redis_client.exists(self.ready_key))
+
+    async def on_user_created(self, rating: int):
+        await self.connect()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hincrby(self.counts_key, "total", 1)
+        pipe.hincrby(self.hist_key, str(elo_bucket(rating)), 1)
+        await pipe.execute()
+
+    async def on_rating_changed(self, changes: list[tuple[int, int, bool]]):
+        """
+        changes: [(old_rating, new_rating, first_game), ...]
+        first_game=True 면 이번 경기로 처음 랭크 유저가 됨
+        """
+        await self.connect()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for old_rating, new_rating, first_game in changes:
+            old_bucket, new_bucket = elo_bucket(old_rating), elo_bucket(new_rating)
+            if old_bucket != new_bucket:
+                pipe.hincrby(self.hist_key, str(old_bucket), -1)
+                pipe.hincrby(self.hist_key, str(new_bucket), 1)
+            if first_game:
+                pipe.hincrby(self.counts_key, "ranked", 1)
+        if len(pipe):
+            await pipe.execute()
+
+    async def get_counts(self) -> Optional[dict[str, int]]:
+        """{"total": n, "ranked": m} (reconcile 전이면 None)"""
+        if not await self.is_ready():
+            return None
+        values = await self.redis_client.hgetall(self.counts_key)
+        counts = {k.decode(): int(v) for k, v in values.items()}
+        return {"total": counts.get("total", 0), "ranked": counts.get("ranked", 0)}
+
+    async def get_histogram(self) -> Optional[dict[int, int]]:
+        """{bucket_start: count} 오름차순 (reconcile 전이면 None)"""
+        if not await self.is_ready():
+            return None
+        values = await self.redis_client.hgetall(self.hist_key)
+        return dict(sorted((int(k), int(v)) for k, v in values.items() if int(v) > 0))
+
+    async def replace(self, total: int, ranked: int, histogram: dict[int, int]):
+        """DB 집계값으로 전체 덮어쓰기 (reconcile)"""
+        await self.connect()
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.delete(self.counts_key, self.hist_key)
+        pipe.hset(self.counts_key, mapping={"total": total, "ranked": ranked})
+        if histogram:
+            pipe.hset(self.hist_key, mapping={str(k): v for k, v in histogram.items()})
+        pipe.set(self.ready_key, 1)
+        await pipe.execute()
+
+
+# 싱글톤 인스턴스
+user_stats = UserStats()
@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Any
 import socketio
 import logging
 import asyncio
+import time
+import uuid
+from dataclasses import replace
 from jose import jwt, JWTError
 
 # Logger Setup
@@ -12,27 +14,33 @@ logger = logging.getLogger(__name__)
 from config import get_settings
 settings = get_settings()
 
+# DB query counting per socket event
+from adapters.background import spawn
+from adapters.db.instrumentation import instrument_socket_handler
+
 # Redis Battle State Manager
-from adapters.redis.battle_state import battle_state_manager
+from adapters.battle_state import battle_state_manager
+
+# Battle event log (Redis Stream per battle, archived to Postgres at battle end)
+from adapters.redis import battle_events
+from use_cases.battle_event_service import record_events, archive_battle_safely
+
+# Server-side turn deadlines (one timer wheel per worker)
+from use_cases.turn_timer import turn_timer
 
 # Room Service for status updates
 from use_cases.room_service import RoomService
 room_service = RoomService()
 
-# Connected users mapping: sid -> user_info
-connected_users: dict[str, dict[str, Any]] = {}
+# Connected users, room members, matchmaking queue, battle ready data, pending disconnects
+# (process memory, or Redis when SOCKET_MULTI_WORKER is on)
+from adapters.socket.state import QueueEntry, socket_state
 
-# Room memberships: room_id -> list of sids
-room_members: dict[str, list[str]] = {}
+# ELO-banded matchmaking (queue lives in socket_state)
+from use_cases.matchmaking import matchmaker
 
-# Matchmaking queue: list of waiting user sids
-waiting_queue: list[str] = []
-
-# Battle ready tracking: room_id -> {player_id: sid, first_turn_player_id: str}
-battle_ready_data: dict[str, dict[str, Any]] = {}
-
-# Pending disconnects for grace period: user_id -> {task, sid, user_info, rooms}
-pending_disconnects: dict[str, dict[str, Any]] = {}
+# Delayed disconnect tasks started by this worker: user_id -> task
+disconnect_tasks: dict[str, asyncio.Task] = {}
 
 # Grace period in seconds (time to wait for reconnection)
 DISCONNECT_GRACE_PERIOD = 10
@@ -55,30 +63,19 @@ async def update_player_elo(winner_id: str, loser_id: str) -> tuple[int, int]:
             winner_uuid = UUID(winner_id) if isinstance(winner_id, str) else winner_id
             loser_uuid = UUID(loser_id) if isinstance(loser_id, str) else loser_id
             
-            winner = await repo.get_by_id(winner_uuid)
-            loser = await repo.get_by_id(loser_uuid)
+            # 두 플레이어를 한 트랜잭션(단일 statement)에서 잠그고 갱신
+            settlement = await repo.settle_match(winner_uuid, loser_uuid)
             
-            if not winner or not loser:
+            if not settlement:
                 logger.warning(f"ELO update failed: winner={winner_id} or loser={loser_id} not found")
                 return 0, 0
             
-            # ELO calculation (K-factor: 32)
-            k = 32
-            winner_elo = winner.elo_rating
-            loser_elo = loser.elo_rating
-            
-            winner_expected = 1 / (1 + 10 ** ((loser_elo - winner_elo) / 400))
-            loser_expected = 1 / (1 + 10 ** ((winner_elo - loser_elo) / 400))
-            
-            winner_change = int(k * (1 - winner_expected))
-            loser_change = int(k * (0 - loser_expected))
-            
-            # Update database
-            await repo.update_elo_rating(winner_uuid, winner_elo + winner_change, wins_delta=1)
-            await repo.update_elo_rating(loser_uuid, loser_elo + loser_change, losses_delta=1)
-            
-            logger.info(f"✅ ELO updated: winner {winner.nickname} +{winner_change} ({winner_elo} -> {winner_elo + winner_change}), "
-                       f"loser {loser.nickname} {loser_change} ({loser_elo} -> {loser_elo + loser_change})")
+            winner_change = settlement.winner_change
+            loser_change = settlement.loser_change
+            logger.info(f"✅ ELO updated: winner {settlement.winner_nickname} +{winner_change} "
+                       f"({settlement.winner_elo - winner_change} -> {settlement.winner_elo}), "
+                       f"loser {settlement.loser_nickname} {loser_change} "
+                       f"({settlement.loser_elo - loser_change} -> {settlement.loser_elo})")
             
             return winner_change, loser_change
             
@@ -87,6 +84,62 @@ async def update_player_elo(winner_id: str, loser_id: str) -> tuple[int, int]:
         return 0, 0
 
 
+async def load_queue_rating(user_id) -> float:
+    """Matchmaking rating from the server-side profile (never the client's auth payload)."""
+    from adapters.db.loader import user_loader
+    
+    try:
+        user = await user_loader.load(user_id)
+    except Exception as e:
+        logger.warning(f"Rating lookup failed for {user_id}, using default: {e}")
+        return 1200.0
+    return float(user.elo_rating) if user else 1200.0
+
+
+def add_match_history(history: dict, winner_id: str, winner_change: int, loser_change: int):
+    """Buffer a match history row (history = match_row kwargs without the ELO changes)."""
+    from adapters.db.match_writer import match_history_writer
+    
+    p1_won = str(winner_id) == str(history["player1_id"])
+    match_history_writer.add(
+        **history,
+        player1_elo_change=winner_change if p1_won else loser_change,
+        player2_elo_change=loser_change if p1_won else winner_change,
+    )
+
+
+async def record_match_result(battle_id: str, winner_id: str, loser_id: str, history: dict) -> tuple[int, int]:
+    """
+    Queue a ranked result for write-behind settlement and return the ELO
+    changes predicted from cached ratings (the consumer recomputes them from
+    the locked DB rows and writes the match history with the actual changes).
+    Falls back to an inline update if the queue is down.
+    """
+    from adapters.db.loader import user_loader
+    from adapters.redis.match_queue import match_result_queue
+    from domain.entities import calculate_elo_changes
+    
+    try:
+        await match_result_queue.enqueue(battle_id, winner_id, loser_id, history)
+    except Exception as e:
+        logger.warning(f"Match queue unavailable, settling inline: {e}")
+        winner_change, loser_change = await update_player_elo(winner_id, loser_id)
+        try:
+            add_match_history(history, winner_id, winner_change, loser_change)
+        except Exception as e:
+            logger.warning(f"Match history record failed for {battle_id}: {e}")
+        return winner_change, loser_change
+    
+    try:
+        winner, loser = await asyncio.gather(user_loader.load(winner_id), user_loader.load(loser_id))
+    except Exception as e:
+        logger.warning(f"Cached rating lookup failed for {battle_id}: {e}")
+        return 0, 0
+    if not winner or not loser:
+        return 0, 0
+    return calculate_elo_changes(winner.elo_rating, loser.elo_rating)
+
+
 def register_socket_handlers(sio: socketio.AsyncServer):
     """Register all Socket.io event handlers."""
     
@@ -124,59 +177,46 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         elo_rating = auth.get("elo_rating") or 1200
         avatar_url = auth.get("avatar_url") or None
         
-        # Check if this user has a pending disconnect (reconnecting)
+        # Check if this user has a pending disconnect (reconnecting, possibly on another worker)
         str_user_id = str(user_id)
-        if str_user_id in pending_disconnects:
-            pending = pending_disconnects[str_user_id]
+        pending = await socket_state.pop_pending_disconnect(str_user_id)
+        if pending:
             logger.info(f"User {user_id} reconnecting within grace period! Cancelling disconnect...")
             
-            # Cancel the pending disconnect task
-            pending["task"].cancel()
+            # Cancel the pending disconnect task (if this worker started it; others find nothing to pop)
+            task = disconnect_tasks.pop(str_user_id, None)
+            if task:
+                task.cancel()
             
             # Restore room memberships with new sid
             old_sid = pending["sid"]
             for room_id in pending["rooms"]:
-                # Remove old sid from room members first
-                if room_id in room_members and old_sid in room_members[room_id]:
-                    room_members[room_id].remove(old_sid)
-                    logger.info(f"Removed old sid {old_sid} from room {room_id}")
-                
-                # Add new sid to room
-                if room_id not in room_members:
-                    room_members[room_id] = []
-                if sid not in room_members[room_id]:
-                    room_members[room_id].append(sid)
+                # Replace old sid with the new one
+                await socket_state.leave_room(room_id, old_sid)
+                await socket_state.join_room(room_id, sid)
                 
                 # Join socket room
                 await sio.enter_room(sid, room_id)
                 logger.info(f"Restored user {user_id} to room {room_id} with new sid {sid}")
-            
-        # Clean up pending disconnect safely
-        if str_user_id in pending_disconnects:
-            del pending_disconnects[str_user_id]
         
         # Remove any stale connections for this user_id to prevent duplicate counts
-        stale_sids = []
-        for existing_sid, info in connected_users.items():
-            if str(info.get("user_id")) == str(user_id):
-                stale_sids.append(existing_sid)
-        
-        for stale_sid in stale_sids:
+        for stale_sid in await socket_state.sids_for_user(str_user_id):
             logger.warning(f"Removing stale connection {stale_sid} for user {user_id} before adding new one")
-            connected_users.pop(stale_sid, None)
+            await socket_state.remove_user(stale_sid)
 
-        connected_users[sid] = {
+        await socket_state.add_user(sid, {
             "user_id": user_id,
             "nickname": nickname,
             "elo_rating": elo_rating,
             "avatar_url": avatar_url,
+            "is_guest": bool(payload.get("guest")),
             "connected_at": datetime.utcnow().isoformat()
-        }
+        })
         
         logger.info(f"[{sid}] Client connected successfully: user_id={user_id}, nickname={nickname}")
         
         # Broadcast user count
-        await sio.emit("user:count", {"count": len(connected_users)})
+        await sio.emit("user:count", {"count": await socket_state.user_count()})
         
         # Default: Join "lobby" room for global chat
         await sio.enter_room(sid, "lobby")
@@ -189,25 +229,25 @@ def register_socket_handlers(sio: socketio.AsyncServer):
             await asyncio.sleep(DISCONNECT_GRACE_PERIOD)
             
             # Still pending after grace period - execute disconnect
-            if user_id in pending_disconnects:
+            # (a reconnect on any worker pops the pending entry first)
+            if await socket_state.pop_pending_disconnect(user_id, sid):
                 logger.info(f"Grace period expired for user {user_id}. Executing disconnect...")
                 
                 # Notify rooms about the player leaving
                 for room_id in rooms:
-                    if room_id in room_members and sid in room_members[room_id]:
-                        room_members[room_id].remove(sid)
+                    await socket_state.leave_room(room_id, sid)
                     await sio.emit("room:player_left", {
                         "user_id": user_info.get("user_id", sid)
                     }, room=room_id)
                 
-                # Clean up
-                del pending_disconnects[user_id]
-                
                 # Broadcast updated user count
-                await sio.emit("user:count", {"count": len(connected_users)})
+                await sio.emit("user:count", {"count": await socket_state.user_count()})
                 
         except asyncio.CancelledError:
             logger.info(f"Disconnect cancelled for user {user_id} (reconnected)")
+        finally:
+            if disconnect_tasks.get(user_id) is asyncio.current_task():
+                del disconnect_tasks[user_id]
     
     @sio.event
     async def disconnect(sid):
@@ -215,181 +255,189 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         logger.info(f"Client disconnected: {sid}")
         
         # Remove from matchmaking queue immediately
-        if sid in waiting_queue:
-            waiting_queue.remove(sid)
+        await matchmaker.cancel(sid)
         
-        user_info = connected_users.get(sid, {})
+        # Remove from connected users immediately
+        user_info = await socket_state.remove_user(sid) or {}
         user_id = str(user_info.get("user_id", sid))
         
         # Find all rooms this user is in
-        user_rooms = []
-        for room_id, members in room_members.items():
-            if sid in members:
-                user_rooms.append(room_id)
-        
-        # Remove from connected users immediately
-        connected_users.pop(sid, None)
+        user_rooms = await socket_state.rooms_of(sid)
         
         # If user was in any rooms, start grace period instead of immediate removal
         if user_rooms:
             logger.info(f"Starting {DISCONNECT_GRACE_PERIOD}s grace period for user {user_id} in rooms: {user_rooms}")
             
-            # Create a task for delayed disconnect
-            task = asyncio.create_task(delayed_disconnect(user_id, sid, user_info, user_rooms))
-            pending_disconnects[user_id] = {
-                "task": task,
+            await socket_state.set_pending_disconnect(user_id, {
                 "sid": sid,
                 "user_info": user_info,
                 "rooms": user_rooms
-            }
+            })
+            # Create a task for delayed disconnect
+            disconnect_tasks[user_id] = asyncio.create_task(delayed_disconnect(user_id, sid, user_info, user_rooms))
         else:
             # Not in any rooms, just broadcast user count
-            await sio.emit("user:count", {"count": len(connected_users)})
+            await sio.emit("user:count", {"count": await socket_state.user_count()})
 
     # --- Matchmaking Handlers ---
-    @sio.on("match:join_queue")
-    async def join_queue(sid, data):
-        """Join matchmaking queue."""
-        logger.info(f"[Matchmaking] User {sid} requesting to join queue")
-        logger.info(f"[Matchmaking] Current queue: {waiting_queue}")
-        
-        if sid in waiting_queue:
-            logger.info(f"[Matchmaking] User {sid} already in queue, ignoring")
+    async def start_ranked_match(entry: QueueEntry, opponent: QueueEntry):
+        """Create a ranked battle for a matched pair and notify both players."""
+        sid, opponent_sid = entry.sid, opponent.sid
+        p1_info, p2_info = await asyncio.gather(socket_state.get_user(sid), socket_state.get_user(opponent_sid))
+        
+        # Verify both players are still connected (the one still here goes back to the queue)
+        if not p1_info or not p2_info:
+            for waiting, info in ((entry, p1_info), (opponent, p2_info)):
+                if info:
+                    logger.warning(f"[Matchmaking] Opponent of {waiting.sid} disconnected, re-queueing {waiting.sid}")
+                    await socket_state.queue_add(waiting.sid, waiting.rating)
+                    await sio.emit("match:searching", {}, room=waiting.sid)
             return
+        
+        # Create a match (uuid suffix: workers can create battles in the same millisecond)
+        battle_id = f"battle_{int(datetime.utcnow().timestamp() * 1000)}_{uuid.uuid4().hex[:6]}"
+        
+        # Fetch full user info for both players (profile cache, then one batched DB query)
+        p1_db_info = {}
+        p2_db_info = {}
+        try:
+            from adapters.db.loader import user_loader
             
-        # Check if anyone is waiting
-        if waiting_queue:
-            opponent_sid = waiting_queue.pop(0)
-            logger.info(f"[Matchmaking] Found opponent {opponent_sid} in queue")
-            
-            # Verify opponent is still connected
-            if opponent_sid not in connected_users:
-                logger.warning(f"[Matchmaking] Opponent {opponent_sid} disconnected, adding {sid} to queue")
-                waiting_queue.append(sid)
-                await sio.emit("match:searching", {}, room=sid)
-                return
-            
-            # Create a match
-            battle_id = f"battle_{int(datetime.utcnow().timestamp() * 1000)}"
-            
-            p1_info = connected_users.get(sid, {})
-            p2_info = connected_users.get(opponent_sid, {})
-            
-            # Fetch full user info from DB for both players
-            p1_db_info = {}
-            p2_db_info = {}
-            try:
-                from adapters.db.database import AsyncSessionLocal
-                from adapters.db.repository import UserRepository
-                from uuid import UUID
-                
-                async with AsyncSessionLocal() as db:
-                    repo = UserRepository(db)
-                    
-                    p1_user_id = p1_info.get("user_id")
-                    p2_user_id = p2_info.get("user_id")
-                    
-                    if p1_user_id:
-                        p1_user = await repo.get_by_id(UUID(str(p1_user_id)))
-                        if p1_user:
-                            p1_db_info = {
-                                "wins": p1_user.wins,
-                                "losses": p1_user.losses,
-                                "main_character_id": p1_user.main_character_id
-                            }
-                    
-                    if p2_user_id:
-                        p2_user = await repo.get_by_id(UUID(str(p2_user_id)))
-                        if p2_user:
-                            p2_db_info = {
-                                "wins": p2_user.wins,
-                                "losses": p2_user.losses,
-                                "main_character_id": p2_user.main_character_id
-                            }
-                            
-                logger.info(f"[Matchmaking] DB info fetched: P1={p1_db_info}, P2={p2_db_info}")
-            except Exception as e:
-                logger.warning(f"[Matchmaking] Failed to fetch DB info: {e}")
-            
-            # Add both players to the battle room for real-time communication
-            await sio.enter_room(sid, battle_id)
-            await sio.enter_room(opponent_sid, battle_id)
-            logger.info(f"[Matchmaking] Both players joined battle room: {battle_id}")
-            
-            # Track room members (same as CREATE ROOM flow)
-            room_members[battle_id] = [sid, opponent_sid]
-            
-            # Store battle data for battle:ready handler (same as CREATE ROOM flow)
-            player_ids = [str(p1_info.get("user_id", sid)), str(p2_info.get("user_id", opponent_sid))]
-            players = [
-                {"user_id": p1_info.get("user_id", sid), "nickname": p1_info.get("nickname", "Player 1")},
-                {"user_id": p2_info.get("user_id", opponent_sid), "nickname": p2_info.get("nickname", "Player 2")}
-            ]
+            p1_user, p2_user = await asyncio.gather(
+                user_loader.load(p1_info.get("user_id")),
+                user_loader.load(p2_info.get("user_id")),
+            )
             
-            import random
-            first_player_index = random.randint(0, 1)
-            first_player_id = player_ids[first_player_index]
+            if p1_user:
+                p1_db_info = {
+                    "wins": p1_user.wins,
+                    "losses": p1_user.losses,
+                    "main_character_id": p1_user.main_character_id
+                }
             
-            # Create Redis battle session for Fast Matching (Ranked)
+            if p2_user:
+                p2_db_info = {
+                    "wins": p2_user.wins,
+                    "losses": p2_user.losses,
+                    "main_character_id": p2_user.main_character_id
+                }
+                        
+            logger.info(f"[Matchmaking] DB info fetched: P1={p1_db_info}, P2={p2_db_info}")
+        except Exception as e:
+            logger.warning(f"[Matchmaking] Failed to fetch DB info: {e}")
+        
+        # 랭크 매치는 게스트를 저장할 첫 행동: ELO 정산 전에 users 행으로 승격
+        guest_ids = [info.get("user_id") for info in (p1_info, p2_info) if info.get("is_guest")]
+        if guest_ids:
+            from use_cases.guest_service import promote_guest
             try:
-                await battle_state_manager.create_battle(
-                    battle_id=battle_id,
-                    player1_id=str(player_ids[0]),
-                    player2_id=str(player_ids[1]),
-                    is_ranked=True  # Fast Matching is Ranked
-                )
-                logger.info(f"[Matchmaking] Redis battle session created: {battle_id} (Ranked)")
+                await asyncio.gather(*(promote_guest(uid) for uid in guest_ids))
             except Exception as e:
-                logger.warning(f"[Matchmaking] Redis battle creation failed: {e}")
+                logger.warning(f"[Matchmaking] Guest promotion failed: {e}")
+        
+        # Add both players to the battle room for real-time communication
+        await sio.enter_room(sid, battle_id)
+        await sio.enter_room(opponent_sid, battle_id)
+        logger.info(f"[Matchmaking] Both players joined battle room: {battle_id}")
+        
+        # Track room members (same as CREATE ROOM flow)
+        await socket_state.join_room(battle_id, sid)
+        await socket_state.join_room(battle_id, opponent_sid)
+        
+        # Store battle data for battle:ready handler (same as CREATE ROOM flow)
+        player_ids = [str(p1_info.get("user_id", sid)), str(p2_info.get("user_id", opponent_sid))]
+        players = [
+            {"user_id": p1_info.get("user_id", sid), "nickname": p1_info.get("nickname", "Player 1")},
+            {"user_id": p2_info.get("user_id", opponent_sid), "nickname": p2_info.get("nickname", "Player 2")}
+        ]
+        
+        import random
+        first_player_index = random.randint(0, 1)
+        first_player_id = player_ids[first_player_index]
+        
+        # Create Redis battle session for Fast Matching (Ranked)
+        try:
+            await battle_state_manager.create_battle(
+                battle_id=battle_id,
+                player1_id=str(player_ids[0]),
+                player2_id=str(player_ids[1]),
+                is_ranked=True  # Fast Matching is Ranked
+            )
+            logger.info(f"[Matchmaking] Redis battle session created: {battle_id} (Ranked)")
+        except Exception as e:
+            logger.warning(f"[Matchmaking] Redis battle creation failed: {e}")
 
-            battle_ready_data[battle_id] = {
-                "battle_id": battle_id,
-                "players": players,
-                "player_ids": player_ids,
-                "first_turn_player_id": first_player_id,
-                "members": [sid, opponent_sid],
+        await socket_state.set_battle_ready(battle_id, {
+            "battle_id": battle_id,
+            "players": players,
+            "player_ids": player_ids,
+            "first_turn_player_id": first_player_id,
+            "members": [sid, opponent_sid],
+        })
+        logger.info(f"[Matchmaking] Stored battle ready data for {battle_id}")
+        
+        # Notify both players with full opponent info
+        await sio.emit("match:found", {
+            "battle_id": battle_id,
+            "opponent": {
+                "user_id": p2_info.get("user_id"),
+                "nickname": p2_info.get("nickname", "Unknown"),
+                "elo_rating": int(opponent.rating),
+                "avatar_url": p2_info.get("avatar_url"),
+                "wins": p2_db_info.get("wins", 0),
+                "losses": p2_db_info.get("losses", 0),
+                "main_character_id": p2_db_info.get("main_character_id"),
             }
-            logger.info(f"[Matchmaking] Stored battle_ready_data for {battle_id}")
-            
-            # Notify both players with full opponent info
-            await sio.emit("match:found", {
-                "battle_id": battle_id,
-                "opponent": {
-                    "user_id": p2_info.get("user_id"),
-                    "nickname": p2_info.get("nickname", "Unknown"),
-                    "elo_rating": p2_info.get("elo_rating", 1200),
-                    "avatar_url": p2_info.get("avatar_url"),
-                    "wins": p2_db_info.get("wins", 0),
-                    "losses": p2_db_info.get("losses", 0),
-                    "main_character_id": p2_db_info.get("main_character_id"),
-                }
-            }, room=sid)
-            
-            await sio.emit("match:found", {
-                "battle_id": battle_id,
-                "opponent": {
-                    "user_id": p1_info.get("user_id"),
-                    "nickname": p1_info.get("nickname", "Unknown"),
-                    "elo_rating": p1_info.get("elo_rating", 1200),
-                    "avatar_url": p1_info.get("avatar_url"),
-                    "wins": p1_db_info.get("wins", 0),
-                    "losses": p1_db_info.get("losses", 0),
-                    "main_character_id": p1_db_info.get("main_character_id"),
-                }
-            }, room=opponent_sid)
-            
-            logger.info(f"[Matchmaking] ✅ Match found: {p1_info.get('nickname')} vs {p2_info.get('nickname')} (battle_id: {battle_id})")
-            
+        }, room=sid)
+        
+        await sio.emit("match:found", {
+            "battle_id": battle_id,
+            "opponent": {
+                "user_id": p1_info.get("user_id"),
+                "nickname": p1_info.get("nickname", "Unknown"),
+                "elo_rating": int(entry.rating),
+                "avatar_url": p1_info.get("avatar_url"),
+                "wins": p1_db_info.get("wins", 0),
+                "losses": p1_db_info.get("losses", 0),
+                "main_character_id": p1_db_info.get("main_character_id"),
+            }
+        }, room=opponent_sid)
+        
+        logger.info(f"[Matchmaking] ✅ Match found: {p1_info.get('nickname')} vs {p2_info.get('nickname')} (battle_id: {battle_id})")
+
+    @sio.on("match:join_queue")
+    async def join_queue(sid, data):
+        """Join matchmaking queue (matched by ELO, window widens while waiting)."""
+        logger.info(f"[Matchmaking] User {sid} requesting to join queue")
+        logger.info(f"[Matchmaking] Current queue size: {await socket_state.queue_size()}")
+        
+        if await socket_state.queue_contains(sid):
+            logger.info(f"[Matchmaking] User {sid} already in queue, ignoring")
+            return
+        
+        user_info = await socket_state.get_user(sid)
+        if not user_info:
+            logger.warning(f"[Matchmaking] Unknown sid {sid}, ignoring queue join")
+            return
+        rating = await load_queue_rating(user_info.get("user_id"))
+        
+        # Check if anyone within the rating window is waiting
+        pair = await matchmaker.join(sid, rating)
+        if pair:
+            entry, opponent = pair
+            logger.info(f"[Matchmaking] Found opponent {opponent.sid} in queue (ELO {entry.rating:.0f} vs {opponent.rating:.0f})")
+            await start_ranked_match(entry, opponent)
         else:
-            waiting_queue.append(sid)
-            logger.info(f"[Matchmaking] No opponent available, {sid} added to queue. Queue size: {len(waiting_queue)}")
+            logger.info(f"[Matchmaking] No opponent in range, {sid} added to queue (ELO {rating:.0f})")
             await sio.emit("match:searching", {}, room=sid)
+    
+    # Players whose window widened while waiting are paired by the matchmaker's sweep
+    matchmaker.on_match = start_ranked_match
 
     @sio.on("match:leave_queue")
     async def leave_queue(sid, data):
         """Leave matchmaking queue."""
-        if sid in waiting_queue:
-            waiting_queue.remove(sid)
+        if await matchmaker.cancel(sid):
             logger.info(f"User {sid} left matchmaking queue")
             await sio.emit("match:cancelled", {}, room=sid)
     
@@ -412,7 +460,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         room_id = str(room_id)
         
         # Validate entry via RoomService (Check password / capacity)
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         user_id = user_info.get("user_id")
         password = data.get("password")
         
@@ -443,34 +491,30 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         await sio.enter_room(sid, room_id)
         logger.info(f"[{sid}] Entered socket room: {room_id}")
         
-        if room_id not in room_members:
-            room_members[room_id] = []
+        members = await socket_state.room_members(room_id)
+        member_infos = await socket_state.get_users(members)
         
         # Clean up stale SIDs for this user (same user_id with different SID)
         user_id = user_info.get("user_id")
         if user_id:
-            stale_sids = []
-            for existing_sid in room_members[room_id]:
-                if existing_sid != sid:
-                    existing_user_info = connected_users.get(existing_sid, {})
-                    if str(existing_user_info.get("user_id")) == str(user_id):
-                        stale_sids.append(existing_sid)
+            stale_sids = [
+                user_sid for user_sid in await socket_state.sids_for_user(str(user_id))
+                if user_sid != sid and user_sid in member_infos
+            ]
             
             for stale_sid in stale_sids:
-                room_members[room_id].remove(stale_sid)
+                await socket_state.leave_room(room_id, stale_sid)
+                members.remove(stale_sid)
                 logger.info(f"[{sid}] Removed stale SID {stale_sid} for same user {user_id} from room {room_id}")
         
-        # Check if this is a new join or a rejoin (e.g., after page refresh)
-        is_new_player = sid not in room_members[room_id]
-        
         # Get existing members before adding new one (to send to new player)
         existing_members = []
-        for existing_sid in room_members[room_id]:
+        for existing_sid in members:
             # Skip self if already in list
             if existing_sid == sid:
                 continue
                 
-            existing_info = connected_users.get(existing_sid, {})
+            existing_info = member_infos.get(existing_sid)
             # Skip if no user info (stale connection)
             if not existing_info:
                 continue
@@ -482,13 +526,13 @@ def register_socket_handlers(sio: socketio.AsyncServer):
                 "avatar_url": existing_info.get("avatar_url")
             })
         
+        # Check if this is a new join or a rejoin (e.g., after page refresh)
+        is_new_player = await socket_state.join_room(room_id, sid)
         if is_new_player:
-            room_members[room_id].append(sid)
-            logger.info(f"[{sid}] Added to room_members[{room_id}]. Current members: {room_members[room_id]}")
+            logger.info(f"[{sid}] Added to room members of {room_id}")
         else:
-            logger.info(f"[{sid}] Already in room_members[{room_id}] (rejoin)")
+            logger.info(f"[{sid}] Already in room members of {room_id} (rejoin)")
         
-        user_info = connected_users.get(sid, {})
         logger.info(f"[{sid}] User Info: {user_info}")
         
         # Send existing members to the newly joined player
@@ -517,7 +561,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         if not room_id:
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         user_id = user_info.get("user_id")
 
         # Sync with RoomService
@@ -533,13 +577,10 @@ def register_socket_handlers(sio: socketio.AsyncServer):
                 new_host_id = result.get("new_host_id")
                 if new_host_id:
                     new_host_id_str = str(new_host_id)
-                    new_host_nickname = "Unknown"
                     
                     # Find nickname of new host
-                    for s, info in connected_users.items():
-                        if str(info.get("user_id")) == new_host_id_str:
-                            new_host_nickname = info.get("nickname", "Unknown")
-                            break
+                    new_host_info = await socket_state.find_user(new_host_id_str) or {}
+                    new_host_nickname = new_host_info.get("nickname", "Unknown")
                     
                     logger.info(f"Host migrated to {new_host_nickname} ({new_host_id_str}) in room {room_id}")
                     await sio.emit("room:host_changed", {
@@ -553,8 +594,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         # Socket management
         await sio.leave_room(sid, room_id)
         
-        if room_id in room_members and sid in room_members[room_id]:
-            room_members[room_id].remove(sid)
+        await socket_state.leave_room(room_id, sid)
         
         await sio.emit("room:player_left", {
             "user_id": user_info.get("user_id", sid)
@@ -566,7 +606,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
     @sio.on("get:user_count")
     async def get_user_count(sid, data):
         """Send current user count to requester."""
-        await sio.emit("user:count", {"count": len(connected_users)}, room=sid)
+        await sio.emit("user:count", {"count": await socket_state.user_count()}, room=sid)
 
     @sio.on("room:ready")
     async def room_ready(sid, data):
@@ -578,7 +618,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         if not room_id:
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         
         await sio.emit("room:ready_status", {
             "user_id": user_info.get("user_id", sid),
@@ -597,7 +637,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         if not message:
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         nickname = user_info.get("nickname", "Unknown")
         
         
@@ -630,7 +670,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         character_id = data.get("character_id")
         if not room_id: return
 
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         await sio.emit("character:selected", {
             "user_id": user_info.get("user_id", sid),
             "character_id": character_id
@@ -643,10 +683,22 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         character_id = data.get("character_id")
         if not room_id: return
 
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
+        user_id = user_info.get("user_id", sid)
+        # 배틀 상태에도 저장 (경기 기록의 캐릭터 컬럼은 여기서 채워진다)
+        try:
+            if character_id and not await battle_state_manager.set_character(room_id, str(user_id), character_id):
+                logger.warning(f"[{sid}] character:confirm - {user_id} is not a player of battle {room_id}")
+        except Exception as e:
+            logger.warning(f"[{sid}] character:confirm - battle state update failed: {e}")
+        event_ids = await record_events(room_id, (battle_events.CHARACTER_PICK, {
+            "user_id": user_id,
+            "character_id": character_id,
+        }))
         await sio.emit("character:confirmed", {
-            "user_id": user_info.get("user_id", sid),
-            "character_id": character_id
+            "user_id": user_id,
+            "character_id": character_id,
+            "event_id": event_ids[0],
         }, room=room_id)
     
     # --- Background Selection Handlers ---
@@ -658,17 +710,13 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         if not room_id:
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         logger.info(f"[{sid}] background:select - {background_id} in room {room_id}")
         await sio.emit("background:selected", {
             "user_id": user_info.get("user_id", sid),
             "background_id": background_id
         }, room=room_id)
     
-    
-    # Simple in-memory storage for background votes
-    # room_id -> { user_id: background_id }
-    background_votes = {}
 
     @sio.on("background:confirm")
     async def background_confirm(sid, data):
@@ -678,7 +726,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         if not room_id:
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         user_id = user_info.get("user_id", sid)
         
         logger.info(f"[{sid}] background:confirm - {background_id} in room {room_id}")
@@ -690,12 +738,9 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         }, room=room_id)
 
         # Store vote
-        if room_id not in background_votes:
-            background_votes[room_id] = {}
-        background_votes[room_id][user_id] = background_id
+        votes = await socket_state.add_background_vote(room_id, str(user_id), background_id)
         
         # Check if 2 players have voted
-        votes = background_votes[room_id]
         if len(votes) >= 2:
             # Determine winner
             vote_values = list(votes.values())
@@ -715,7 +760,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
             }, room=room_id)
             
             # Cleanup votes for this room
-            del background_votes[room_id]
+            await socket_state.clear_background_votes(room_id)
     
     @sio.on("battle:countdown")
     async def battle_countdown(sid, data):
@@ -736,7 +781,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         room_id = data.get("room_id")
         if not room_id: return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         await sio.emit("battle:voice_start", {
             "user_id": user_info.get("user_id", sid)
         }, room=room_id, skip_sid=sid) # Don't send back to sender
@@ -747,13 +792,77 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         room_id = data.get("room_id")
         if not room_id: return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         await sio.emit("battle:voice_end", {
             "user_id": user_info.get("user_id", sid)
         }, room=room_id, skip_sid=sid)
 
     # ------------------------------------
     
+    async def finish_battle(battle_id: str, battle_state, winner_id: str, emit_data: dict, log_prefix: str = ""):
+        """Settle a finished battle: ELO (ranked), match history, final damage_received, battle:result, archive."""
+        room_id = str(battle_id)
+        
+        # Determine loser (the other player)
+        if str(winner_id) == str(battle_state.player1_id):
+            loser_id = battle_state.player2_id
+        else:
+            loser_id = battle_state.player1_id
+        
+        # 경기 기록 (ELO 변화량 제외, JSON 으로 큐에 실을 수 있는 값만)
+        history = {
+            "battle_id": str(battle_id),
+            "player1_id": str(battle_state.player1_id),
+            "player2_id": str(battle_state.player2_id),
+            "winner_id": str(winner_id),
+            "player1_character_id": battle_state.player1_character_id,
+            "player2_character_id": battle_state.player2_character_id,
+            "is_ranked": battle_state.is_ranked,
+            "turns": battle_state.turns,
+            "duration_seconds": round(time.time() - battle_state.started_at, 1) if battle_state.started_at else 0.0,
+            "ended_at": datetime.utcnow().isoformat(),
+        }
+        
+        # Update ELO in database ONLY if it's a Ranked Match
+        winner_change = 0
+        loser_change = 0
+        
+        if battle_state.is_ranked:
+            # DB 반영(경기 기록 포함)은 write-behind 큐에 맡기고 캐시된 레이팅으로 변화량만 계산
+            winner_change, loser_change = await record_match_result(battle_id, str(winner_id), str(loser_id), history)
+            logger.info(f"{log_prefix} Ranked Match Finished: ELO queued (+{winner_change} / {loser_change})")
+        else:
+            logger.info(f"{log_prefix} Friendly Match Finished: No ELO update")
+            # 경기 기록 (버퍼에 모았다가 배치 insert)
+            try:
+                add_match_history(history, winner_id, 0, 0)
+            except Exception as e:
+                logger.warning(f"{log_prefix} Match history record failed: {e}")
+        
+        # 1. FIRST: Emit damage_received so audio plays
+        logger.info(f"{log_prefix} Emitting battle:damage_received to room '{room_id}' with data: {emit_data}")
+        await sio.emit("battle:damage_received", emit_data, room=room_id)
+        
+        # 2. THEN: Wait for audio to play (approx 3 seconds) before emitting result
+        await asyncio.sleep(3.0)
+        
+        # 3. FINALLY: Emit battle:result with ELO changes
+        result_data = {
+            "winner_id": winner_id,
+            "loser_id": loser_id,
+            "stats": {
+                "winner_elo_change": winner_change,
+                "loser_elo_change": loser_change
+            }
+        }
+        result_event_ids = await record_events(battle_id, (battle_events.RESULT, result_data))
+        await sio.emit("battle:result", {**result_data, "event_id": result_event_ids[0]}, room=room_id)
+        
+        # 이벤트 로그를 Postgres 로 일괄 보관 (응답 경로 밖에서)
+        spawn(archive_battle_safely(battle_id))
+        
+        logger.info(f"{log_prefix} 🏆 Battle finished! Winner: {winner_id}, ELO changes: +{winner_change}/{loser_change}")
+    
     @sio.event
     async def battle_attack(sid, data):
         """Handle battle attack with Redis HP synchronization."""
@@ -768,10 +877,10 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         
         # Check who is in the battle room
         room_id = str(battle_id)
-        members_in_room = room_members.get(room_id, [])
+        members_in_room = await socket_state.room_members(room_id)
         logger.info(f"[{sid}] Members in room '{room_id}': {members_in_room}")
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         user_id = user_info.get("user_id", sid)
         damage = damage_data.get("total_damage", 0)
         
@@ -803,54 +912,66 @@ def register_socket_handlers(sio: socketio.AsyncServer):
             emit_data["current_turn"] = hp_update["current_turn"]
             emit_data["game_status"] = hp_update["status"]
             emit_data["winner_id"] = hp_update.get("winner_id")
-            
+        
+        # 이벤트 로그: 공격(데미지 상세) + 턴 변경. 클라이언트는 event_id 를 기억했다가 재접속 시 resync
+        attack_event = {
+            "attacker_id": user_id,
+            "damage_data": {k: v for k, v in damage_data.items() if k != "audio_url"},
+            **{k: emit_data[k] for k in ("player1_hp", "player2_hp", "game_status") if k in emit_data},
+        }
+        logged = [(battle_events.ATTACK, attack_event)]
+        if hp_update and hp_update["status"] != "finished":
+            logged.append((battle_events.TURN_CHANGE, {"current_turn": hp_update["current_turn"]}))
+        event_ids = await record_events(battle_id, *logged)
+        emit_data["event_id"] = event_ids[-1]
+        
+        # 다음 턴 마감 등록 (끝난 배틀은 취소)
+        if hp_update and hp_update["status"] != "finished":
+            turn_timer.start_turn(battle_id, hp_update["version"])
+        elif hp_update:
+            turn_timer.cancel(battle_id)
+        
+        if hp_update:
             # If game is finished, update ELO ratings
             winner_id = hp_update.get("winner_id")
             if winner_id and hp_update["status"] == "finished":
-                # Get battle state to find loser
-                battle_state = await battle_state_manager.get_battle(battle_id)
+                # 종료시킨 공격의 스크립트 응답에 전체 상태가 같이 옴 (추가 조회 없음)
+                battle_state = hp_update.get("state") or await battle_state_manager.get_battle(battle_id)
                 if battle_state:
-                    # Determine loser (the other player)
-                    if str(winner_id) == str(battle_state.player1_id):
-                        loser_id = battle_state.player2_id
-                    else:
-                        loser_id = battle_state.player1_id
-                    
-                    # Update ELO in database ONLY if it's a Ranked Match
-                    winner_change = 0
-                    loser_change = 0
-                    
-                    if battle_state.is_ranked:
-                        winner_change, loser_change = await update_player_elo(str(winner_id), str(loser_id))
-                        logger.info(f"[{sid}] Ranked Match Finished: ELO updated (+{winner_change} / {loser_change})")
-                    else:
-                        logger.info(f"[{sid}] Friendly Match Finished: No ELO update")
-                    
-                    # 1. FIRST: Emit damage_received so audio plays
-                    logger.info(f"[{sid}] Emitting battle:damage_received to room '{room_id}' with data: {emit_data}")
-                    await sio.emit("battle:damage_received", emit_data, room=room_id)
-                    
-                    # 2. THEN: Wait for audio to play (approx 3 seconds) before emitting result
-                    import asyncio
-                    await asyncio.sleep(3.0)
-                    
-                    # 3. FINALLY: Emit battle:result with ELO changes
-                    await sio.emit("battle:result", {
-                        "winner_id": winner_id,
-                        "loser_id": loser_id,
-                        "stats": {
-                            "winner_elo_change": winner_change,
-                            "loser_elo_change": loser_change
-                        }
-                    }, room=room_id)
-                    
-                    logger.info(f"[{sid}] 🏆 Battle finished! Winner: {winner_id}, ELO changes: +{winner_change}/{loser_change}")
+                    await finish_battle(battle_id, battle_state, winner_id, emit_data, log_prefix=f"[{sid}]")
                     return  # Early return since we already emitted damage_received
         
         # Normal case (no winner yet) - just emit damage_received
         logger.info(f"[{sid}] Emitting battle:damage_received to room '{room_id}' with data: {emit_data}")
         await sio.emit("battle:damage_received", emit_data, room=room_id)
     
+    @sio.on("battle:resync")
+    async def battle_resync(sid, data):
+        """Send events the client missed (after its last seen event_id) plus the current HP/turn."""
+        battle_id = data.get("battle_id")
+        last_event_id = data.get("last_event_id")
+        if not battle_id:
+            return
+        
+        try:
+            events = await battle_events.battle_event_log.read_after(str(battle_id), last_event_id)
+            battle_state = await battle_state_manager.get_battle(str(battle_id))
+        except Exception as e:
+            logger.warning(f"[{sid}] battle:resync failed for {battle_id}: {e}")
+            return
+        
+        logger.info(f"[{sid}] battle:resync {battle_id} after {last_event_id}: {len(events)} events")
+        await sio.emit("battle:events", {
+            "battle_id": battle_id,
+            "events": [event.to_dict() for event in events],
+            "state": {
+                "player1_hp": battle_state.player1_hp,
+                "player2_hp": battle_state.player2_hp,
+                "current_turn": battle_state.current_turn,
+                "game_status": battle_state.status,
+            } if battle_state else None,
+        }, room=sid)
+    
     @sio.event
     async def battle_result(sid, data):
         """Handle battle result and cleanup."""
@@ -874,11 +995,15 @@ def register_socket_handlers(sio: socketio.AsyncServer):
             logger.warning(f"Audio cleanup error: {e}")
         
         # Cleanup Redis battle session
+        turn_timer.cancel(battle_id)
         try:
             await battle_state_manager.delete_battle(battle_id)
         except Exception as e:
             logger.warning(f"Redis cleanup error: {e}")
         
+        # Archive the battle event log (no-op if already archived when the final attack landed)
+        spawn(archive_battle_safely(battle_id))
+        
         # Delete the room after game ends
         try:
             from uuid import UUID
@@ -919,11 +1044,12 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         # Get players in room
         players = []
         player_ids = []
-        members = room_members.get(str(room_id), [])
+        members = await socket_state.room_members(str(room_id))
         logger.info(f"[{sid}] Members in room {room_id}: {members}")
+        member_infos = await socket_state.get_users(members)
         
         for member_sid in members:
-            user_info = connected_users.get(member_sid, {})
+            user_info = member_infos.get(member_sid, {})
             player_id = user_info.get("user_id", member_sid)
             players.append({
                 "user_id": player_id,
@@ -952,13 +1078,13 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         logger.info(f"[{sid}] First turn goes to player index {first_player_index}: {first_player_id}")
         
         # Store battle data for when players signal ready from BattleScreen
-        battle_ready_data[str(room_id)] = {
+        await socket_state.set_battle_ready(str(room_id), {
             "battle_id": battle_id,
             "players": players,
             "player_ids": player_ids,
             "first_turn_player_id": first_player_id,
             "members": list(members),  # Copy current member sids
-        }
+        })
         
         logger.info(f"[{sid}] Emitting room:game_start to {room_id} with players: {players}")
         await sio.emit("room:game_start", {
@@ -978,12 +1104,12 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         logger.info(f"[{sid}] battle:ready received for room: {room_id}")
         
         # Get battle data stored during game_start
-        battle_data = battle_ready_data.get(room_id)
+        battle_data = await socket_state.get_battle_ready(room_id)
         if not battle_data:
             logger.warning(f"[{sid}] No battle data found for room {room_id}")
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         player_id = user_info.get("user_id", sid)
         first_turn_player_id = battle_data.get("first_turn_player_id")
         goes_first = (str(player_id) == str(first_turn_player_id))
@@ -992,6 +1118,22 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         player_ids = battle_data.get("player_ids", [])
         is_host = (str(player_id) == str(player_ids[0])) if player_ids else False
         
+        # 서버의 current_turn 을 선공(미니게임 승자)에 맞추고 첫 턴 마감 등록 (첫 공격 전까지만)
+        battle_id = str(battle_data.get("battle_id"))
+        
+        def align_first_turn(state):
+            first_turn = 1 if str(first_turn_player_id) == state.player1_id else 2
+            if state.turns or state.current_turn == first_turn:
+                return None
+            return replace(state, current_turn=first_turn)
+        
+        try:
+            battle_state = await battle_state_manager.mutate(battle_id, align_first_turn)
+            if battle_state and battle_state.turns == 0 and battle_state.status != "finished":
+                turn_timer.start_turn(battle_id, battle_state.version)
+        except Exception as e:
+            logger.warning(f"[{sid}] First turn setup failed for {battle_id}: {e}")
+        
         logger.info(f"[{sid}] Sending battle:init - player_id={player_id}, goes_first={goes_first}, is_host={is_host}")
         
         await sio.emit("battle:init", {
@@ -1011,7 +1153,7 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         if not room_id:
             return
         
-        user_info = connected_users.get(sid, {})
+        user_info = await socket_state.get_user(sid)
         user_id = user_info.get("user_id", sid)
         
         # Broadcast to room (including sender for confirmation)
@@ -1032,9 +1174,8 @@ def register_socket_handlers(sio: socketio.AsyncServer):
         room_id = str(room_id)
         logger.info(f"[{sid}] minigame:winner - room: {room_id}, winner: {winner_id}")
         
-        # Update battle_ready_data with winner as first turn player
-        if room_id in battle_ready_data:
-            battle_ready_data[room_id]["first_turn_player_id"] = str(winner_id)
+        # Update battle ready data with winner as first turn player
+        if await socket_state.update_battle_ready(room_id, first_turn_player_id=str(winner_id)):
             logger.info(f"[{sid}] Updated first_turn_player_id to {winner_id}")
         
         # Broadcast winner to room
@@ -1042,3 +1183,48 @@ def register_socket_handlers(sio: socketio.AsyncServer):
             "winner_id": winner_id
         }, room=room_id)
 
+    async def notify_turn_timeout(battle_id: str, battle_state, timed_out_player_id: str, winner_id: str | None = None):
+        """Turn deadline passed: broadcast it as a missed attack so clients flip the turn.
+        After too many consecutive misses the other player wins by forfeit (normal result path)."""
+        logged = [
+            (battle_events.ATTACK, {
+                "attacker_id": timed_out_player_id,
+                "damage_data": {"total_damage": 0, "grade": "F", "animation_trigger": "miss"},
+                "player1_hp": battle_state.player1_hp,
+                "player2_hp": battle_state.player2_hp,
+                "game_status": battle_state.status,
+                "timeout": True,
+            }),
+        ]
+        if battle_state.status != "finished":
+            logged.append((battle_events.TURN_CHANGE, {"current_turn": battle_state.current_turn}))
+        event_ids = await record_events(battle_id, *logged)
+        emit_data = {
+            "attacker_id": timed_out_player_id,
+            "damage": 0,
+            "grade": "F",
+            "animation_trigger": "miss",
+            "is_critical": False,
+            "audio_url": None,
+            "skill_image": None,
+            "is_ultimate": False,
+            "timeout": True,
+            "player1_hp": battle_state.player1_hp,
+            "player2_hp": battle_state.player2_hp,
+            "current_turn": battle_state.current_turn,
+            "game_status": battle_state.status,
+            "winner_id": winner_id,
+            "event_id": event_ids[-1],
+        }
+        if winner_id and battle_state.status == "finished":
+            await finish_battle(battle_id, battle_state, winner_id, emit_data, log_prefix=f"[timeout {battle_id}]")
+            return
+        await sio.emit("battle:damage_received", emit_data, room=battle_id)
+    
+    turn_timer.on_timeout = notify_turn_timeout
+    
+    # Count DB queries per socket event (wraps every handler registered above)
+    for namespace_handlers in sio.handlers.values():
+        for event_name, handler in list(namespace_handlers.items()):
+            namespace_handlers[event_name] = instrument_socket_handler(event_name, handler)
+
@@ -0,0 +1,163 @@
+"""소켓 레지스트리 인터페이스
+
+소켓 핸들러가 쓰는 sid / 방 / 매칭 대기열 / 배틀 준비 데이터 / 재접속 대기 정보를 한 곳에 모은다.
+- memory (기본): adapters/memory/socket_state.py - 워커 하나일 때
+- redis (SOCKET_MULTI_WORKER=true): adapters/redis/socket_state.py - 여러 워커가 공유,
+  emit 은 socket.io AsyncRedisManager 가 다른 워커로 전달
+
+저장하는 값은 모두 JSON 으로 직렬화 가능한 dict 여야 한다 (asyncio.Task 등은 워커 로컬에 따로 보관).
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class QueueEntry:
+    sid: str
+    rating: float
+    joined_at: float  # time.time() (워커끼리 비교하므로 wall clock)
+
+
+def rating_window(wait_seconds: float) -> float:
+    """wait_seconds 동안 기다린 유저에게 허용되는 rating 차이 (base 에서 시작해 초당 widen 만큼, 최대 max)"""
+    return min(
+        settings.matchmaking_window_base + settings.matchmaking_window_widen_per_second * max(0.0, wait_seconds),
+        settings.matchmaking_window_max,
+    )
+
+
+class SocketState(ABC):
+    # ---- 접속 유저 (sid -> user info) ----
+
+    @abstractmethod
+    async def add_user(self, sid: str, info: dict[str, Any]):
+        """sid 의 유저 정보 저장"""
+
+    @abstractmethod
+    async def remove_user(self, sid: str) -> Optional[dict[str, Any]]:
+        """sid 제거 후 저장돼 있던 정보 반환"""
+
+    @abstractmethod
+    async def get_user(self, sid: str) -> dict[str, Any]:
+        """sid 의 유저 정보 (없으면 빈 dict)"""
+
+    @abstractmethod
+    async def get_users(self, sids: list[str]) -> dict[str, dict[str, Any]]:
+        """여러 sid 의 유저 정보 (없는 sid 는 빠짐)"""
+
+    @abstractmethod
+    async def sids_for_user(self, user_id: str) -> list[str]:
+        """user_id 로 접속 중인 sid 들"""
+
+    @abstractmethod
+    async def user_count(self) -> int:
+        """접속 중인 sid 수"""
+
+    async def find_user(self, user_id: str) -> Optional[dict[str, Any]]:
+        """user_id 로 접속 중인 아무 sid 의 유저 정보"""
+        for sid in await self.sids_for_user(user_id):
+            info = await self.get_user(sid)
+            if info:
+                return info
+        return None
+
+    # ---- 방 멤버 (입장 순서 유지) ----
+
+    @abstractmethod
+    async def join_room(self, room_id: str, sid: str) -> bool:
+        """방에 sid 추가 (새로 들어왔으면 True, 이미 있었으면 False)"""
+
+    @abstractmethod
+    async def leave_room(self, room_id: str, sid: str):
+        """방에서 sid 제거"""
+
+    @abstractmethod
+    async def room_members(self, room_id: str) -> list[str]:
+        """방의 sid 들 (입장 순서)"""
+
+    @abstractmethod
+    async def rooms_of(self, sid: str) -> list[str]:
+        """sid 가 들어가 있는 방들"""
+
+    # ---- 매칭 대기열 (ELO 기준, 기다릴수록 허용 rating 차이가 넓어짐) ----
+
+    @abstractmethod
+    async def queue_add(self, sid: str, rating: float) -> bool:
+        """대기열에 추가 (이미 있으면 False)"""
+
+    @abstractmethod
+    async def queue_contains(self, sid: str) -> bool:
+        """대기열에 있는지"""
+
+    @abstractmethod
+    async def queue_match(self, sid: str) -> Optional[tuple[QueueEntry, QueueEntry]]:
+        """sid 와 허용 범위 안에서 rating 이 가장 가까운 상대를 찾아 둘 다 꺼냄 -> (sid, 상대).
+        여러 워커가 동시에 호출해도 한 사람은 한 번만 매칭된다"""
+
+    @abstractmethod
+    async def queue_sweep(self, limit: int) -> list[tuple[QueueEntry, QueueEntry]]:
+        """가장 오래 기다린 limit 명에 대해 다시 매칭 시도 (기다리는 동안 넓어진 범위 반영)"""
+
+    @abstractmethod
+    async def queue_remove(self, sid: str) -> bool:
+        """대기열에서 제거 (있었으면 True)"""
+
+    @abstractmethod
+    async def queue_size(self) -> int:
+        """대기 중인 sid 수"""
+
+    # ---- 배틀 준비 데이터 (room_id -> battle_id, players, first_turn_player_id ...) ----
+
+    @abstractmethod
+    async def set_battle_ready(self, room_id: str, data: dict[str, Any]):
+        """게임 시작 시 저장"""
+
+    @abstractmethod
+    async def get_battle_ready(self, room_id: str) -> Optional[dict[str, Any]]:
+        """battle:ready 에서 조회"""
+
+    @abstractmethod
+    async def update_battle_ready(self, room_id: str, **fields) -> bool:
+        """일부 필드 갱신 (데이터가 없으면 False)"""
+
+    # ---- 배경 투표 (room_id -> {user_id: background_id}) ----
+
+    @abstractmethod
+    async def add_background_vote(self, room_id: str, user_id: str, background_id: str) -> dict[str, str]:
+        """투표 저장 후 방의 전체 투표 반환"""
+
+    @abstractmethod
+    async def clear_background_votes(self, room_id: str):
+        """결과가 나온 방의 투표 삭제"""
+
+    # ---- 재접속 대기 (user_id -> sid, user_info, rooms) ----
+
+    @abstractmethod
+    async def set_pending_disconnect(self, user_id: str, data: dict[str, Any]):
+        """끊긴 유저를 grace period 동안 보관"""
+
+    @abstractmethod
+    async def pop_pending_disconnect(self, user_id: str, sid: Optional[str] = None) -> Optional[dict[str, Any]]:
+        """대기 정보를 꺼냄 (sid 를 주면 그 sid 의 대기일 때만). 재접속 / grace 만료 중 먼저 온 쪽만 받는다"""
+
+    def snapshot(self) -> dict[str, Any]:
+        """metrics 용 상태"""
+        return {}
+
+
+def create_socket_state() -> SocketState:
+    """멀티 워커 모드면 Redis, 아니면 프로세스 메모리"""
+    if settings.socket_multi_worker:
+        from adapters.redis.socket_state import RedisSocketState
+        return RedisSocketState()
+    from adapters.memory.socket_state import InMemorySocketState
+    return InMemorySocketState()
+
+
+# 싱글톤 인스턴스
+socket_state = create_socket_state()
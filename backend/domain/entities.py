@@ -17,6 +17,16 @@ class RoomStatus(str, Enum):
     CLOSED = "closed"
 
 
+ELO_K_FACTOR = 32
+
+
+def calculate_elo_changes(winner_elo: int, loser_elo: int, k: int = ELO_K_FACTOR) -> tuple[int, int]:
+    """Return (winner_change, loser_change) for a finished match."""
+    winner_expected = 1 / (1 + 10 ** ((loser_elo - winner_elo) / 400))
+    loser_expected = 1 / (1 + 10 ** ((winner_elo - loser_elo) / 400))
+    return int(k * (1 - winner_expected)), int(k * (0 - loser_expected))
+
+
 @dataclass
 class User:
     id: UUID = field(default_factory=uuid4)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import socketio
@@ -38,9 +38,18 @@ if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from config import get_settings
-from adapters.api.routes import auth, users, characters, rooms, battle
+from adapters.api.routes import auth, users, characters, rooms, battle, metrics
 from adapters.socket.handlers import register_socket_handlers
-from adapters.db.database import init_db
+from adapters.db.database import warm_up_db
+from adapters.db.migrations import check_schema
+from adapters.db.instrumentation import query_scope
+from use_cases.stats_service import run_user_stats_reconciler
+from use_cases.match_settlement import run_match_settlement_consumer
+from adapters.db.match_writer import match_history_writer
+from adapters.redis.client import close_redis
+from adapters.background import drain as drain_background
+from use_cases.turn_timer import turn_timer
+from use_cases.matchmaking import matchmaker
 
 settings = get_settings()
 
@@ -55,7 +64,30 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def on_startup():
-    init_db()
+    if settings.socket_multi_worker and settings.battle_state_backend == "memory":
+        raise RuntimeError("SOCKET_MULTI_WORKER requires BATTLE_STATE_BACKEND=redis (memory state is per worker)")
+    # 스키마 변경은 scripts/migrate_db.py 로만 적용 (여기서는 버전 확인만)
+    await check_schema()
+    await warm_up_db()
+    app.state.background_tasks = [
+        asyncio.create_task(run_user_stats_reconciler(settings.user_stats_reconcile_seconds)),
+        asyncio.create_task(run_match_settlement_consumer()),
+        asyncio.create_task(match_history_writer.run()),
+        asyncio.create_task(turn_timer.run()),
+        asyncio.create_task(matchmaker.run()),
+    ]
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 응답 경로 밖에서 돌던 작업(배틀 보관, 시간 초과 처리 등)을 먼저 마무리
+    await drain_background(settings.shutdown_drain_seconds)
+    tasks = getattr(app.state, "background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    # Let tasks finish their cancellation cleanup (e.g. final match history flush)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_redis()
 
 
 # CORS middleware - allow all origins for development
@@ -67,6 +99,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def count_queries_per_request(request: Request, call_next):
+    """
+    Count DB queries per HTTP request. The scope is named after the matched
+    route template; anything without a route (404s, static files) shares one
+    "unmatched" bucket so raw URLs never become metric keys.
+    """
+    with query_scope(f"{request.method} unmatched") as scope:
+        try:
+            return await call_next(request)
+        finally:
+            route = request.scope.get("route")
+            if route is not None:
+                scope.name = f"{request.method} {route.path}"
+
 # Mount static files for assets
 assets_dir = os.path.join(os.path.dirname(__file__), "assets")
 avatars_dir = os.path.join(assets_dir, "avatars")
@@ -75,9 +123,12 @@ avatars_dir = os.path.join(assets_dir, "avatars")
 os.makedirs(avatars_dir, exist_ok=True)
 
 # Socket.io setup - allow all origins for development
+# 멀티 워커: emit / enter_room 을 Redis pub/sub 로 다른 워커에 전달
+client_manager = socketio.AsyncRedisManager(settings.redis_url) if settings.socket_multi_worker else None
 sio = socketio.AsyncServer(
     async_mode="asgi",
-    cors_allowed_origins="*"  # 개발용: 모든 origin 허용
+    cors_allowed_origins="*",  # 개발용: 모든 origin 허용
+    client_manager=client_manager
 )
 
 # Register socket handlers
@@ -89,6 +140,7 @@ app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(characters.router, prefix="/api/v1/characters", tags=["Characters"])
 app.include_router(rooms.router, prefix="/api/v1/rooms", tags=["Rooms"])
 app.include_router(battle.router, prefix="/api/v1/battle", tags=["Battle"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Metrics"])
 
 # Mount static files AFTER routers (more specific paths first)
 if os.path.exists(avatars_dir):
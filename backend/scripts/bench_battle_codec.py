@@ -0,0 +1,71 @@
+"""
+배틀 상태 codec 벤치마크 (Redis 불필요)
+
+    python scripts/bench_battle_codec.py              # 기본 200,000 회
+    python scripts/bench_battle_codec.py -n 1000000
+
+배틀 하나당 저장 바이트 수와 encode/decode 1회 평균 시간을 JSON 과 binary 로 비교한다.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adapters.battle_state import BattleState, CODECS, decode_battle_state
+
+
+def sample_state() -> BattleState:
+    return BattleState(
+        battle_id=str(uuid.uuid4()),
+        player1_id=str(uuid.uuid4()),
+        player2_id=str(uuid.uuid4()),
+        player1_hp=215,
+        player2_hp=87,
+        player1_character_id="char_003",
+        player2_character_id="char_011",
+        current_turn=2,
+        status="battle",
+        is_ranked=True,
+        turns=7,
+        started_at=time.time(),
+    )
+
+
+def bench(codec, state: BattleState, iterations: int) -> tuple[int, float, float]:
+    data = codec.encode(state)
+    assert codec.decode(data) == state and decode_battle_state(data) == state
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(state)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(data)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    return len(data), encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare battle state codecs.")
+    parser.add_argument("-n", "--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    state = sample_state()
+    print(f"{'codec':<8} {'bytes':>6} {'encode µs':>10} {'decode µs':>10}")
+    results = {}
+    for name, codec in CODECS.items():
+        size, encode_us, decode_us = bench(codec, state, args.iterations)
+        results[name] = size
+        print(f"{name:<8} {size:>6} {encode_us:>10.2f} {decode_us:>10.2f}")
+    print(f"binary / json size: {results['binary'] / results['json']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+배틀 상태 저장소 벤치마크
+
+    python scripts/bench_battle_state.py                    # memory 만 (Redis 불필요)
+    python scripts/bench_battle_state.py --backend memory redis
+    python scripts/bench_battle_state.py -b 2000 -c 50
+
+배틀 b 개를 만들고 한 배틀이 끝날 때까지 공격(update_hp) + 조회(get_battle)를 반복한다.
+동시에 c 개 배틀을 진행하며, 연산 1회 평균 시간과 처리량을 memory 기준선과 비교한다.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adapters.battle_state import create_battle_state_manager, BattleStateManager
+
+
+async def play(manager: BattleStateManager, damage: int) -> int:
+    """배틀 하나 생성 → 끝날 때까지 공격/조회 → 삭제. 실행한 연산 수 반환"""
+    battle_id = f"bench_{uuid.uuid4().hex}"
+    p1, p2 = str(uuid.uuid4()), str(uuid.uuid4())
+    await manager.create_battle(battle_id, p1, p2)
+    ops = 2
+    attacker = p1
+    while True:
+        result = await manager.update_hp(battle_id, attacker, damage)
+        await manager.get_battle(battle_id)
+        ops += 2
+        if result is None or result["winner_id"]:
+            break
+        attacker = p2 if attacker == p1 else p1
+    await manager.delete_battle(battle_id)
+    return ops
+
+
+async def bench(backend: str, battles: int, concurrency: int, damage: int) -> tuple[int, float]:
+    manager = create_battle_state_manager(backend)
+    await manager.connect()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one() -> int:
+        async with semaphore:
+            return await play(manager, damage)
+
+    start = time.perf_counter()
+    ops = sum(await asyncio.gather(*(run_one() for _ in range(battles))))
+    return ops, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare battle state backends.")
+    parser.add_argument("--backend", nargs="+", default=["memory"], choices=["memory", "redis"])
+    parser.add_argument("-b", "--battles", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--damage", type=int, default=35)
+    args = parser.parse_args()
+
+    results = {}
+    # memory 를 항상 먼저 (기준선). delete_battle 의 로그 출력은 버림
+    for backend in dict.fromkeys(["memory", *args.backend]):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[backend] = await bench(backend, args.battles, args.concurrency, args.damage)
+
+    print(f"{'backend':<8} {'ops':>8} {'ops/s':>10} {'µs/op':>8} {'vs memory':>10}")
+    baseline_us = None
+    for backend, (ops, elapsed) in results.items():
+        per_op_us = elapsed / ops * 1e6
+        baseline_us = baseline_us or per_op_us
+        print(f"{backend:<8} {ops:>8} {ops / elapsed:>10.0f} {per_op_us:>8.1f} {per_op_us / baseline_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
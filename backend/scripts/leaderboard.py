@@ -0,0 +1,88 @@
+"""
+Redis 리더보드 관리 스크립트
+
+    python scripts/leaderboard.py rebuild        # Postgres -> Redis ZSET 전체 재구축
+    python scripts/leaderboard.py check          # ZSET 과 Postgres 불일치 리포트
+    python scripts/leaderboard.py check --fix    # 불일치 항목 수정
+"""
+import argparse
+import asyncio
+import os
+import sys
+from uuid import UUID
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.repository import UserRepository
+from adapters.redis.leaderboard import leaderboard
+
+BATCH_SIZE = 5000
+
+
+async def rebuild():
+    async with AsyncSessionLocal() as db:
+        repo = UserRepository(db)
+        loaded = await leaderboard.rebuild(repo.iter_ratings(BATCH_SIZE))
+    print(f"Leaderboard rebuilt with {loaded} users.")
+
+
+async def check(fix: bool = False) -> int:
+    """Returns the number of inconsistencies found."""
+    mismatched: dict[str, int] = {}
+    db_ids: set[str] = set()
+
+    async with AsyncSessionLocal() as db:
+        repo = UserRepository(db)
+        # DB -> ZSET: 누락되었거나 점수가 다른 유저
+        async for batch in repo.iter_ratings(BATCH_SIZE):
+            ids = [uid for uid, _ in batch]
+            db_ids.update(ids)
+            scores = await leaderboard.scores(ids)
+            for (uid, rating), score in zip(batch, scores):
+                if score != rating:
+                    mismatched[uid] = rating
+
+    # ZSET -> DB: DB 에 없는 유저 (삭제된 계정 등)
+    client = await leaderboard.connect()
+    extra = []
+    async for member, _ in client.zscan_iter(leaderboard.key, count=BATCH_SIZE):
+        uid = member.decode()
+        if uid not in db_ids:
+            extra.append(uid)
+
+    print(f"DB users: {len(db_ids)}, ZSET members: {await leaderboard.count()}")
+    print(f"Missing or stale in ZSET: {len(mismatched)}")
+    for uid, rating in list(mismatched.items())[:20]:
+        print(f"  {uid} -> {rating}")
+    print(f"In ZSET but not in DB: {len(extra)}")
+    for uid in extra[:20]:
+        print(f"  {uid}")
+
+    if fix and (mismatched or extra):
+        await leaderboard.update_many(mismatched)
+        for uid in extra:
+            await leaderboard.remove(UUID(uid))
+        print("Fixed.")
+
+    return len(mismatched) + len(extra)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Redis ELO leaderboard.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="Bulk-load the ZSET from Postgres")
+    check_parser = sub.add_parser("check", help="Compare the ZSET against Postgres")
+    check_parser.add_argument("--fix", action="store_true", help="Repair inconsistencies")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        asyncio.run(rebuild())
+    else:
+        problems = asyncio.run(check(fix=args.fix))
+        sys.exit(1 if problems and not args.fix else 0)
+
+
+if __name__ == "__main__":
+    main()
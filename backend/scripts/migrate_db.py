@@ -1,38 +1,56 @@
+"""
+스키마 마이그레이션 스크립트 (adapters/db/migrations.py)
+
+    python scripts/migrate_db.py status           # 현재 버전 / 대기 중인 마이그레이션
+    python scripts/migrate_db.py upgrade          # 최신 버전까지 적용
+    python scripts/migrate_db.py upgrade --to 2   # 지정 버전까지 적용
+
+서버는 시작 시 버전만 확인하므로 배포 전에 upgrade 를 한 번 실행한다.
+"""
+import argparse
+import asyncio
 import os
 import sys
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, text
-from config import get_settings
-
-def migrate():
-    settings = get_settings()
-    # Use synchronous driver
-    db_url = settings.database_url.replace("postgresql+asyncpg", "postgresql+psycopg2")
-    
-    engine = create_engine(db_url)
-    
-    with engine.connect() as conn:
-        try:
-            # Check if column exists
-            result = conn.execute(text(
-                "SELECT column_name FROM information_schema.columns WHERE table_name='users' AND column_name='main_character_id'"
-            ))
-            
-            if result.fetchone():
-                print("Column 'main_character_id' already exists.")
-            else:
-                print("Adding 'main_character_id' column...")
-                conn.execute(text(
-                    "ALTER TABLE users ADD COLUMN main_character_id VARCHAR DEFAULT 'char_000'"
-                ))
-                conn.commit()
-                print("Migration successful: Added 'main_character_id' to 'users' table.")
-                
-        except Exception as e:
-            print(f"Migration failed: {e}")
+from adapters.db.database import engine
+from adapters.db.migrations import upgrade, status, LATEST_VERSION
+
+
+async def show_status() -> int:
+    version, pending = await status()
+    print(f"Current version: {version or 0} (latest: {LATEST_VERSION})")
+    for migration in pending:
+        print(f"  pending {migration.version}: {migration.name}")
+    await engine.dispose()
+    return len(pending)
+
+
+async def run_upgrade(target: int | None):
+    applied = await upgrade(target)
+    for migration in applied:
+        print(f"Applied {migration.version}: {migration.name}")
+    if not applied:
+        print("Schema is up to date.")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show the applied version and pending migrations")
+    upgrade_parser = sub.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Target version (default: latest)")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        pending = asyncio.run(show_status())
+        sys.exit(1 if pending else 0)
+    else:
+        asyncio.run(run_upgrade(args.to))
+
 
 if __name__ == "__main__":
-    migrate()
+    main()
@@ -0,0 +1,32 @@
+"""
+미사용 게스트 계정 정리 스크립트
+
+게스트는 이제 Redis 에만 저장되지만, 그 전에 로그인할 때마다 만들어진 게스트 users 행이 남아 있다.
+소셜 계정/전적/프로필 변경이 없는 오래된 게스트 행을 배치 단위로 삭제한다.
+
+    python scripts/prune_guests.py                 # GUEST_PRUNE_DAYS 보다 오래된 게스트 삭제
+    python scripts/prune_guests.py --days 30 --batch-size 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from use_cases.guest_service import prune_stale_guests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete stale, never-used guest users.")
+    parser.add_argument("--days", type=int, default=None, help="Only prune guests older than this (default: GUEST_PRUNE_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per transaction")
+    args = parser.parse_args()
+
+    pruned = asyncio.run(prune_stale_guests(args.days, args.batch_size))
+    print(f"Pruned {pruned} stale guest users.")
+
+
+if __name__ == "__main__":
+    main()
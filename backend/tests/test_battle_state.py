@@ -0,0 +1,56 @@
+"""BattleStateManager.set_character (memory 구현, Redis 구현과 같은 mutate 경로)"""
+import asyncio
+
+from adapters.battle_state import BattleState, CODECS, decode_battle_state
+from adapters.memory.battle_state import InMemoryBattleStateManager
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_both_picks_start_battle():
+    manager = InMemoryBattleStateManager()
+
+    async def scenario():
+        await manager.create_battle("b1", "p1", "p2")
+        assert await manager.set_character("b1", "p1", "char_001")
+        first = await manager.get_battle("b1")
+        assert await manager.set_character("b1", "p2", "char_002")
+        return first, await manager.get_battle("b1")
+
+    first, second = run(scenario())
+    assert first.status == "character_select"
+    assert second.status == "battle"
+    assert (second.player1_character_id, second.player2_character_id) == ("char_001", "char_002")
+
+
+def test_non_player_pick_is_ignored():
+    manager = InMemoryBattleStateManager()
+
+    async def scenario():
+        await manager.create_battle("b1", "p1", "p2")
+        return await manager.set_character("b1", "someone", "char_001"), await manager.get_battle("b1")
+
+    saved, state = run(scenario())
+    assert not saved
+    assert state.player1_character_id is None and state.player2_character_id is None
+
+
+def test_pick_does_not_reopen_finished_battle():
+    manager = InMemoryBattleStateManager()
+
+    async def scenario():
+        await manager.create_battle("b1", "p1", "p2")
+        await manager.set_character("b1", "p1", "char_001")
+        await manager.mutate("b1", lambda s: BattleState(**{**s.__dict__, "status": "finished"}))
+        await manager.set_character("b1", "p2", "char_002")
+        return await manager.get_battle("b1")
+
+    assert run(scenario()).status == "finished"
+
+
+def test_codecs_round_trip():
+    state = BattleState("b1", "p1", "p2", player1_character_id="char_001", status="battle", player2_missed=2)
+    for codec in CODECS.values():
+        assert decode_battle_state(codec.encode(state)) == state
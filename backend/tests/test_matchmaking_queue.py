@@ -0,0 +1,122 @@
+"""EloBucketQueue: 대기 시간에 따른 범위 확장, 상대 선택 순서, 취소"""
+import pytest
+
+# adapters.socket.state 를 먼저 import (memory socket_state 가 matchmaking 을 import 하므로)
+from adapters.socket import state
+from adapters.memory.matchmaking import EloBucketQueue
+
+T0 = 1_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def window(monkeypatch):
+    """허용 차이: 100 에서 시작해 초당 10 씩, 최대 800"""
+    monkeypatch.setattr(state.settings, "matchmaking_window_base", 100)
+    monkeypatch.setattr(state.settings, "matchmaking_window_widen_per_second", 10.0)
+    monkeypatch.setattr(state.settings, "matchmaking_window_max", 800)
+
+
+@pytest.fixture
+def queue():
+    return EloBucketQueue(bucket_width=50, window_max=800, candidates=16)
+
+
+def test_add_is_idempotent(queue):
+    assert queue.add("a", 1200, T0)
+    assert not queue.add("a", 1500, T0 + 1)
+    assert len(queue) == 1
+    assert "a" in queue
+    assert queue.entries["a"].rating == 1200
+
+
+def test_single_player_waits(queue):
+    queue.add("a", 1200, T0)
+    assert queue.match("a", T0 + 1000) is None
+    assert "a" in queue
+
+
+def test_window_widens_with_wait(queue):
+    queue.add("a", 1000, T0)
+    queue.add("b", 1300, T0)
+
+    # 차이 300: 100 + 10 * 20 초가 되어야 허용
+    assert queue.find("b", T0) is None
+    assert queue.find("b", T0 + 19) is None
+    assert queue.find("b", T0 + 20).sid == "a"
+
+
+def test_window_uses_longer_wait(queue):
+    queue.add("a", 1000, T0)
+    queue.add("b", 1300, T0 + 30)
+
+    # b 는 방금 들어왔지만 a 가 30초 기다렸으므로 허용 차이는 400
+    first, second = queue.match("b", T0 + 30)
+    assert (first.sid, second.sid) == ("b", "a")
+    assert len(queue) == 0
+
+
+def test_window_is_capped(queue):
+    queue.add("a", 1000, T0)
+    queue.add("b", 1900, T0)
+    assert queue.find("b", T0 + 3600) is None
+
+
+def test_closest_rating_wins(queue):
+    queue.add("far", 1120, T0)
+    queue.add("near", 1230, T0 + 1)
+    queue.add("me", 1200, T0 + 2)
+    assert queue.find("me", T0 + 2).sid == "near"
+
+
+def test_equal_gap_prefers_longer_wait(queue):
+    queue.add("above", 1250, T0 + 1)
+    queue.add("below", 1150, T0)
+    queue.add("me", 1200, T0 + 2)
+    assert queue.find("me", T0 + 2).sid == "below"
+
+
+def test_equal_gap_same_bucket_prefers_longer_wait(queue):
+    queue.add("late", 1210, T0 + 1)
+    queue.add("early", 1210, T0)
+    queue.add("me", 1200, T0 + 2)
+    assert queue.find("me", T0 + 2).sid == "early"
+
+
+def test_cancel_removes_from_matching(queue):
+    queue.add("a", 1200, T0)
+    queue.add("b", 1210, T0)
+
+    entry = queue.remove("a")
+    assert entry.sid == "a"
+    assert "a" not in queue
+    assert queue.remove("a") is None
+    assert queue.match("b", T0 + 60) is None
+    assert queue.buckets == {queue._bucket(1210): {"b": queue.entries["b"]}}
+
+
+def test_cancel_last_member_drops_bucket(queue):
+    queue.add("a", 1200, T0)
+    queue.remove("a")
+    assert queue.buckets == {}
+    assert queue.entries == {}
+
+
+def test_sweep_pairs_oldest_first(queue):
+    queue.add("a", 1000, T0)
+    queue.add("b", 1300, T0 + 1)
+    queue.add("c", 2000, T0 + 2)
+
+    assert queue.sweep(T0 + 5, limit=10) == []
+
+    pairs = queue.sweep(T0 + 20, limit=10)
+    assert [(p.sid, o.sid) for p, o in pairs] == [("a", "b")]
+    assert list(queue.entries) == ["c"]
+
+
+def test_sweep_respects_limit(queue):
+    for i, sid in enumerate("abcd"):
+        queue.add(sid, 1200 + i, T0 + i)
+
+    pairs = queue.sweep(T0 + 10, limit=1)
+    assert [(p.sid, o.sid) for p, o in pairs] == [("a", "b")]
+    assert list(queue.entries) == ["c", "d"]
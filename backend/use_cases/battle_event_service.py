@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Optional
+
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.repository import BattleEventRepository
+from adapters.redis.battle_events import battle_event_log, BattleEvent
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def record_events(battle_id: str, *events: tuple[str, dict[str, Any]]) -> list[Optional[str]]:
+    """
+    배틀 이벤트 기록. 이벤트 id 목록을 반환하고, Redis 장애 시에는 None 들을 반환한다
+    (로그 기록 실패로 배틀 진행이 막히지 않도록).
+    """
+    try:
+        return await battle_event_log.append(str(battle_id), *events)
+    except Exception as e:
+        logger.warning(f"Battle event log append failed for {battle_id}: {e}")
+        return [None] * len(events)
+
+
+async def archive_battle(battle_id: str) -> int:
+    """
+    배틀 이벤트 스트림 전체를 Postgres 로 일괄 보관 (한 번의 multi-row insert).
+    이미 보관된 이벤트(같은 스트림 id)는 건너뛰므로 여러 번 호출해도 안전하다.
+    보관 후 스트림은 재접속 resync 용으로 battle_event_retention_seconds 동안만 남긴다.
+    """
+    battle_id = str(battle_id)
+    events = await battle_event_log.read_after(battle_id)
+    if not events:
+        return 0
+
+    rows = [
+        {
+            "battle_id": battle_id,
+            "event_id": event.event_id,
+            "event_type": event.type,
+            "data": event.data,
+            "created_at": datetime.utcfromtimestamp(event.ts),
+        }
+        for event in events
+    ]
+    async with AsyncSessionLocal() as db:
+        inserted = await BattleEventRepository(db).insert_many(rows)
+    await battle_event_log.expire(battle_id, settings.battle_event_retention_seconds)
+    logger.info(f"🗄️ Battle {battle_id} events archived: {inserted}/{len(rows)} inserted")
+    return inserted
+
+
+async def archive_battle_safely(battle_id: str):
+    """백그라운드 태스크용 (실패해도 스트림은 TTL 까지 남아 있어 다시 보관 가능)"""
+    try:
+        await archive_battle(battle_id)
+    except Exception as e:
+        logger.warning(f"Battle {battle_id} event archive failed: {e}")
+
+
+async def iter_replay(battle_id: str) -> AsyncIterator[dict[str, Any]]:
+    """리플레이용 이벤트 순회: 스트림이 남아 있으면 Redis, 없으면 Postgres 보관본"""
+    battle_id = str(battle_id)
+    last_event_id = None
+    if await battle_event_log.exists(battle_id):
+        while True:
+            page = await battle_event_log.read_after(battle_id, last_event_id, count=100)
+            for event in page:
+                yield event.to_dict()
+            if len(page) < 100:
+                return
+            last_event_id = page[-1].event_id
+
+    async with AsyncSessionLocal() as db:
+        rows = await BattleEventRepository(db).list_events(battle_id)
+    for row in rows:
+        yield BattleEvent(
+            event_id=row.event_id,
+            type=row.event_type,
+            data=row.data,
+            ts=row.created_at.replace(tzinfo=timezone.utc).timestamp(),
+        ).to_dict()
@@ -0,0 +1,49 @@
+import logging
+from datetime import datetime, timedelta
+
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.repository import UserRepository
+from adapters.redis.guest_store import guest_store
+from config import get_settings
+from use_cases.stats_service import reconcile_user_stats
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def promote_guest(user_id) -> bool:
+    """
+    게스트면 Redis 레코드를 같은 id 의 users 행으로 승격.
+    게스트 레코드가 없으면(이미 승격됐거나 일반 유저) 아무것도 하지 않고 False.
+    """
+    guest = await guest_store.get(user_id)
+    if guest is None:
+        return False
+
+    async with AsyncSessionLocal() as db:
+        user = await UserRepository(db).create_from_guest(guest)
+    await guest_store.delete(user_id)
+    if user:
+        logger.info(f"👤 Guest {user_id} promoted to user row ({user.nickname})")
+    return True
+
+
+async def prune_stale_guests(days: int | None = None, batch_size: int = 1000) -> int:
+    """지연 저장 도입 전에 만들어진, 한 번도 쓰이지 않은 게스트 행을 배치 단위로 삭제"""
+    cutoff = datetime.utcnow() - timedelta(days=days if days is not None else settings.guest_prune_days)
+    pruned = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            user_ids = await UserRepository(db).prune_stale_guests(cutoff, batch_size)
+        pruned += len(user_ids)
+        if len(user_ids) < batch_size:
+            break
+    logger.info(f"🧹 Pruned {pruned} stale guest users (created before {cutoff.isoformat()})")
+
+    # 삭제된 행만큼 캐시된 유저 수/히스토그램 보정
+    if pruned:
+        try:
+            await reconcile_user_stats()
+        except Exception as e:
+            logger.warning(f"User stats reconcile after prune failed: {e}")
+    return pruned
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.match_writer import match_row
+from adapters.db.repository import UserRepository
+from adapters.redis.match_queue import match_result_queue, MatchResultMessage
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class MatchSettlementStats:
+    def __init__(self):
+        self.batches = 0
+        self.settled = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.failures = 0
+        self.dead_lettered = 0
+
+
+settlement_stats = MatchSettlementStats()
+
+
+async def settle_batch(messages: list[MatchResultMessage]):
+    """
+    한 배치의 경기 결과를 하나의 세션으로 DB 에 반영.
+    성공한 메시지만 ACK, 실패한 메시지는 pending 으로 남아 재시도된다.
+    """
+    settlement_stats.batches += 1
+    acked = []
+    # 멱등성: settled_matches 행을 정산 UPDATE 와 같은 트랜잭션에서 insert (이미 있으면 건너뜀).
+    # Redis 표시는 DB 조회 전에 걸러내는 힌트일 뿐 (없거나 쓰기에 실패해도 DB 가 중복을 막는다)
+    try:
+        settled = await match_result_queue.settled_among([m.battle_id for m in messages])
+    except Exception as e:
+        logger.warning(f"Settled hint lookup failed: {e}")
+        settled = set()
+    async with AsyncSessionLocal() as db:
+        repo = UserRepository(db)
+        for message in messages:
+            try:
+                if message.battle_id in settled:
+                    settlement_stats.duplicates += 1
+                    acked.append(message.message_id)
+                    continue
+
+                winner_id, loser_id = UUID(message.winner_id), UUID(message.loser_id)
+                if not await repo.claim_settlement(message.battle_id, winner_id, loser_id):
+                    await db.rollback()
+                    settlement_stats.duplicates += 1
+                    acked.append(message.message_id)
+                    continue
+
+                # 경기 기록도 실제 변화량으로 같은 트랜잭션에서 insert (핸들러의 예측값을 남기지 않음)
+                history = match_row(**message.history) if message.history else None
+                settlement = await repo.settle_match(
+                    winner_id, loser_id, battle_id=message.battle_id, history=history
+                )
+                settled.add(message.battle_id)
+                acked.append(message.message_id)
+
+                if settlement:
+                    settlement_stats.settled += 1
+                    logger.info(f"✅ ELO settled for {message.battle_id}: "
+                                f"{settlement.winner_nickname} +{settlement.winner_change}, "
+                                f"{settlement.loser_nickname} {settlement.loser_change}")
+                    try:
+                        await match_result_queue.mark_settled(message.battle_id)
+                    except Exception as e:
+                        logger.warning(f"Settled hint for {message.battle_id} not written: {e}")
+                else:
+                    settlement_stats.skipped += 1
+                    logger.warning(f"ELO settle skipped for {message.battle_id}: player not found")
+
+            except Exception as e:
+                settlement_stats.failures += 1
+                await db.rollback()
+                if message.delivery_count >= settings.match_queue_max_retries:
+                    logger.error(f"Match {message.battle_id} failed {message.delivery_count} times, dead-lettering: {e}")
+                    await match_result_queue.dead_letter(message, str(e))
+                    settlement_stats.dead_lettered += 1
+                else:
+                    logger.warning(f"Match {message.battle_id} settle failed (attempt {message.delivery_count}), will retry: {e}")
+
+    await match_result_queue.ack(*acked)
+
+
+async def run_match_settlement_consumer():
+    """경기 결과 스트림 consumer (백그라운드 태스크)"""
+    logger.info(f"Match settlement consumer started: {match_result_queue.consumer}")
+    while True:
+        try:
+            # 먼저 재시도 대상(오래 ACK 안 된 메시지)을 처리하고, 없으면 새 메시지를 기다림
+            messages = await match_result_queue.claim_stale(
+                settings.match_queue_retry_idle_ms, settings.match_queue_batch_size
+            )
+            if not messages:
+                messages = await match_result_queue.read_batch(
+                    settings.match_queue_batch_size, settings.match_queue_block_ms
+                )
+            if messages:
+                await settle_batch(messages)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Match settlement consumer error: {e}")
+            await asyncio.sleep(1.0)
@@ -0,0 +1,124 @@
+"""ELO 기반 빠른 매칭
+
+대기열 자체는 socket_state (memory: ELO 버킷, redis: rating ZSET + Lua) 에 있고, 여기서는
+- 들어오자마자 허용 범위 안의 상대를 찾고 (join)
+- 기다리는 동안 범위가 넓어지므로 sweep_seconds 마다 오래 기다린 순으로 다시 매칭 (run)
+- 대기 시간 / rating 차이 분포를 기록한다 (워커별, /api/v1/metrics/matchmaking)
+
+허용 rating 차이는 두 사람 중 오래 기다린 쪽의 대기 시간으로 정한다 (adapters/socket/state.py rating_window).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from adapters.socket.state import QueueEntry, socket_state
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 분위수 계산에 쓰는 최근 매칭 수
+STATS_WINDOW = 1000
+
+
+def _percentiles(samples) -> dict[str, float]:
+    """nearest-rank p50 / p90 / p99"""
+    if not samples:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {f"p{p}": round(ordered[min(last, int(len(ordered) * p / 100))], 3) for p in (50, 90, 99)}
+
+
+class MatchmakingStats:
+    def __init__(self):
+        self.enqueued = 0
+        self.cancelled = 0
+        self.matched = 0
+        self.swept = 0
+        self.max_gap = 0.0
+        self.wait_seconds: deque[float] = deque(maxlen=STATS_WINDOW * 2)
+        self.rating_gaps: deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def record(self, pair: tuple[QueueEntry, QueueEntry], now: float):
+        self.matched += 1
+        for entry in pair:
+            self.wait_seconds.append(max(0.0, now - entry.joined_at))
+        gap = abs(pair[0].rating - pair[1].rating)
+        self.rating_gaps.append(gap)
+        self.max_gap = max(self.max_gap, gap)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "cancelled": self.cancelled,
+            "matched": self.matched,
+            "matched_by_sweep": self.swept,
+            "wait_seconds": _percentiles(self.wait_seconds),
+            "rating_gap": {
+                **_percentiles(self.rating_gaps),
+                "avg": round(sum(self.rating_gaps) / len(self.rating_gaps), 1) if self.rating_gaps else 0.0,
+                "max": self.max_gap,
+            },
+        }
+
+
+class Matchmaker:
+    """빠른 매칭 진입 / 취소 / 주기적 재매칭 (워커당 하나, run() 태스크 하나)"""
+
+    def __init__(self):
+        self.stats = MatchmakingStats()
+        # (새로 들어온 쪽 또는 오래 기다린 쪽, 상대) -> 배틀 생성. register_socket_handlers 에서 설정
+        self.on_match: Optional[Callable[[QueueEntry, QueueEntry], Awaitable[None]]] = None
+
+    async def join(self, sid: str, rating: float) -> Optional[tuple[QueueEntry, QueueEntry]]:
+        """대기열에 넣고 바로 매칭 시도 -> (sid, 상대) 또는 None (대기)"""
+        if await socket_state.queue_add(sid, rating):
+            self.stats.enqueued += 1
+        pair = await socket_state.queue_match(sid)
+        if pair:
+            self.stats.record(pair, time.time())
+        return pair
+
+    async def cancel(self, sid: str) -> bool:
+        if await socket_state.queue_remove(sid):
+            self.stats.cancelled += 1
+            return True
+        return False
+
+    async def sweep(self):
+        pairs = await socket_state.queue_sweep(settings.matchmaking_sweep_limit)
+        now = time.time()
+        for pair in pairs:
+            self.stats.record(pair, now)
+            self.stats.swept += 1
+            if self.on_match is not None:
+                try:
+                    await self.on_match(*pair)
+                except Exception as e:
+                    logger.warning(f"[Matchmaking] Swept match {pair[0].sid} vs {pair[1].sid} failed: {e}")
+
+    async def run(self):
+        """sweep_seconds 마다 넓어진 범위로 재매칭 (백그라운드 태스크)"""
+        while True:
+            await asyncio.sleep(settings.matchmaking_sweep_seconds)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"[Matchmaking] Sweep failed: {e}")
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "window": {
+                "base": settings.matchmaking_window_base,
+                "widen_per_second": settings.matchmaking_window_widen_per_second,
+                "max": settings.matchmaking_window_max,
+            },
+            **self.stats.snapshot(),
+        }
+
+
+# 싱글톤 인스턴스
+matchmaker = Matchmaker()
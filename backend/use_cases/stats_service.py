@@ -0,0 +1,26 @@
+import asyncio
+import logging
+
+from adapters.db.database import AsyncSessionLocal
+from adapters.db.repository import UserRepository
+from adapters.redis.user_stats import user_stats
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_user_stats():
+    """DB 집계값으로 Redis 유저 통계를 덮어써서 증분 갱신의 drift 보정"""
+    async with AsyncSessionLocal() as db:
+        total, ranked, histogram = await UserRepository(db).get_user_stats()
+    await user_stats.replace(total, ranked, histogram)
+    logger.info(f"📊 User stats reconciled: total={total}, ranked={ranked}")
+
+
+async def run_user_stats_reconciler(interval_seconds: float):
+    """시작 시 1회 + interval 마다 reconcile (백그라운드 태스크)"""
+    while True:
+        try:
+            await reconcile_user_stats()
+        except Exception as e:
+            logger.warning(f"User stats reconcile failed: {e}")
+        await asyncio.sleep(interval_seconds)
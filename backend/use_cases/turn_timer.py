@@ -0,0 +1,169 @@
+"""서버 측 턴 제한 시간 (hashed timer wheel)
+
+진행 중인 모든 배틀의 턴 마감 시각을 워커당 timer wheel 하나로 관리한다 (배틀마다 태스크를 만들지 않음).
+- wheel 은 slot 배열이고, 마감 시각을 tick 단위로 바꿔 (tick % slots) 번째 slot 에 넣는다
+- 매 tick 마다 현재 slot 하나만 보므로 tick 당 비용은 배틀 수가 아니라 slot 에 든 타이머 수에 비례
+- 등록 / 취소 / 재등록은 dict 연산 O(1) (공격이 들어올 때마다 재등록)
+
+마감되면 배틀 상태 version 을 비교해서(그 사이 공격이 있었으면 무시) 빗나감으로 처리하고
+턴을 넘긴 뒤 on_timeout 콜백(소켓 핸들러)으로 알린다. 같은 플레이어가 연속으로
+turn_timeout_max_misses 번 놓치면 기권패로 끝내고 더 이상 등록하지 않는다 (방치된 배틀이 계속 TTL 을 갱신하지 않도록). 타이머는 워커 메모리에만 있으므로
+워커가 재시작되면 다음 공격 때 다시 등록된다.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Optional
+
+from adapters.background import spawn
+from adapters.battle_state import battle_state_manager, BattleState
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class _Timer:
+    key: str
+    deadline_tick: int
+    payload: Any
+
+
+class TimerWheel:
+    """tick 단위 hashed timer wheel (key 당 타이머 하나)"""
+
+    def __init__(self, slots: int):
+        self.slots: list[dict[str, _Timer]] = [{} for _ in range(slots)]
+        self.timers: dict[str, _Timer] = {}
+        self.tick = 0
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def schedule(self, key: str, ticks: int, payload: Any = None):
+        """지금부터 ticks 뒤에 만료 (같은 key 가 있으면 교체)"""
+        self.cancel(key)
+        timer = _Timer(key, self.tick + max(1, ticks), payload)
+        self.slots[timer.deadline_tick % len(self.slots)][key] = timer
+        self.timers[key] = timer
+
+    def cancel(self, key: str) -> bool:
+        timer = self.timers.pop(key, None)
+        if timer is None:
+            return False
+        del self.slots[timer.deadline_tick % len(self.slots)][key]
+        return True
+
+    def advance(self) -> list[tuple[str, Any]]:
+        """한 tick 진행하고 만료된 (key, payload) 반환. 한 바퀴 뒤 타이머는 slot 에 남겨둔다"""
+        self.tick += 1
+        slot = self.slots[self.tick % len(self.slots)]
+        expired = [timer for timer in slot.values() if timer.deadline_tick <= self.tick]
+        for timer in expired:
+            del slot[timer.key]
+            del self.timers[timer.key]
+        return [(timer.key, timer.payload) for timer in expired]
+
+
+class TurnTimer:
+    """배틀별 턴 마감 관리 (워커당 하나, run() 태스크 하나)"""
+
+    def __init__(self):
+        self.wheel = TimerWheel(settings.turn_timer_slots)
+        self.tick_seconds = settings.turn_timer_tick_seconds
+        # (battle_id, 새 상태, 시간 초과된 플레이어, 기권승한 플레이어 또는 None) -> 클라이언트에 알림.
+        # register_socket_handlers 에서 설정
+        self.on_timeout: Optional[Callable[[str, BattleState, str, Optional[str]], Awaitable[None]]] = None
+        self.fired = 0
+        self.resolved = 0
+        self.stale = 0
+        self.forfeited = 0
+        self.max_tick_ms = 0.0
+
+    def start_turn(self, battle_id: str, version: int, timeout: Optional[float] = None):
+        """지금 턴의 마감 등록 (version = 이 턴을 시작시킨 쓰기 이후의 상태 version)"""
+        if not settings.turn_timeout_seconds:
+            return
+        timeout = timeout if timeout is not None else settings.turn_timeout_seconds
+        self.wheel.schedule(str(battle_id), round(timeout / self.tick_seconds), version)
+
+    def cancel(self, battle_id: str):
+        self.wheel.cancel(str(battle_id))
+
+    async def resolve_timeout(self, battle_id: str, version: int):
+        """마감된 턴을 빗나감으로 처리: 턴 전환 + turns 증가 (그 사이 다른 쓰기가 있었으면 무시).
+        같은 플레이어가 연속 turn_timeout_max_misses 번 시간 초과되면 기권패로 배틀을 끝낸다"""
+        self.fired += 1
+        timed_out = {}
+
+        def change(state: BattleState) -> Optional[BattleState]:
+            if state.version != version or state.status == "finished":
+                return None
+            if state.current_turn == 1:
+                timed_out["player_id"] = state.player1_id
+                missed = {"player1_missed": state.player1_missed + 1}
+                opponent_id = state.player2_id
+            else:
+                timed_out["player_id"] = state.player2_id
+                missed = {"player2_missed": state.player2_missed + 1}
+                opponent_id = state.player1_id
+            updated = replace(state, current_turn=2 if state.current_turn == 1 else 1, turns=state.turns + 1, **missed)
+            max_misses = settings.turn_timeout_max_misses
+            if max_misses and next(iter(missed.values())) >= max_misses:
+                timed_out["winner_id"] = opponent_id
+                updated = replace(updated, status="finished")
+            return updated
+
+        try:
+            state = await battle_state_manager.mutate(battle_id, change)
+        except Exception as e:
+            logger.warning(f"Turn timeout for {battle_id} failed: {e}")
+            return
+        if state is None or not timed_out:
+            self.stale += 1
+            return
+
+        self.resolved += 1
+        if state.status == "finished":
+            self.forfeited += 1
+            logger.info(f"⏰ {timed_out['player_id']} forfeited {battle_id} after {settings.turn_timeout_max_misses} missed turns")
+        else:
+            self.start_turn(battle_id, state.version)
+            logger.info(f"⏰ Turn timed out in {battle_id}: {timed_out['player_id']} missed")
+        if self.on_timeout is not None:
+            try:
+                await self.on_timeout(battle_id, state, timed_out["player_id"], timed_out.get("winner_id"))
+            except Exception as e:
+                logger.warning(f"Turn timeout notify for {battle_id} failed: {e}")
+
+    async def run(self):
+        """tick_seconds 마다 wheel 을 한 칸씩 진행 (백그라운드 태스크). 늦어진 tick 은 따라잡는다"""
+        next_tick = time.monotonic() + self.tick_seconds
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            start = time.perf_counter()
+            while next_tick <= time.monotonic():
+                for battle_id, version in self.wheel.advance():
+                    spawn(self.resolve_timeout(battle_id, version))
+                next_tick += self.tick_seconds
+            self.max_tick_ms = max(self.max_tick_ms, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "active": len(self.wheel),
+            "timeout_seconds": settings.turn_timeout_seconds,
+            "tick_seconds": self.tick_seconds,
+            "slots": len(self.wheel.slots),
+            "fired": self.fired,
+            "resolved": self.resolved,
+            "stale": self.stale,
+            "forfeited": self.forfeited,
+            "max_misses": settings.turn_timeout_max_misses,
+            "max_tick_ms": round(self.max_tick_ms, 3),
+        }
+
+
+# 싱글톤 인스턴스
+turn_timer = TurnTimer()
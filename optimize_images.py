@@ -1,62 +1,297 @@
+"""
+Asset optimizer for frontend images.
 
+Discovers source images (png/jpg/jpeg) by glob under one or more roots,
+re-encodes them into WebP (and AVIF when Pillow supports it) at several
+widths in a process pool, and keeps a manifest of source hashes so that
+unchanged files are skipped on the next run.
+
+Usage:
+    python optimize_images.py                          # default: frontend/public/images
+    python optimize_images.py --root frontend/public/images/background --widths 640,1280
+    python optimize_images.py --force --workers 8
+"""
+import argparse
+import glob
+import hashlib
+import json
 import os
-from PIL import Image
-
-BACKGROUNDS_DIR = '/root/Voice-Anime-Fighter/frontend/public/images'
-
-# Target images to convert (based on what we added to battleBackgrounds.js)
-# and any others matching the pattern
-TARGET_FILES = [
-    'battle_bg.png',
-    'bg_dojo.jpg',
-    'bg_tennis.jpg',
-    'bg_idol.jpg',
-    'bg_mountain.jpg',
-    'bg_magic.jpg',
-    'bg_skull_island.jpg',
-    'bg_night_sakura.jpg',
-    'bg_sunset_temple.jpg',
-    'bg_akihabara.jpg',
-    'bg_shibuya.jpg',
-    'bg_titan_wall.jpg',
-    'bg_demon_lord.jpg',
-    'bg_modern_city.jpg',
-    'bg_supermarket.jpg',
-    'bg_kaimaru.jpg',
-    'bg_night_store.jpg',
-    'bg_waterfall_castle.jpg',
-    'bg_ice_palace.jpg'
-]
-
-def convert_images():
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, features
+
+# Older Pillow needs pillow-avif-plugin registered in every process that saves AVIF.
+# Importing it here (not only in the parent) also registers it in pool workers
+# started with the spawn method (Windows / macOS default), which re-import this module.
+try:
+    import pillow_avif  # noqa: F401
+    HAS_AVIF_PLUGIN = True
+except ImportError:
+    HAS_AVIF_PLUGIN = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_ROOTS = [os.path.join(BASE_DIR, 'frontend', 'public', 'images')]
+DEFAULT_PATTERNS = ['**/*.png', '**/*.jpg', '**/*.jpeg']
+DEFAULT_WIDTHS = [640, 1280]
+DEFAULT_FORMATS = ['webp', 'avif']
+DEFAULT_MANIFEST = os.path.join(BASE_DIR, '.image_manifest.json')
+
+# Per-file fixes applied before encoding (filename -> degrees for Image.rotate)
+ROTATIONS = {
+    'bg_skull_island.jpg': -90,  # taken in portrait, shown horizontal
+}
+
+QUALITY = {
+    'webp': 85,
+    'avif': 60,
+}
+
+
+def avif_supported() -> bool:
+    """Pillow 11.2+ ships AVIF natively; older versions need pillow-avif-plugin."""
+    try:
+        if features.check('avif'):
+            return True
+    except ValueError:
+        pass
+    return HAS_AVIF_PLUGIN
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def discover(roots: list[str], patterns: list[str]) -> list[str]:
+    """Glob every pattern under every root, de-duplicated and sorted."""
+    found = set()
+    for root in roots:
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(root, pattern), recursive=True):
+                if os.path.isfile(path):
+                    found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def output_paths(src: str, widths: list[int], formats: list[str]) -> dict[str, str]:
+    """
+    Map variant key -> output path.
+    Full-size output keeps the plain `<name>.<fmt>` so existing references
+    (e.g. '/images/background/bg_dojo.webp') keep working.
+    """
+    root, _ = os.path.splitext(src)
+    outputs = {}
+    for fmt in formats:
+        outputs[f'full.{fmt}'] = f'{root}.{fmt}'
+        for width in widths:
+            outputs[f'{width}w.{fmt}'] = f'{root}_{width}w.{fmt}'
+    return outputs
+
+
+def encode(src: str, widths: list[int], formats: list[str]) -> dict:
+    """Worker: encode all variants of one source image. Runs in a child process."""
+    filename = os.path.basename(src)
+    outputs = output_paths(src, widths, formats)
+    sizes = {}
+
+    with Image.open(src) as img:
+        img.load()
+        if filename in ROTATIONS:
+            img = img.rotate(ROTATIONS[filename], expand=True)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+        for key, out_path in outputs.items():
+            size_key, fmt = key.split('.')
+            variant = img
+            if size_key != 'full':
+                width = int(size_key[:-1])
+                # Never upscale: skip widths larger than the source
+                if width >= img.width:
+                    continue
+                height = round(img.height * width / img.width)
+                variant = img.resize((width, height), Image.LANCZOS)
+
+            variant.save(out_path, fmt.upper(), quality=QUALITY[fmt])
+            sizes[key] = os.path.getsize(out_path)
+
+    return {
+        'src': src,
+        'src_size': os.path.getsize(src),
+        'outputs': {k: os.path.relpath(outputs[k], BASE_DIR) for k in sizes},
+        'sizes': sizes,
+    }
+
+
+def load_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Manifest unreadable, rebuilding: {e}")
+        return {}
+
+
+def save_manifest(path: str, manifest: dict):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(entry: dict | None, digest: str, settings_key: str) -> bool:
+    """Unchanged source, same encode settings, and every recorded output still on disk."""
+    if not entry:
+        return False
+    if entry.get('hash') != digest or entry.get('settings') != settings_key:
+        return False
+    return all(
+        os.path.exists(os.path.join(BASE_DIR, out))
+        for out in entry.get('outputs', {}).values()
+    )
+
+
+def format_size(num_bytes: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f'{num_bytes:.0f}{unit}' if unit == 'B' else f'{num_bytes:.1f}{unit}'
+        num_bytes /= 1024
+    return f'{num_bytes:.1f}GB'
+
+
+def print_report(results: list[dict]):
+    """Per-file size table plus totals for the variants encoded this run."""
+    if not results:
+        return
+    print()
+    print(f"{'source':<48} {'orig':>9}  variants")
+    total_src = 0
+    total_out = {}
+    for result in sorted(results, key=lambda r: r['src']):
+        rel = os.path.relpath(result['src'], BASE_DIR)
+        total_src += result['src_size']
+        variants = []
+        for key, size in sorted(result['sizes'].items()):
+            total_out[key] = total_out.get(key, 0) + size
+            variants.append(f'{key}={format_size(size)}')
+        print(f"{rel:<48} {format_size(result['src_size']):>9}  {' '.join(variants)}")
+
+    print()
+    print(f"Total source: {format_size(total_src)}")
+    for key, size in sorted(total_out.items()):
+        ratio = size / total_src * 100 if total_src else 0
+        print(f"  {key:<10} {format_size(size):>9} ({ratio:.0f}% of source)")
+
+
+def convert_images(
+    roots: list[str],
+    patterns: list[str],
+    widths: list[int],
+    formats: list[str],
+    manifest_path: str,
+    workers: int | None = None,
+    force: bool = False,
+) -> int:
+    """Returns the number of files that failed to encode."""
     print("Starting image conversion...")
-    
-    for filename in os.listdir(BACKGROUNDS_DIR):
-        if filename not in TARGET_FILES:
+
+    if 'avif' in formats and not avif_supported():
+        print("⚠️ AVIF not supported by this Pillow build (install pillow-avif-plugin), skipping AVIF")
+        formats = [fmt for fmt in formats if fmt != 'avif']
+
+    settings_key = json.dumps({'widths': widths, 'formats': formats, 'quality': QUALITY}, sort_keys=True)
+    manifest = load_manifest(manifest_path)
+    sources = discover(roots, patterns)
+
+    pending = []
+    digests = {}
+    for src in sources:
+        rel = os.path.relpath(src, BASE_DIR)
+        digest = file_hash(src)
+        digests[rel] = digest
+        if not force and is_fresh(manifest.get(rel), digest, settings_key):
             continue
-            
-        file_path = os.path.join(BACKGROUNDS_DIR, filename)
-        file_root, _ = os.path.splitext(filename)
-        output_path = os.path.join(BACKGROUNDS_DIR, f"{file_root}.webp")
-        
-        try:
-            with Image.open(file_path) as img:
-                # Rotation for Skull Island
-                if filename == 'bg_skull_island.jpg':
-                    print(f"Rotating {filename} 90 degrees...")
-                    img = img.rotate(-90, expand=True) # -90 is usually correct for "sideways" to "horizontal" if taken in portrait
-                
-                # Convert to RGB if necessary (e.g. RGBA pngs)
-                if img.mode in ('RGBA', 'LA'):
-                    # Create a white background for transparency if needed, or keep RGBA if WebP supports it (it does)
-                    # For backgrounds, usually we want no transparency, but let's just keep it simple.
-                    pass
-                
-                print(f"Converting {filename} to WebP...")
-                img.save(output_path, 'WEBP', quality=85)
-                
-        except Exception as e:
-            print(f"Failed to convert {filename}: {e}")
+        pending.append(src)
+
+    print(f"Found {len(sources)} source images, {len(sources) - len(pending)} unchanged, {len(pending)} to encode")
+
+    results = []
+    failures = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(encode, src, widths, formats): src for src in pending}
+            for future in as_completed(futures):
+                src = futures[future]
+                rel = os.path.relpath(src, BASE_DIR)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures += 1
+                    print(f"Failed to convert {rel}: {e}")
+                    continue
+                print(f"Converted {rel} -> {len(result['sizes'])} variants")
+                manifest[rel] = {
+                    'hash': digests[rel],
+                    'settings': settings_key,
+                    'outputs': result['outputs'],
+                    'sizes': result['sizes'],
+                }
+                results.append(result)
+
+    # Drop manifest entries whose source was deleted
+    for rel in list(manifest):
+        if rel not in digests and not os.path.exists(os.path.join(BASE_DIR, rel)):
+            del manifest[rel]
+
+    save_manifest(manifest_path, manifest)
+    print_report(results)
+    return failures
+
+
+def parse_int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def parse_str_list(value: str) -> list[str]:
+    return [v.strip().lower() for v in value.split(',') if v.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Optimize frontend image assets.")
+    parser.add_argument('--root', action='append', dest='roots',
+                        help="Directory to scan (repeatable). Default: frontend/public/images")
+    parser.add_argument('--pattern', action='append', dest='patterns',
+                        help="Glob pattern relative to each root (repeatable). Default: png/jpg/jpeg")
+    parser.add_argument('--widths', type=parse_int_list, default=DEFAULT_WIDTHS,
+                        help="Comma-separated resize widths in px (full size is always emitted)")
+    parser.add_argument('--formats', type=parse_str_list, default=DEFAULT_FORMATS,
+                        help="Comma-separated output formats: webp,avif")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help="Path to the hash manifest")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Re-encode everything, ignoring the manifest")
+    args = parser.parse_args(argv)
+
+    unknown = [fmt for fmt in args.formats if fmt not in QUALITY]
+    if unknown:
+        parser.error(f"Unsupported format(s): {', '.join(unknown)}")
+
+    failures = convert_images(
+        roots=[os.path.abspath(r) for r in (args.roots or DEFAULT_ROOTS)],
+        patterns=args.patterns or DEFAULT_PATTERNS,
+        widths=sorted(set(args.widths)),
+        formats=args.formats,
+        manifest_path=args.manifest,
+        workers=args.workers,
+        force=args.force,
+    )
+    return 1 if failures else 0
+
 
 if __name__ == '__main__':
-    convert_images()
+    sys.exit(main())